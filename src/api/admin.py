@@ -2,11 +2,16 @@
 from django.contrib import admin
 from .models import CustomUser, VerificationDocument, DoctorProfile , Abonnement, Paiement
 from django.utils.html import format_html
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.urls import reverse
  
 from django.contrib.auth.admin import UserAdmin
 
+from .pagination import EstimatedCountAdminMixin
+from .reviews import bulk_review_documents
+
 import logging
 logger = logging.getLogger(__name__)
 
@@ -93,7 +98,7 @@ class AbonnementAdmin(admin.ModelAdmin):
 
 # Admin pour le modèle Paiement
 @admin.register(Paiement)
-class PaiementAdmin(admin.ModelAdmin):
+class PaiementAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('abonnement_display', 'montant', 'date_paiement', 'statut', 'mode_paiement', 'reference_trans')
     list_filter = ('statut', 'mode_paiement', 'date_paiement')
     search_fields = ('abonnement__doctor__user__first_name', 'abonnement__doctor__user__last_name', 'reference_trans')
@@ -144,11 +149,27 @@ admin.site.index_title = "Gestion de la plateforme MedicalAI"
 from .models import PatientProfile, Analyse
 
 
+class DoctorListFilter(admin.SimpleListFilter):
+    """Filtre par médecin sans une requête par médecin (DoctorProfile.__str__ lit user)"""
+    title = 'doctor'
+    parameter_name = 'doctor__id__exact'
+
+    def lookups(self, request, model_admin):
+        doctors = DoctorProfile.objects.select_related('user').order_by('user__last_name', 'user__first_name')
+        return [(doctor.pk, str(doctor)) for doctor in doctors]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(doctor__id=self.value())
+        return queryset
+
+
 @admin.register(PatientProfile)
 class PatientProfileAdmin(admin.ModelAdmin):
     list_display = ("full_name", "email", "doctor_display")
     search_fields = ("user__first_name", "user__last_name", "user__email")
-    list_filter = ("doctor",)
+    list_filter = (DoctorListFilter,)
+    list_select_related = ("user", "doctor__user")
     
     def full_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}"
@@ -164,11 +185,13 @@ class PatientProfileAdmin(admin.ModelAdmin):
 
 
 @admin.register(Analyse)
-class AnalyseAdmin(admin.ModelAdmin):
+class AnalyseAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ("id", "patient", "maladie", "type_analyse", "result", "confidence", "date", "rapport_link")
     list_filter = ("maladie", "type_analyse", "date")
     search_fields = ("patient__user__first_name", "patient__user__last_name", "patient__user__email", "result")
     date_hierarchy = "date"
+    # "patient" s'affiche via PatientProfile.__str__, qui lit patient.user
+    list_select_related = ("patient__user",)
     
     def rapport_link(self, obj):
         if obj.rapport:
@@ -196,21 +219,35 @@ class DoctorProfileAdmin(admin.ModelAdmin):
     readonly_fields = ('is_approved', 'verification_status', 'documents_status_display')
     inlines = [VerificationDocumentInline]
     
+    def get_queryset(self, request):
+        # Compteurs par ligne calculés dans la requête de la liste : sous-requêtes
+        # corrélées (index doctor_id), sans JOIN documents x abonnements ni GROUP BY
+        return super().get_queryset(request).select_related('user').annotate(
+            docs_total=self._count(VerificationDocument),
+            docs_approved=self._count(VerificationDocument, status='approved'),
+            docs_pending=self._count(VerificationDocument, status='pending'),
+            docs_rejected=self._count(VerificationDocument, status='rejected'),
+            abonnements_total=self._count(Abonnement),
+        )
+
+    @staticmethod
+    def _count(model, **filters):
+        counts = (
+            model.objects.filter(doctor=OuterRef('pk'), **filters)
+            .order_by().values('doctor').annotate(c=Count('pk')).values('c')
+        )
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+    
     def user_email(self, obj):
         return obj.user.email
     user_email.short_description = 'Email'
     user_email.admin_order_field = 'user__email'
     
     def documents_status(self, obj):
-        docs = obj.documents.all()
-        if not docs.exists():
+        if not obj.docs_total:
             return "No documents"
         
-        approved = sum(1 for d in docs if d.status == 'approved')
-        pending = sum(1 for d in docs if d.status == 'pending')
-        rejected = sum(1 for d in docs if d.status == 'rejected')
-        
-        return f"{approved}✓ {pending}⏳ {rejected}✗"
+        return f"{obj.docs_approved}✓ {obj.docs_pending}⏳ {obj.docs_rejected}✗"
     documents_status.short_description = 'Documents Status'
     
     def documents_status_display(self, obj):
@@ -228,10 +265,11 @@ class DoctorProfileAdmin(admin.ModelAdmin):
     documents_status_display.short_description = "Documents Details"
     
     def abonnements_count(self, obj):
-        count = obj.abonnements.count()
+        count = obj.abonnements_total
         url = reverse('admin:api_abonnement_changelist') + f'?doctor__id__exact={obj.id}'
         return format_html('<a href="{}">{} abonnement(s)</a>', url, count)
     abonnements_count.short_description = 'Abonnements'
+    abonnements_count.admin_order_field = 'abonnements_total'
     
     fieldsets = (
         (None, {
@@ -243,12 +281,13 @@ class DoctorProfileAdmin(admin.ModelAdmin):
     )
 
 @admin.register(VerificationDocument)
-class VerificationDocumentAdmin(admin.ModelAdmin):
+class VerificationDocumentAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ['doctor_info', 'doc_type', 'status_badge', 'uploaded_at', 'reviewed_by_info', 'document_link']
     list_filter = ['status', 'doc_type', 'uploaded_at']
     search_fields = ['doctor__user__email', 'doctor__user__first_name', 'doctor__user__last_name']
     readonly_fields = ['uploaded_at', 'document_preview', 'doctor', 'document', 'doc_type', 'reviewed_by']
     actions = ['approve_documents', 'reject_documents']
+    list_select_related = ['doctor__user', 'reviewed_by']
 
     # Doctor info
     def doctor_info(self, obj):
@@ -294,89 +333,63 @@ class VerificationDocumentAdmin(admin.ModelAdmin):
 
      # ---- Admin actions ----
     def approve_documents(self, request, queryset):
-        for doc in queryset:
-            doc.status = 'approved'
-            doc.reviewed_by = request.user
-            doc.save()  # This will trigger the signal and send email
-        self.message_user(request, "Selected documents have been approved. Emails sent to doctors.")
+        # Un seul UPDATE, approbation recalculée et email envoyé une fois par médecin
+        notified = bulk_review_documents(queryset, 'approved', request.user)
+        self.message_user(request, f"Selected documents have been approved. Notifications queued for {notified} doctor(s).")
     
     def reject_documents(self, request, queryset):
-        for doc in queryset:
-            doc.status = 'rejected'
-            doc.reviewed_by = request.user
-            if not doc.comment:
-                doc.comment = "Document rejected. Please upload a valid document."
-            doc.save()  # This will trigger the signal and send email
-        self.message_user(request, "Selected documents have been rejected. Emails sent to doctors.")
+        notified = bulk_review_documents(
+            queryset, 'rejected', request.user,
+            default_comment="Document rejected. Please upload a valid document.",
+        )
+        self.message_user(request, f"Selected documents have been rejected. Notifications queued for {notified} doctor(s).")
     
     # Allow changing documents to trigger status updates
     def has_change_permission(self, request, obj=None):
         return True
     
-    # ---- NOUVELLE MÉTHODE AJOUTÉE ----
-    def save_model(self, request, obj, form, change):
-        """
-        Surcharge la méthode save pour s'assurer que les emails sont envoyés
-        quand on modifie manuellement dans l'admin
-        """
-        # Sauvegarder d'abord l'objet
-        super().save_model(request, obj, form, change)
-        
-        # Forcer la vérification du statut du docteur
-        obj.doctor.check_approval_status()
-        
-        # Envoyer l'email si le statut a changé
-        if change and 'status' in form.changed_data:
-            self.send_status_email(obj, form.cleaned_data['status'])
-    
-    def send_status_email(self, document, new_status):
-        """
-        Envoyer manuellement l'email de changement de statut
-        """
-        from django.core.mail import EmailMultiAlternatives
-        from django.template.loader import render_to_string
-        from django.utils.html import strip_tags
-        from django.conf import settings
-        
-        doctor = document.doctor
-        doctor_email = doctor.user.email
-        doctor_name = f"{doctor.user.first_name} {doctor.user.last_name}"
-        
-        # Déterminer le template en fonction du statut
-        if new_status == 'approved':
-            subject = "Votre document a été approuvé - Neurevia"
-            template_name = "emails/document_approved.html"
-        elif new_status == 'rejected':
-            subject = "Votre document a été rejeté - Neurevia"
-            template_name = "emails/document_rejected.html"
-        else:
-            return
-        
-        # Construire le contexte
-        context = {
-            'doctor_name': doctor_name,
-            'document_type': document.doc_type or "Document de vérification",
-            'comment': document.comment
-        }
-        
-        try:
-            # Render HTML content
-            html_content = render_to_string(template_name, context)
-            text_content = strip_tags(html_content)
-            
-            # Create email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[doctor_email]
-            )
-            email.attach_alternative(html_content, "text/html")
-            
-            # Send email
-            email.send()
-            print(f"✅ Email envoyé à {doctor_email}")
-        except Exception as e:
-            print(f"❌ Erreur envoi email: {e}")
-    
-    # ---- FIN DE LA NOUVELLE MÉTHODE ----
\ No newline at end of file
+    # L'approbation du médecin et les emails de changement de statut sont gérés
+    # par le signal post_save (models.update_doctor_status_on_document_change),
+    # qui compare avec l'état mémorisé en pre_save.
+
+
+from .models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+from .models import InferenceJob, InferenceResultCache, InferenceCacheStats
+
+
+@admin.register(InferenceJob)
+class InferenceJobAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('id', 'analyse', 'status', 'progress', 'attempts', 'model_version', 'created_at', 'finished_at')
+    list_filter = ('status', 'model_version')
+    list_select_related = ('analyse',)
+    raw_id_fields = ('analyse',)
+    readonly_fields = ('input_hash', 'created_at', 'started_at', 'finished_at', 'error')
+
+
+@admin.register(InferenceResultCache)
+class InferenceResultCacheAdmin(admin.ModelAdmin):
+    list_display = ('key', 'model_version', 'result', 'confidence', 'hits', 'last_used_at')
+    list_filter = ('model_version',)
+    search_fields = ('key',)
+    ordering = ('-last_used_at',)
+
+
+@admin.register(InferenceCacheStats)
+class InferenceCacheStatsAdmin(admin.ModelAdmin):
+    list_display = ('day', 'hits', 'misses', 'evictions', 'hit_rate')
+    ordering = ('-day',)
+
+    def hit_rate(self, obj):
+        lookups = obj.hits + obj.misses
+        return f"{obj.hits / lookups:.0%}" if lookups else "-"
+    hit_rate.short_description = "Hit rate"
@@ -0,0 +1,151 @@
+# backend/api/biomarkers.py
+"""
+Biomarqueurs typés : une ligne ``BiomarkerValue (analyse, marker, value, unit)``
+par valeur numérique de ``Analyse.biomarkers``.
+
+- Le JSON reste la source ; la table est synchronisée à chaque save
+  (signals.py) et remplie pour l'existant par ``manage.py backfill_biomarkers``.
+- Index ``(marker, value, analyse)`` : un filtre ``abeta42 < 600`` est un
+  parcours d'intervalle d'index (sans relire les JSON), ``analyse_id`` étant
+  lu dans l'index lui-même.
+- Formats acceptés par marqueur : nombre, ``"600"`` / ``"600 pg/mL"``,
+  ou ``{"value": 600, "unit": "pg/mL"}`` ; le reste est ignoré.
+"""
+import math
+import re
+
+from django.db import transaction
+
+from .models import Analyse, BiomarkerValue
+
+
+BACKFILL_CHUNK_SIZE = 2000
+MARKER_MAX_LENGTH = 50
+UNIT_MAX_LENGTH = 20
+_NUMBER_WITH_UNIT = re.compile(r"^\s*([-+]?\d+(?:[.,]\d+)?(?:[eE][-+]?\d+)?)\s*(.*?)\s*$")
+
+
+# ---- JSON -> lignes ----
+def parse_value(raw):
+    """``(valeur, unité)`` d'un biomarqueur, ou None si non numérique."""
+    unit = ""
+    if isinstance(raw, dict):
+        unit = raw.get("unit") or ""
+        raw = raw.get("value")
+    if isinstance(raw, bool):
+        return None
+    if isinstance(raw, str):
+        match = _NUMBER_WITH_UNIT.match(raw)
+        if match is None:
+            return None
+        raw, unit = match.group(1).replace(",", "."), unit or match.group(2)
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(value):
+        return None
+    return value, str(unit)[:UNIT_MAX_LENGTH]
+
+
+def biomarker_rows(biomarkers):
+    """``{(marqueur, valeur, unité)}`` d'un JSON ``Analyse.biomarkers``."""
+    if not isinstance(biomarkers, dict):
+        return set()
+    rows = set()
+    for marker, raw in biomarkers.items():
+        parsed = parse_value(raw)
+        if parsed is not None:
+            rows.add((str(marker).strip()[:MARKER_MAX_LENGTH], *parsed))
+    return rows
+
+
+def _objects(analyse_id, rows):
+    return [
+        BiomarkerValue(analyse_id=analyse_id, marker=marker, value=value, unit=unit)
+        for marker, value, unit in rows
+    ]
+
+
+def sync_biomarkers(analyse, created=False):
+    """Aligne les lignes typées sur ``analyse.biomarkers`` (aucune écriture si inchangé)."""
+    rows = biomarker_rows(analyse.biomarkers)
+    if created:
+        if rows:
+            BiomarkerValue.objects.bulk_create(_objects(analyse.pk, rows))
+        return
+
+    existing = analyse.biomarker_values.all()
+    if set(existing.values_list("marker", "value", "unit")) == rows:
+        return
+    with transaction.atomic():
+        existing.delete()
+        BiomarkerValue.objects.bulk_create(_objects(analyse.pk, rows))
+
+
+def backfill_biomarkers(chunk_size=None, after=0):
+    """
+    Reconstruit les lignes typées par lots de ``chunk_size`` analyses (ordre
+    des clés primaires, un lot par transaction). Renvoie un générateur de
+    ``(dernier id traité, lignes écrites)`` : ``after`` permet de reprendre.
+    """
+    chunk_size = chunk_size or BACKFILL_CHUNK_SIZE
+    while True:
+        chunk = list(
+            Analyse.objects.filter(pk__gt=after)
+            .order_by("pk")
+            .values_list("pk", "biomarkers")[:chunk_size]
+        )
+        if not chunk:
+            return
+        objects = [obj for pk, biomarkers in chunk for obj in _objects(pk, biomarker_rows(biomarkers))]
+        with transaction.atomic():
+            BiomarkerValue.objects.filter(analyse_id__in=[pk for pk, _ in chunk]).delete()
+            BiomarkerValue.objects.bulk_create(objects, batch_size=1000)
+        after = chunk[-1][0]
+        yield after, len(objects)
+
+
+# ---- Filtres par intervalle ----
+def parse_ranges(values):
+    """
+    ``["abeta42::600", "ptau:20:"]`` -> ``[(marqueur, min, max)]`` (bornes
+    incluses, vide = non bornée) ; ValueError si un intervalle est invalide.
+    """
+    ranges = []
+    for raw in values:
+        parts = raw.split(":")
+        if len(parts) != 3 or not parts[0].strip():
+            raise ValueError(f"range must be 'marker:min:max', got {raw!r}")
+        marker, low, high = parts[0].strip(), parts[1].strip(), parts[2].strip()
+        try:
+            low = float(low) if low else None
+            high = float(high) if high else None
+        except ValueError:
+            raise ValueError(f"range bounds must be numbers, got {raw!r}")
+        if low is None and high is None:
+            raise ValueError(f"range needs at least one bound, got {raw!r}")
+        ranges.append((marker, low, high))
+    return ranges
+
+
+def matching_analyse_ids(marker, low=None, high=None):
+    """Sous-requête ``analyse_id`` : parcours de l'index (marker, value, analyse)."""
+    values = BiomarkerValue.objects.filter(marker=marker)
+    if low is not None:
+        values = values.filter(value__gte=low)
+    if high is not None:
+        values = values.filter(value__lte=high)
+    return values.values("analyse_id")
+
+
+def filter_analyses(queryset, ranges):
+    """Analyses dont les biomarqueurs vérifient TOUS les intervalles."""
+    for marker, low, high in ranges:
+        queryset = queryset.filter(pk__in=matching_analyse_ids(marker, low, high))
+    return queryset
+
+
+def filter_patients(queryset, analyses):
+    """Patients ayant au moins une des ``analyses``."""
+    return queryset.filter(pk__in=analyses.order_by().values("patient_id"))
@@ -0,0 +1,275 @@
+# backend/api/cohorts.py
+"""
+Statistiques de cohorte pour le rôle ``researcher``.
+
+Les analyses filtrées sont lues en colonnes (``values_list().iterator()``,
+par morceaux de ``COHORT_CHUNK_SIZE``) dans un DataFrame pandas ; toutes les
+statistiques sont calculées en vectoriel :
+
+- ``classes``       : répartition des résultats par maladie
+- ``confidence``    : histogramme et moyenne des confiances par maladie
+- ``biomarkers``    : count / moyenne / écart-type / quartiles par maladie et marqueur
+- ``probabilities`` : probabilité moyenne de chaque classe par maladie
+
+Chaque résultat est mis en cache (``COHORT_CACHE_TTL``) sous une clé dérivée
+des filtres et des sections demandées.
+"""
+import hashlib
+import json
+from datetime import date
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .fields import decode_vectors
+from .models import Analyse
+
+
+COHORT_CACHE_TTL = getattr(settings, "COHORT_CACHE_TTL", 600)
+COHORT_CHUNK_SIZE = getattr(settings, "COHORT_CHUNK_SIZE", 10000)
+
+FILTERS = ("maladie", "type_analyse", "result", "date_from", "date_to")
+SECTIONS = ("classes", "confidence", "biomarkers", "probabilities")
+DEFAULT_SECTIONS = ("classes", "confidence", "biomarkers")
+CONFIDENCE_BINS = np.linspace(0, 1, 11)
+
+# Colonnes lues en base pour chaque section
+SECTION_COLUMNS = {
+    "classes": ("result",),
+    "confidence": ("confidence",),
+    "biomarkers": ("biomarkers",),
+    "probabilities": ("probabilities",),
+}
+MARKER_PREFIX = "marker:"
+# Nom exposé -> colonne de DataFrame.describe()
+DESCRIBE_STATS = {
+    "mean": "mean", "std": "std", "min": "min",
+    "p25": "25%", "median": "50%", "p75": "75%", "max": "max",
+}
+
+
+# ---- Paramètres ----
+def parse_filters(params):
+    """Filtres validés (dates ISO) ; ValueError si un filtre est invalide."""
+    filters = {}
+    for name in FILTERS:
+        value = (params.get(name) or "").strip()
+        if not value:
+            continue
+        if name.startswith("date_"):
+            try:
+                value = date.fromisoformat(value).isoformat()
+            except ValueError:
+                raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+        filters[name] = value
+    return filters
+
+
+def parse_params(params):
+    """Filtres et sections validés ; ValueError si un paramètre est invalide."""
+    filters = parse_filters(params)
+    sections = [s.strip() for s in (params.get("sections") or "").split(",") if s.strip()]
+    unknown = sorted(set(sections) - set(SECTIONS))
+    if unknown:
+        raise ValueError(f"Unknown section(s): {', '.join(unknown)}")
+    return filters, sorted(sections or DEFAULT_SECTIONS)
+
+
+def cache_key(filters, sections):
+    canonical = json.dumps([sorted(filters.items()), sections], separators=(",", ":"))
+    return f"cohort-analytics:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+
+def filtered_queryset(filters):
+    queryset = Analyse.objects.all()
+    for name in ("maladie", "type_analyse", "result"):
+        if name in filters:
+            queryset = queryset.filter(**{name: filters[name]})
+    if "date_from" in filters:
+        queryset = queryset.filter(date__gte=filters["date_from"])
+    if "date_to" in filters:
+        queryset = queryset.filter(date__lte=filters["date_to"])
+    return queryset
+
+
+# ---- Chargement colonnaire ----
+def biomarker_dict(value):
+    """Biomarqueurs d'une analyse (dict, ou JSON en texte) -> dict."""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return {}
+    return value if isinstance(value, dict) else {}
+
+
+def _numeric(values):
+    """Liste Python -> float64 (None -> NaN), valeurs non numériques -> NaN."""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _marker_columns(values):
+    """Biomarqueurs d'un lot -> ``{marqueur: float64[]}`` (une passe par marqueur)."""
+    dicts = [value if type(value) is dict else biomarker_dict(value) for value in values]
+    names = set().union(*dicts)
+    return {name: _numeric([d.get(name) for d in dicts]) for name in names}
+
+
+def frame_from_rows(rows, columns, chunk_size=None):
+    """
+    Tuples ``values_list`` -> DataFrame, lot par lot et colonne par colonne ;
+    les biomarqueurs sont éclatés en colonnes numériques ``marker:<nom>``.
+    """
+    chunk_size = chunk_size or COHORT_CHUNK_SIZE
+    rows = iter(rows)
+    data = {column: [] for column in columns if column != "biomarkers"}
+    markers = {}
+    total = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        for column, values in zip(columns, zip(*chunk)):
+            if column == "biomarkers":
+                for name, array in _marker_columns(values).items():
+                    # Marqueur absent des lots précédents : NaN pour ces lignes
+                    markers.setdefault(name, [np.full(total, np.nan)]).append(array)
+            else:
+                data[column].extend(values)
+        total += len(chunk)
+        for name, arrays in markers.items():
+            if sum(map(len, arrays)) < total:
+                arrays.append(np.full(total - sum(map(len, arrays)), np.nan))
+
+    frame = pd.DataFrame({
+        column: (
+            pd.Categorical(values) if column in ("maladie", "result")
+            else _numeric(values) if column == "confidence"
+            else values
+        )
+        for column, values in data.items()
+    })
+    for name in sorted(markers):
+        frame[MARKER_PREFIX + name] = np.concatenate(markers[name])
+    return frame
+
+
+def load_frame(queryset, sections):
+    columns = ["maladie"]
+    for section in sections:
+        columns.extend(SECTION_COLUMNS[section])
+    rows = queryset.order_by().values_list(*columns).iterator(chunk_size=COHORT_CHUNK_SIZE)
+    return frame_from_rows(rows, columns)
+
+
+# ---- Statistiques ----
+def class_distribution(frame):
+    counts = frame.groupby(["maladie", "result"], observed=True).size()
+    distribution = {}
+    for (maladie, result), count in counts.items():
+        distribution.setdefault(maladie, {})[result] = int(count)
+    return distribution
+
+
+def confidence_histograms(frame):
+    by_maladie = {}
+    for maladie, values in frame.groupby("maladie", observed=True)["confidence"]:
+        values = values.dropna().to_numpy(dtype=np.float64)
+        histogram, _ = np.histogram(np.clip(values, 0, 1), bins=CONFIDENCE_BINS)
+        by_maladie[maladie] = {
+            "count": int(values.size),
+            "mean": round(float(values.mean()), 4) if values.size else None,
+            "histogram": histogram.tolist(),
+        }
+    return {"bins": CONFIDENCE_BINS.round(2).tolist(), "by_maladie": by_maladie}
+
+
+def biomarker_statistics(frame):
+    markers = [column for column in frame.columns if column.startswith(MARKER_PREFIX)]
+    if not markers:
+        return {}
+    # Un seul passage groupé : count, mean, std, min, 25%, 50%, 75%, max
+    described = frame[["maladie", *markers]].groupby("maladie", observed=True).describe()
+    summary = {}
+    for maladie, row in described.iterrows():
+        per_marker = {}
+        for marker in markers:
+            count = int(row[(marker, "count")])
+            if not count:
+                continue
+            per_marker[marker[len(MARKER_PREFIX):]] = {
+                "count": count,
+                **{name: _rounded(row[(marker, stat)]) for name, stat in DESCRIBE_STATS.items()},
+            }
+        summary[maladie] = per_marker
+    return summary
+
+
+def _rounded(value):
+    return None if pd.isna(value) else round(float(value), 4)
+
+
+def mean_probabilities(frame):
+    # Une matrice float32 par jeu de classes (np.frombuffer sur les vecteurs
+    # concaténés), sommée par maladie en un groupby ; une classe peut figurer
+    # dans plusieurs jeux : sommes et effectifs cumulés, divisés à la fin
+    maladies = pd.Categorical(frame["maladie"])
+    sums, counts = {}, {}
+    for positions, names, matrix in decode_vectors(frame["probabilities"].to_numpy()):
+        grouped = (
+            pd.DataFrame(matrix.astype(np.float64), columns=names)
+            .groupby(maladies.take(positions), observed=True)
+        )
+        totals, sizes = grouped.sum(), grouped.count()
+        for maladie, total_row, size_row in zip(
+            totals.index, totals.to_numpy(dtype=np.float64).tolist(), sizes.to_numpy().tolist()
+        ):
+            maladie_sums, maladie_counts = sums.setdefault(maladie, {}), counts.setdefault(maladie, {})
+            for name, total, size in zip(names, total_row, size_row):
+                # Valeurs non numériques (NaN) : hors somme et hors effectif
+                if size:
+                    maladie_sums[name] = maladie_sums.get(name, 0.0) + total
+                    maladie_counts[name] = maladie_counts.get(name, 0) + size
+    return {
+        maladie: {name: round(total / counts[maladie][name], 4) for name, total in per_class.items()}
+        for maladie, per_class in sums.items() if per_class
+    }
+
+
+COMPUTE = {
+    "classes": class_distribution,
+    "confidence": confidence_histograms,
+    "biomarkers": biomarker_statistics,
+    "probabilities": mean_probabilities,
+}
+
+
+def compute_analytics(frame, sections):
+    analytics = {"count": int(len(frame))}
+    for section in sections:
+        analytics[section] = COMPUTE[section](frame) if len(frame) else {}
+    return analytics
+
+
+def cohort_analytics(filters, sections):
+    """Statistiques en cache pour ce jeu de filtres ; ``cached`` indique un succès."""
+    key = cache_key(filters, sections)
+    analytics = cache.get(key)
+    if analytics is not None:
+        return {**analytics, "cached": True}
+
+    frame = load_frame(filtered_queryset(filters), sections)
+    analytics = {
+        "filters": filters,
+        **compute_analytics(frame, sections),
+        "computed_at": timezone.now().isoformat(),
+    }
+    cache.set(key, analytics, COHORT_CACHE_TTL)
+    return {**analytics, "cached": False}
@@ -0,0 +1,153 @@
+# backend/api/counters.py
+"""
+Compteurs par médecin maintenus de façon incrémentale (patients, analyses,
+analyses des 30 derniers jours).
+
+- Les créations / suppressions d'Analyse et de PatientProfile mettent à jour
+  ``DoctorCounters`` avec des expressions F() (voir signals.py) ; un ``save()``
+  qui change de médecin retire la ligne à l'ancien et l'ajoute au nouveau.
+  Un ``queryset.update(doctor=...)`` ne passe pas par les signaux :
+  ``rebuild_doctor_counters`` pour les deux médecins ensuite.
+- La fenêtre de 30 jours glisse grâce aux compteurs journaliers
+  ``DoctorDailyAnalysisCount`` : au premier accès d'une nouvelle journée on
+  retire les jours sortis de la fenêtre, une seule fois.
+- ``rebuild_doctor_counters`` recalcule tout depuis zéro (commande
+  ``manage.py rebuild_doctor_counters`` pour réparer une dérive).
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Analyse, DoctorCounters, DoctorDailyAnalysisCount, PatientProfile
+
+
+RECENT_WINDOW_DAYS = 30
+
+
+def _window_start(day):
+    return day - timezone.timedelta(days=RECENT_WINDOW_DAYS)
+
+
+def rebuild_doctor_counters(doctor_id, today=None):
+    """Recalcule les compteurs d'un médecin à partir des tables sources."""
+    today = today or timezone.now().date()
+    start = _window_start(today)
+
+    with transaction.atomic():
+        daily = list(
+            Analyse.objects.filter(doctor_id=doctor_id)
+            .order_by()
+            .values("date")
+            .annotate(total=Count("id"))
+        )
+        recent_days = [row for row in daily if start <= row["date"] <= today]
+
+        DoctorDailyAnalysisCount.objects.filter(doctor_id=doctor_id).delete()
+        DoctorDailyAnalysisCount.objects.bulk_create([
+            DoctorDailyAnalysisCount(doctor_id=doctor_id, day=row["date"], count=row["total"])
+            for row in recent_days
+        ])
+
+        counters, _ = DoctorCounters.objects.update_or_create(
+            doctor_id=doctor_id,
+            defaults={
+                "total_patients": PatientProfile.objects.filter(doctor_id=doctor_id).count(),
+                "total_analyses": sum(row["total"] for row in daily),
+                "recent_analyses": sum(row["total"] for row in recent_days),
+                "window_day": today,
+            },
+        )
+    return counters
+
+
+def _roll_window(counters, today):
+    """Fait avancer la fenêtre de ``counters.window_day`` à ``today``."""
+    dropped = DoctorDailyAnalysisCount.objects.filter(
+        doctor_id=counters.doctor_id,
+        day__gte=_window_start(counters.window_day),
+        day__lt=_window_start(today),
+    ).aggregate(total=Sum("count"))["total"] or 0
+
+    with transaction.atomic():
+        # Conditionnel sur window_day : un seul process fait avancer la fenêtre
+        rolled = DoctorCounters.objects.filter(
+            pk=counters.doctor_id, window_day=counters.window_day
+        ).update(recent_analyses=F("recent_analyses") - dropped, window_day=today)
+        if rolled:
+            DoctorDailyAnalysisCount.objects.filter(
+                doctor_id=counters.doctor_id, day__lt=_window_start(today)
+            ).delete()
+
+    counters.refresh_from_db()
+    return counters
+
+
+def _current_counters(doctor_id, today, rebuild_if_missing):
+    """
+    Renvoie ``(counters, rebuilt)``. ``rebuilt`` est vrai si les compteurs
+    viennent d'être recalculés (ils incluent alors déjà la dernière écriture).
+    """
+    counters = DoctorCounters.objects.filter(pk=doctor_id).first()
+    if counters is None:
+        if not rebuild_if_missing:
+            return None, False
+        return rebuild_doctor_counters(doctor_id, today), True
+    if counters.window_day < today:
+        counters = _roll_window(counters, today)
+    return counters, False
+
+
+def get_doctor_counters(doctor_id, today=None):
+    """Lecture O(1) par clé primaire (plus un glissement de fenêtre par jour)."""
+    today = today or timezone.now().date()
+    counters, _ = _current_counters(doctor_id, today, rebuild_if_missing=True)
+    return counters
+
+
+def record_analysis(doctor_id, day, delta):
+    """+1 / -1 analyse pour ``doctor_id``, datée de ``day``."""
+    if doctor_id is None:
+        return
+    today = timezone.now().date()
+
+    with transaction.atomic():
+        # Pas de reconstruction sur une suppression : le médecin peut être en
+        # cours de suppression (cascade) et ses compteurs déjà supprimés.
+        counters, rebuilt = _current_counters(doctor_id, today, rebuild_if_missing=delta > 0)
+        if counters is None or rebuilt:
+            return
+
+        in_window = _window_start(today) <= day <= today
+        DoctorCounters.objects.filter(pk=doctor_id).update(
+            total_analyses=F("total_analyses") + delta,
+            recent_analyses=F("recent_analyses") + (delta if in_window else 0),
+        )
+        if in_window:
+            _add_to_bucket(doctor_id, day, delta)
+
+
+def _add_to_bucket(doctor_id, day, delta):
+    buckets = DoctorDailyAnalysisCount.objects.filter(doctor_id=doctor_id, day=day)
+    if buckets.update(count=F("count") + delta) or delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            DoctorDailyAnalysisCount.objects.create(doctor_id=doctor_id, day=day, count=delta)
+    except IntegrityError:
+        # Créé entre-temps par une requête concurrente
+        buckets.update(count=F("count") + delta)
+
+
+def record_patient(doctor_id, delta):
+    """+1 / -1 patient pour ``doctor_id``."""
+    if doctor_id is None:
+        return
+    today = timezone.now().date()
+
+    with transaction.atomic():
+        counters, rebuilt = _current_counters(doctor_id, today, rebuild_if_missing=delta > 0)
+        if counters is None or rebuilt:
+            return
+        DoctorCounters.objects.filter(pk=doctor_id).update(
+            total_patients=F("total_patients") + delta,
+        )
@@ -0,0 +1,98 @@
+# backend/api/dashboard.py
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .counters import get_doctor_counters
+from .models import Abonnement, VerificationDocument
+
+
+DASHBOARD_CACHE_TTL = getattr(settings, "DASHBOARD_CACHE_TTL", 300)
+
+NO_SUBSCRIPTION = {
+    "current_type": "FreeTrial",
+    "current_status": "inactive",
+    "start_date": None,
+    "end_date": None,
+    "price": 0.0,
+    "payment_method": None,
+}
+
+
+def _cache_key(doctor_id, today):
+    # La date fait partie de la clé : abonnement courant et fenêtre de 30 jours en dépendent
+    return f"doctor-dashboard:{doctor_id}:{today.isoformat()}"
+
+
+def invalidate_doctor_dashboard(doctor_id):
+    if doctor_id is None:
+        return
+    cache.delete(_cache_key(doctor_id, timezone.now().date()))
+
+
+def compute_doctor_dashboard(doctor_profile, today=None):
+    """
+    Bloc "tableau de bord" de DoctorProfileView : abonnement, documents,
+    historique et statistiques (compteurs dénormalisés, cf. counters.py).
+    """
+    today = today or timezone.now().date()
+
+    current_subscription = Abonnement.objects.filter(
+        doctor=doctor_profile,
+        date_debut__lte=today,
+        date_fin__gte=today,
+        statut="active"
+    ).first()
+
+    # Un seul agrégat conditionnel pour tous les statuts de documents
+    document_status = VerificationDocument.objects.filter(doctor=doctor_profile).aggregate(
+        total_documents=Count("id"),
+        approved_documents=Count("id", filter=Q(status="approved")),
+        pending_documents=Count("id", filter=Q(status="pending")),
+        rejected_documents=Count("id", filter=Q(status="rejected")),
+    )
+
+    subscription_history = Abonnement.objects.filter(
+        doctor=doctor_profile
+    ).order_by('-date_debut')[:5].values(
+        'type', 'date_debut', 'date_fin', 'statut', 'prix'
+    )
+
+    # Compteurs maintenus de façon incrémentale : lecture par clé primaire
+    counters = get_doctor_counters(doctor_profile.pk, today)
+    statistics = {
+        "total_patients": counters.total_patients,
+        "total_analyses": counters.total_analyses,
+        "recent_analyses": counters.recent_analyses,
+    }
+
+    if current_subscription:
+        subscription = {
+            "current_type": current_subscription.type,
+            "current_status": current_subscription.statut,
+            "start_date": current_subscription.date_debut,
+            "end_date": current_subscription.date_fin,
+            "price": float(current_subscription.prix),
+            "payment_method": current_subscription.mode_paiement,
+        }
+    else:
+        subscription = dict(NO_SUBSCRIPTION)
+
+    return {
+        "subscription": subscription,
+        "verification": document_status,
+        "subscription_history": list(subscription_history),
+        "statistics": statistics,
+    }
+
+
+def get_doctor_dashboard(doctor_profile):
+    """Version en cache de compute_doctor_dashboard (invalidée par signals.py)."""
+    today = timezone.now().date()
+    key = _cache_key(doctor_profile.pk, today)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = compute_doctor_dashboard(doctor_profile, today)
+        cache.set(key, dashboard, DASHBOARD_CACHE_TTL)
+    return dashboard
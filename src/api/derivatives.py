@@ -0,0 +1,146 @@
+# backend/api/derivatives.py
+"""
+Images dérivées de ``irm_original`` et ``heatmap_img`` (miniature, WebP moyen).
+
+- ``Analyse.save()`` marque l'analyse ``derivatives_pending`` quand une image
+  change (upload, heatmap calculée) ; le worker d'inférence fait de même.
+- ``manage.py build_image_derivatives`` lit les images en attente, les fait
+  réduire par un pool de PROCESS (Pillow) et enregistre les dérivées à côté
+  de l'original sous un nom haché sur le contenu :
+  ``irm/<sha256[:32]>.thumb.webp``. Deux uploads identiques partagent les
+  mêmes fichiers.
+- ``Analyse.derivatives`` : ``{champ: {"source": nom, "thumb": nom, "medium": nom}}``,
+  exposé en URLs par ``AnalyseSerializer`` : les listes n'ont jamais besoin
+  de l'image pleine taille. Volumes 3D (NIfTI, .npy) : ``{"source": nom}`` seul.
+"""
+import hashlib
+import io
+import logging
+import posixpath
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Q
+from PIL import Image
+
+from .models import Analyse
+from .volumes import is_volume_name
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = Analyse.DERIVATIVE_SOURCES
+DERIVATIVE_SIZES = getattr(settings, "IMAGE_DERIVATIVE_SIZES", {"thumb": 256, "medium": 1024})
+QUALITY = getattr(settings, "IMAGE_DERIVATIVE_QUALITY", 80)
+WORKERS = getattr(settings, "IMAGE_DERIVATIVE_WORKERS", 2)
+
+
+def derivative_name(source_name, digest, label):
+    # Nom ne dépendant que du contenu : les uploads identiques partagent leurs dérivées
+    return posixpath.join(posixpath.dirname(source_name), f"{digest[:32]}.{label}.webp")
+
+
+# ---- Process du pool ----
+def to_8bit(image):
+    # IRM en 16 bits / flottant : normalisation min-max vers 0-255
+    if image.mode in ("I;16", "I;16B", "I", "F"):
+        pixels = np.asarray(image, dtype=np.float32)
+        low, high = float(pixels.min()), float(pixels.max())
+        scaled = (pixels - low) * (255.0 / (high - low)) if high > low else np.zeros_like(pixels)
+        return Image.fromarray(scaled.astype(np.uint8))
+    if image.mode not in ("L", "RGB", "RGBA"):
+        return image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    return image
+
+
+def render_derivatives(data, sizes=None, quality=None):
+    """Octets de l'image source -> ``{label: octets WebP}``."""
+    sizes = sizes or DERIVATIVE_SIZES
+    quality = quality or QUALITY
+    rendered = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image = to_8bit(image)
+        for label, max_side in sizes.items():
+            copy = image.copy()
+            copy.thumbnail((max_side, max_side), Image.LANCZOS)
+            buffer = io.BytesIO()
+            copy.save(buffer, "WEBP", quality=quality, method=4)
+            rendered[label] = buffer.getvalue()
+    return rendered
+
+
+# ---- Worker ----
+def make_pool(workers=None):
+    # Pas de connexion DB partagée entre le worker et les process forkés
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=workers or WORKERS)
+
+
+def _save_derivatives(analyse, field, rendered, digest):
+    source = getattr(analyse, field)
+    names = {"source": source.name}
+    for label, content in rendered.items():
+        name = derivative_name(source.name, digest, label)
+        if not source.storage.exists(name):
+            # Le stockage peut renommer en cas de course entre deux workers
+            name = source.storage.save(name, ContentFile(content))
+        names[label] = name
+    return names
+
+
+def build_derivatives(pool, limit):
+    """Génère les dérivées d'au plus ``limit`` analyses en attente. Renvoie le nombre traité."""
+    analyses = list(
+        Analyse.objects.filter(derivatives_pending=True)
+        .only("id", "derivatives", *IMAGE_FIELDS)
+        .order_by("id")[:limit]
+    )
+    if not analyses:
+        return 0
+
+    futures = {}
+    for analyse in analyses:
+        outdated = analyse.outdated_derivatives()
+        analyse.derivatives = {
+            field: names for field, names in (analyse.derivatives or {}).items()
+            if field not in outdated
+        }
+        for field in outdated:
+            source = getattr(analyse, field)
+            if not source:
+                continue
+            # Volumes 3D : coupes servies par api/volumes.py ; source notée sans
+            # dérivées pour ne plus être vue comme obsolète au prochain save()
+            if is_volume_name(source.name):
+                analyse.derivatives[field] = {"source": source.name}
+                continue
+            try:
+                with source.open("rb"):
+                    data = source.read()
+            except OSError as e:
+                logger.warning("Analyse %s: cannot read %s (%s)", analyse.pk, source.name, e)
+                analyse.derivatives[field] = {"source": source.name, "error": str(e)}
+                continue
+            digest = hashlib.sha256(data).hexdigest()
+            futures[pool.submit(render_derivatives, data)] = (analyse, field, digest)
+
+    for future in as_completed(futures):
+        analyse, field, digest = futures[future]
+        try:
+            analyse.derivatives[field] = _save_derivatives(analyse, field, future.result(), digest)
+        except Exception as e:
+            # Image illisible : notée pour ne pas la retraiter en boucle
+            logger.warning("Analyse %s: derivatives of %s failed (%s)", analyse.pk, field, e)
+            analyse.derivatives[field] = {"source": getattr(analyse, field).name, "error": str(e)}
+
+    for analyse in analyses:
+        # Conditionnel : si une image a encore changé, l'analyse reste en attente
+        unchanged = Q(pk=analyse.pk)
+        for field in IMAGE_FIELDS:
+            name = getattr(analyse, field).name
+            unchanged &= Q(**{field: name}) if name else Q(**{f"{field}__isnull": True}) | Q(**{field: ""})
+        Analyse.objects.filter(unchanged).update(derivatives=analyse.derivatives, derivatives_pending=False)
+
+    return len(analyses)
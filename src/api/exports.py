@@ -0,0 +1,221 @@
+# backend/api/exports.py
+"""
+Export pseudonymisé des analyses pour la recherche (CSV ou Parquet).
+
+- Les lignes sont lues avec ``values_list().iterator(chunk_size=...)`` et
+  écrites au fil de l'eau : CSV par blocs de texte (``StreamingHttpResponse``),
+  Parquet par row groups de ``EXPORT_ROW_GROUP_SIZE`` lignes. La mémoire ne
+  dépend pas de la taille de l'export.
+- Aucun nom, e-mail ni numéro de dossier n'est exporté : patient, médecin et
+  analyse sont remplacés par un HMAC-SHA256 (clé ``EXPORT_PSEUDONYM_KEY``),
+  stable d'un export à l'autre tant que la clé ne change pas. Sans clé dédiée
+  (jamais ``SECRET_KEY``), l'export est refusé : ``ImproperlyConfigured``.
+- ``probabilities`` et ``biomarkers`` sont aplatis en colonnes
+  ``prob:<classe>`` et ``marker:<nom>`` ; l'en-tête est fixé par une première
+  passe qui ne lit que les noms.
+"""
+import csv
+import hashlib
+import hmac
+import io
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cohorts import MARKER_PREFIX, biomarker_dict
+from .fields import decode_vector
+
+
+CHUNK_SIZE = getattr(settings, "EXPORT_CHUNK_SIZE", 2000)
+ROW_GROUP_SIZE = getattr(settings, "EXPORT_ROW_GROUP_SIZE", 50000)
+CSV_BUFFER_SIZE = 64 * 1024
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+PROBABILITY_PREFIX = "prob:"
+BASE_COLUMNS = ("patient", "doctor", "analysis", "date", "type_analyse", "maladie", "result", "confidence")
+ROW_FIELDS = (
+    "id", "patient__num_dossier", "doctor__user__email", "date",
+    "type_analyse", "maladie", "result", "confidence", "biomarkers", "probabilities",
+)
+
+
+class ExportError(Exception):
+    pass
+
+
+def pseudonym_key():
+    """Clé HMAC dédiée ; ImproperlyConfigured si ``EXPORT_PSEUDONYM_KEY`` n'est pas définie."""
+    key = getattr(settings, "EXPORT_PSEUDONYM_KEY", "")
+    if not key:
+        raise ImproperlyConfigured("EXPORT_PSEUDONYM_KEY must be set to export analyses")
+    return key.encode()
+
+
+def pseudonym(kind, value, key=None):
+    """HMAC-SHA256 tronqué (128 bits) ; ``kind`` sépare les espaces de noms."""
+    if value is None:
+        return None
+    return hmac.digest(key or pseudonym_key(), f"{kind}:{value}".encode(), hashlib.sha256)[:16].hex()
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _probabilities(raw):
+    if raw is None:
+        return {}
+    decoded = decode_vector(raw)
+    return decoded if isinstance(decoded, dict) else {}
+
+
+# ---- Colonnes ----
+def discover_columns(queryset, chunk_size=None):
+    """Noms de classes et de biomarqueurs présents (première passe, noms seuls)."""
+    probability_names, marker_names = set(), set()
+    rows = queryset.order_by().values_list("biomarkers", "probabilities").iterator(
+        chunk_size=chunk_size or CHUNK_SIZE
+    )
+    for biomarkers, probabilities in rows:
+        marker_names.update(biomarker_dict(biomarkers))
+        if probabilities is not None:
+            # Noms seuls : pas de conversion des scores
+            names = decode_vector(probabilities, as_numpy=True)
+            if isinstance(names, tuple):
+                probability_names.update(names[0])
+            elif isinstance(names, dict):
+                probability_names.update(names)
+    return sorted(probability_names), sorted(marker_names)
+
+
+def header(probability_names, marker_names):
+    return [
+        *BASE_COLUMNS,
+        *(PROBABILITY_PREFIX + name for name in probability_names),
+        *(MARKER_PREFIX + name for name in marker_names),
+    ]
+
+
+def iter_rows(queryset, probability_names, marker_names, chunk_size=None):
+    """Une liste de valeurs par analyse, dans l'ordre de ``header()``."""
+    key = pseudonym_key()
+    rows = queryset.order_by("id").values_list(*ROW_FIELDS).iterator(chunk_size=chunk_size or CHUNK_SIZE)
+    for pk, num_dossier, doctor_email, day, type_analyse, maladie, result, confidence, biomarkers, probabilities in rows:
+        scores = _probabilities(probabilities)
+        markers = biomarker_dict(biomarkers)
+        yield [
+            pseudonym("patient", num_dossier, key),
+            pseudonym("doctor", doctor_email, key),
+            pseudonym("analyse", pk, key),
+            day, type_analyse, maladie, result, confidence,
+            *(scores.get(name) for name in probability_names),
+            # Valeurs non numériques : vides
+            *(_number(markers.get(name)) for name in marker_names),
+        ]
+
+
+# ---- CSV ----
+def stream_csv(queryset, chunk_size=None):
+    """Générateur de blocs de texte CSV (~64 Kio)."""
+    probability_names, marker_names = discover_columns(queryset, chunk_size)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header(probability_names, marker_names))
+    for row in iter_rows(queryset, probability_names, marker_names, chunk_size):
+        writer.writerow(row)
+        if buffer.tell() >= CSV_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# ---- Parquet ----
+def parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ByteSink(io.RawIOBase):
+    """Fichier en écriture seule dont on récupère les octets écrits au fur et à mesure."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def parquet_schema(probability_names, marker_names):
+    import pyarrow as pa
+
+    return pa.schema([
+        ("patient", pa.string()), ("doctor", pa.string()), ("analysis", pa.string()),
+        ("date", pa.date32()), ("type_analyse", pa.string()), ("maladie", pa.string()),
+        ("result", pa.string()), ("confidence", pa.float64()),
+        *((PROBABILITY_PREFIX + name, pa.float64()) for name in probability_names),
+        *((MARKER_PREFIX + name, pa.float64()) for name in marker_names),
+    ])
+
+
+def stream_parquet(queryset, chunk_size=None, row_group_size=None):
+    """Générateur d'octets Parquet : un row group par ``row_group_size`` lignes."""
+    if not parquet_available():
+        raise ExportError("Parquet export requires pyarrow")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    row_group_size = row_group_size or ROW_GROUP_SIZE
+    probability_names, marker_names = discover_columns(queryset, chunk_size)
+    schema = parquet_schema(probability_names, marker_names)
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def write_group(rows):
+        columns = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+        writer.write_table(pa.Table.from_arrays(columns, schema=schema), row_group_size=len(rows))
+
+    rows = []
+    for row in iter_rows(queryset, probability_names, marker_names, chunk_size):
+        rows.append(row)
+        if len(rows) >= row_group_size:
+            write_group(rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        write_group(rows)
+    writer.close()
+    yield sink.drain()
+
+
+def stream_export(queryset, output, chunk_size=None):
+    # Vérifiée avant le premier octet : les générateurs ne s'exécutent qu'à la lecture
+    pseudonym_key()
+    if output == "csv":
+        return stream_csv(queryset, chunk_size)
+    if output == "parquet":
+        return stream_parquet(queryset, chunk_size)
+    raise ExportError(f"output must be one of {', '.join(FORMATS)}")
@@ -0,0 +1,224 @@
+# backend/api/fields.py
+"""
+``CompactVectorField`` : vecteurs de scores (probabilités, valeurs SHAP)
+stockés en binaire compressé au lieu de texte JSON.
+
+Format : ``MAGIC`` + type (1 octet) + contenu
+    longueur des noms (uint32) + noms (JSON utf-8) + valeurs float32 little-endian
+- type 1 : dict ``{nom: valeur}`` (les noms sont l'en-tête)
+- type 0 : liste de valeurs
+- type 2 : autre JSON (valeurs non numériques, imbriquées...)
+- bit ``COMPRESSED`` du type : contenu zlib (seulement s'il est plus court,
+  les petits vecteurs de probabilités restent bruts)
+
+La valeur lue en base reste binaire jusqu'au premier accès à l'attribut :
+les requêtes qui ne s'en servent pas ne paient pas le décodage.
+``values()`` / ``values_list()`` renvoient le binaire brut (``decode_vector``).
+"""
+import json
+import struct
+import zlib
+
+import numpy as np
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+
+MAGIC = b"CV1"
+KIND_LIST, KIND_DICT, KIND_JSON = 0, 1, 2
+COMPRESSED = 0x80
+SMALL_VECTOR = 32  # en dessous, le décodage en Python pur est plus rapide que NumPy
+_NAMES_LENGTH = struct.Struct("<I")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def encode_vector(value):
+    if value is None:
+        return None
+    if isinstance(value, dict) and all(_is_number(v) for v in value.values()):
+        kind, names, values = KIND_DICT, [str(k) for k in value], list(value.values())
+    elif isinstance(value, (list, tuple)) and all(_is_number(v) for v in value):
+        kind, names, values = KIND_LIST, [], list(value)
+    else:
+        return _pack(KIND_JSON, json.dumps(value, separators=(",", ":")).encode())
+
+    names_blob = json.dumps(names, separators=(",", ":")).encode() if names else b""
+    payload = (
+        _NAMES_LENGTH.pack(len(names_blob))
+        + names_blob
+        + np.asarray(values, dtype="<f4").tobytes()
+    )
+    return _pack(kind, payload)
+
+
+def _pack(kind, payload):
+    compressed = zlib.compress(payload)
+    if len(compressed) < len(payload):
+        return MAGIC + bytes([kind | COMPRESSED]) + compressed
+    return MAGIC + bytes([kind]) + payload
+
+
+def _to_python_floats(values):
+    # float32 -> float arrondi à 7 chiffres significatifs : 0.5322 et non 0.5321999788...
+    if len(values) <= SMALL_VECTOR:
+        return [float("%.7g" % value) for value in values.tolist()]
+    values = values.astype(np.float64)
+    regular = np.isfinite(values) & (values != 0)
+    magnitude = np.floor(np.log10(np.abs(values, where=regular, out=np.ones_like(values))))
+    scale = 10.0 ** (6 - magnitude)
+    return np.where(regular, np.round(values * scale) / scale, values).tolist()
+
+
+def decode_vector(raw, as_numpy=False):
+    """
+    Décode un vecteur. ``as_numpy`` : ``(noms, np.ndarray float32)`` pour les
+    vecteurs numériques, sans conversion en objets Python.
+    """
+    if raw is None:
+        return None
+    raw = bytes(raw)
+    if not raw.startswith(MAGIC):
+        raise ValueError("Not a compact vector")
+    kind = raw[len(MAGIC)]
+    payload = raw[len(MAGIC) + 1:]
+    if kind & COMPRESSED:
+        kind &= ~COMPRESSED
+        payload = zlib.decompress(payload)
+    if kind == KIND_JSON:
+        return json.loads(payload)
+
+    (names_length,) = _NAMES_LENGTH.unpack_from(payload)
+    offset = _NAMES_LENGTH.size
+    names = json.loads(payload[offset:offset + names_length]) if names_length else []
+    values = np.frombuffer(payload, dtype="<f4", offset=offset + names_length)
+    if as_numpy:
+        return names, values
+
+    values = _to_python_floats(values)
+    if kind == KIND_DICT:
+        return dict(zip(names, values))
+    return values
+
+
+def decode_vectors(raws):
+    """
+    Décode un lot de vecteurs ``{nom: valeur}`` en matrices : renvoie
+    ``[(positions, noms, np.ndarray float32 (n, k))]``, une entrée par jeu de
+    noms. Les vecteurs non compressés de même longueur sont concaténés et lus
+    d'un seul ``np.frombuffer`` ; les autres (compressés, listes, JSON) sont
+    décodés un à un. Les valeurs None sont ignorées.
+    """
+    raws = np.asarray(raws, dtype=object)
+    positions = np.flatnonzero(raws != None)  # noqa: E711 (comparaison élément par élément)
+    blobs = raws[positions].tolist()
+    lengths = np.fromiter(map(len, blobs), dtype=np.int64, count=len(blobs))
+
+    groups, others = {}, []
+    header_size = len(MAGIC) + 1 + _NAMES_LENGTH.size
+    distinct = np.unique(lengths).tolist()
+    for length in distinct:
+        rows = np.flatnonzero(lengths == length) if len(distinct) > 1 else np.arange(len(blobs))
+        if length < header_size:
+            others.extend(rows.tolist())
+            continue
+        # Vecteurs de même longueur bout à bout : une matrice d'octets (n, longueur)
+        joined = b"".join(map(blobs.__getitem__, rows.tolist())) if len(distinct) > 1 else b"".join(blobs)
+        matrix = np.frombuffer(joined, dtype=np.uint8).reshape(-1, length)
+        names_length = np.ascontiguousarray(matrix[:, len(MAGIC) + 1:header_size]).view("<u4").ravel()
+        header = header_size + names_length.astype(np.int64)
+        valid = (
+            (matrix[:, :len(MAGIC)] == np.frombuffer(MAGIC, dtype=np.uint8)).all(axis=1)
+            & (matrix[:, len(MAGIC)] == KIND_DICT)
+            & (header <= length) & ((length - header) % 4 == 0)
+        )
+        others.extend(rows[~valid].tolist())
+        rows, matrix, header = rows[valid], matrix[valid], header[valid]
+
+        for size in np.unique(header).tolist():
+            selected = header == size
+            block, block_rows = matrix[selected], rows[selected]
+            # En-têtes identiques = mêmes noms : regroupés sans les décoder ligne à ligne
+            prefixes = np.ascontiguousarray(block[:, :size]).view(f"V{size}").ravel()
+            if (prefixes == prefixes[0]).all():
+                unique, inverse = prefixes[:1], np.zeros(len(prefixes), dtype=np.intp)
+            else:
+                unique, inverse = np.unique(prefixes, return_inverse=True)
+                inverse = inverse.ravel()
+            values = np.ascontiguousarray(block[:, size:]).view("<f4")
+            for index, prefix in enumerate(unique):
+                names = tuple(json.loads(prefix.tobytes()[header_size:] or b"[]"))
+                selected = inverse == index
+                groups.setdefault(names, []).append((positions[block_rows[selected]], values[selected]))
+
+    for row in others:
+        decoded = decode_vector(blobs[row], as_numpy=True)
+        if isinstance(decoded, tuple) and decoded[0]:
+            names, values = decoded
+            groups.setdefault(tuple(names), []).append((positions[[row]], values.reshape(1, -1)))
+
+    return [
+        (np.concatenate([p for p, _ in parts]), list(names), np.vstack([v for _, v in parts]))
+        for names, parts in groups.items() if names
+    ]
+
+
+class LazyVectorDescriptor(DeferredAttribute):
+    """Décode la valeur binaire au premier accès, puis la garde sur l'instance."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if isinstance(value, (bytes, memoryview)):
+            value = decode_vector(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Descripteur "data" : prioritaire sur instance.__dict__
+        instance.__dict__[self.field.attname] = value
+
+
+class CompactVectorField(models.BinaryField):
+    """Dict ``{nom: score}`` ou liste de scores, stocké en float32 compressé."""
+    descriptor_class = LazyVectorDescriptor
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("editable", True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if kwargs.get("editable") is True:
+            del kwargs["editable"]
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        # memoryview (PostgreSQL) : copie pour survivre au curseur, décodage différé
+        return bytes(value) if value is not None else None
+
+    def get_prep_value(self, value):
+        if isinstance(value, (bytes, memoryview)) or value is None:
+            return value
+        return encode_vector(value)
+
+    def to_python(self, value):
+        if isinstance(value, (bytes, memoryview)):
+            return decode_vector(value)
+        if isinstance(value, str):
+            try:
+                return json.loads(value)
+            except ValueError:
+                raise ValidationError("Enter a valid JSON value.", code="invalid")
+        return value
+
+    def value_to_string(self, obj):
+        return json.dumps(self.value_from_object(obj))
+
+    def formfield(self, **kwargs):
+        return super().formfield(**{"form_class": forms.JSONField, **kwargs})
@@ -0,0 +1,263 @@
+# backend/api/inference.py
+"""
+Pipeline d'inférence asynchrone des analyses.
+
+- La création d'une ``Analyse`` sans résultat crée un ``InferenceJob``
+  (signal post_save, même transaction).
+- ``manage.py run_inference_worker`` réclame les jobs en attente par LOTS d'un
+  même ``type_analyse`` (au plus ``INFERENCE_BATCH_SIZE`` jobs, en attendant au
+  plus ``INFERENCE_BATCH_MAX_WAIT`` secondes qu'un lot se remplisse). Chaque lot
+  est un seul appel ``predict_batch`` dans un pool de PROCESS (les modèles CPU
+  ne bloquent pas le GIL du worker) ; ``result``, ``confidence``,
+  ``probabilities``, ``shap_values`` et ``heatmap_img`` sont réécrits en un
+  seul ``bulk_update``.
+- Un job resté ``running`` plus de ``INFERENCE_JOB_TIMEOUT`` secondes (worker
+  arrêté après la réclamation) est remis en file, ou passe à ``failed`` après
+  ``INFERENCE_MAX_ATTEMPTS`` essais.
+- Le modèle est choisi par ``settings.INFERENCE_PREDICTOR`` (api/predictors.py).
+- Une entrée déjà calculée (même contenu, même version du modèle) reprend le
+  résultat du cache sans passer par la file (api/inference_cache.py).
+- L'importance SHAP globale suit les résultats (api/shap_importance.py).
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import inference_cache, shap_importance
+from .models import Analyse, InferenceJob
+from .predictors import load_predictor, predictor_version
+
+logger = logging.getLogger(__name__)
+
+PREDICTOR_PATH = getattr(settings, "INFERENCE_PREDICTOR", "api.predictors.StubPredictor")
+WORKERS = getattr(settings, "INFERENCE_WORKERS", 2)
+MAX_ATTEMPTS = getattr(settings, "INFERENCE_MAX_ATTEMPTS", 3)
+JOB_TIMEOUT = getattr(settings, "INFERENCE_JOB_TIMEOUT", 600)
+BATCH_SIZE = getattr(settings, "INFERENCE_BATCH_SIZE", 32)
+BATCH_MAX_WAIT = getattr(settings, "INFERENCE_BATCH_MAX_WAIT", 0.5)
+
+RESULT_FIELDS = ["result", "confidence", "probabilities", "shap_values"]
+
+
+def enqueue_inference(analyse):
+    if not inference_cache.is_enabled():
+        return InferenceJob.objects.create(analyse=analyse)
+
+    model_version = predictor_version(PREDICTOR_PATH)
+    key = inference_cache.input_hash(analyse, model_version)
+    entry = inference_cache.lookup(key)
+    if entry is None:
+        return InferenceJob.objects.create(analyse=analyse, input_hash=key, model_version=model_version)
+
+    inference_cache.apply_cached(analyse, entry)
+    now = timezone.now()
+    return InferenceJob.objects.create(
+        analyse=analyse, input_hash=key, model_version=entry.model_version,
+        status="done", progress=100, started_at=now, finished_at=now,
+    )
+
+
+def claim_jobs(limit, type_analyse=None):
+    """Passe jusqu'à ``limit`` jobs en attente à ``running`` (skip_locked : plusieurs workers possibles)."""
+    queued = InferenceJob.objects.filter(status="queued")
+    if type_analyse is not None:
+        queued = queued.filter(analyse__type_analyse=type_analyse)
+    with transaction.atomic():
+        jobs = list(
+            queued.select_for_update(skip_locked=True, of=("self",))
+            .order_by("created_at", "id")[:limit]
+        )
+        if jobs:
+            InferenceJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status="running", progress=10, started_at=timezone.now(), attempts=F("attempts") + 1,
+            )
+    return jobs
+
+
+def requeue_stale_jobs(timeout=None):
+    """
+    Jobs ``running`` réclamés il y a plus de ``timeout`` secondes (worker
+    arrêté en cours de lot) : remis en file tant que ``attempts`` (compté à la
+    réclamation) le permet, sinon ``failed``. Renvoie ``(remis en file, échoués)``.
+    """
+    timeout = JOB_TIMEOUT if timeout is None else timeout
+    now = timezone.now()
+    stale = InferenceJob.objects.filter(status="running", started_at__lt=now - timedelta(seconds=timeout))
+    error = f"Worker timeout ({timeout} s)"
+    failed = stale.filter(attempts__gte=MAX_ATTEMPTS).update(
+        status="failed", progress=0, error=error, finished_at=now,
+    )
+    requeued = stale.filter(attempts__lt=MAX_ATTEMPTS).update(status="queued", progress=0, error=error)
+    if requeued or failed:
+        logger.warning("Stale inference jobs: %s requeued, %s failed", requeued, failed)
+    return requeued, failed
+
+
+def claim_batch(max_size=None, max_wait=None):
+    """
+    Réclame un lot de jobs du même ``type_analyse`` que le plus ancien job en
+    attente. Un lot incomplet n'est réclamé qu'après ``max_wait`` secondes
+    d'attente de ce job (les arrivées suivantes complètent le lot).
+    """
+    max_size = max_size or BATCH_SIZE
+    max_wait = BATCH_MAX_WAIT if max_wait is None else max_wait
+
+    oldest = (
+        InferenceJob.objects.filter(status="queued")
+        .order_by("created_at", "id")
+        .values("analyse__type_analyse", "created_at")
+        .first()
+    )
+    if oldest is None:
+        return []
+
+    type_analyse = oldest["analyse__type_analyse"]
+    waited = (timezone.now() - oldest["created_at"]).total_seconds()
+    if waited < max_wait:
+        queued = InferenceJob.objects.filter(status="queued", analyse__type_analyse=type_analyse)
+        if queued[:max_size].count() < max_size:
+            return []
+    return claim_jobs(max_size, type_analyse=type_analyse)
+
+
+def build_inputs(analyse):
+    """Entrée sérialisable (picklable) d'une prédiction, sans objet Django."""
+    irm_path = None
+    if analyse.irm_original:
+        try:
+            irm_path = analyse.irm_original.path
+        except NotImplementedError:
+            # Stockage distant : le prédicteur n'a pas d'accès disque
+            irm_path = None
+    return {
+        "analyse_id": analyse.pk,
+        "type_analyse": analyse.type_analyse,
+        "maladie": analyse.maladie,
+        "irm_path": irm_path,
+        "biomarkers": analyse.biomarkers,
+    }
+
+
+def apply_predictions(jobs, analyses, outputs, model_version):
+    """Réécrit les sorties d'un lot : un bulk_update des analyses, un UPDATE des jobs."""
+    update_fields = [*RESULT_FIELDS, *Analyse.TRIAGE_FIELDS]
+    # bulk_update ne passe pas par les signaux : importance SHAP mise à jour ici
+    previous = [shap_importance.analyse_contribution(analyse) for analyse in analyses]
+    for analyse, output in zip(analyses, outputs):
+        for field in RESULT_FIELDS:
+            setattr(analyse, field, output.get(field))
+        analyse.update_triage_fields()
+        if output.get("heatmap_png"):
+            analyse.heatmap_img.save(f"heatmap_{analyse.pk}.png", ContentFile(output["heatmap_png"]), save=False)
+            # bulk_update ne passe pas par Analyse.save() : dérivées à régénérer
+            analyse.derivatives = {
+                field: names for field, names in (analyse.derivatives or {}).items()
+                if field != "heatmap_img"
+            }
+            analyse.derivatives_pending = True
+            if "heatmap_img" not in update_fields:
+                update_fields.extend(["heatmap_img", "derivatives", "derivatives_pending"])
+
+    with transaction.atomic():
+        Analyse.objects.bulk_update(analyses, update_fields)
+        shap_importance.record_changes(
+            zip(previous, [shap_importance.analyse_contribution(analyse) for analyse in analyses])
+        )
+        InferenceJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            status="done", progress=100, model_version=model_version, error=None,
+            finished_at=timezone.now(),
+        )
+        # La clé n'est valable que pour la version avec laquelle elle a été calculée
+        inference_cache.store(
+            {
+                job.input_hash: analyse
+                for job, analyse in zip(jobs, analyses)
+                if job.input_hash and job.model_version == model_version
+            },
+            model_version,
+        )
+
+
+def fail_job(job, error):
+    logger.warning("Inference job %s failed: %s", job.pk, error)
+    # Replanifié tant que le nombre d'essais le permet
+    status = "queued" if job.attempts + 1 < MAX_ATTEMPTS else "failed"
+    InferenceJob.objects.filter(pk=job.pk).update(
+        status=status, progress=0, error=str(error), finished_at=timezone.now(),
+    )
+
+
+# ---- Process du pool ----
+_predictor = None
+
+
+def _init_process(predictor_path):
+    global _predictor
+    _predictor = load_predictor(predictor_path)
+
+
+def _predict_batch(batch):
+    # Un seul passage du modèle pour tout le lot
+    return _predictor.predict_batch(batch), _predictor.version
+
+
+# ---- Worker ----
+def make_pool(workers=None, predictor_path=None):
+    # Pas de connexion DB partagée entre le worker et les process forkés
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers=workers or WORKERS,
+        initializer=_init_process,
+        initargs=(predictor_path or PREDICTOR_PATH,),
+    )
+
+
+def process_batches(pool, batch_size=None, max_wait=None, max_batches=None):
+    """
+    Réclame jusqu'à ``max_batches`` lots (un par process du pool), les calcule
+    en parallèle et enregistre les résultats. Renvoie le nombre de jobs traités.
+    """
+    requeue_stale_jobs()
+    futures = {}
+    for _ in range(max_batches or WORKERS):
+        jobs = claim_batch(batch_size, max_wait)
+        if not jobs:
+            break
+
+        analyses = Analyse.objects.in_bulk([job.analyse_id for job in jobs])
+        batch = []
+        for job in jobs:
+            analyse = analyses.get(job.analyse_id)
+            if analyse is None:
+                fail_job(job, "Analyse supprimée")
+                continue
+            batch.append((job, analyse))
+        if not batch:
+            continue
+
+        future = pool.submit(_predict_batch, [build_inputs(analyse) for _, analyse in batch])
+        futures[future] = batch
+        InferenceJob.objects.filter(pk__in=[job.pk for job, _ in batch]).update(progress=50)
+
+    processed = 0
+    for future in as_completed(futures):
+        batch = futures[future]
+        jobs = [job for job, _ in batch]
+        try:
+            outputs, model_version = future.result()
+            if len(outputs) != len(batch):
+                raise ValueError(f"{len(outputs)} sortie(s) pour un lot de {len(batch)}")
+            apply_predictions(jobs, [analyse for _, analyse in batch], outputs, model_version)
+        except Exception as e:
+            for job in jobs:
+                fail_job(job, e)
+        processed += len(batch)
+        logger.info("Inference batch: %s x %s", len(batch), batch[0][1].type_analyse)
+
+    return processed
@@ -0,0 +1,151 @@
+# backend/api/inference_cache.py
+"""
+Cache des résultats d'inférence par empreinte du contenu.
+
+Une IRM ré-envoyée ou des biomarqueurs identiques donnent la même clé :
+sha256(version du modèle, type_analyse, maladie, biomarqueurs en JSON
+canonique, empreinte par blocs de ``irm_original`` -- cf. api/uploads.py).
+Une nouvelle analyse dont la clé est connue reprend immédiatement ``result``,
+``confidence``, ``probabilities``, ``shap_values`` et ``heatmap_img`` sans
+passer par le worker.
+
+- Taille bornée par ``INFERENCE_CACHE_MAX_ENTRIES`` (0 : cache désactivé),
+  éviction des entrées les moins récemment utilisées.
+- Succès / échecs / évictions comptés par jour (``InferenceCacheStats``).
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import InferenceCacheStats, InferenceResultCache
+from .uploads import file_digest
+
+
+MAX_ENTRIES = getattr(settings, "INFERENCE_CACHE_MAX_ENTRIES", 10000)
+CACHED_FIELDS = ["result", "confidence", "probabilities", "shap_values"]
+
+
+def is_enabled():
+    return MAX_ENTRIES > 0
+
+
+def _canonical(value):
+    # 1 et 1.0 désignent la même mesure
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    return value
+
+
+def input_hash(analyse, model_version):
+    payload = json.dumps(
+        [model_version, analyse.type_analyse, analyse.maladie, _canonical(analyse.biomarkers)],
+        sort_keys=True, separators=(",", ":"), default=str,
+    ).encode()
+    digest = hashlib.sha256(payload)
+    if analyse.irm_original:
+        digest.update(b"\0irm\0")
+        digest.update(irm_digest(analyse).encode())
+    return digest.hexdigest()
+
+
+def irm_digest(analyse):
+    # Déjà calculée pendant un upload reprenable (api/uploads.py)
+    known = getattr(analyse, "_irm_digest", None)
+    if known:
+        return known
+    with analyse.irm_original.open("rb") as f:
+        return file_digest(f)
+
+
+def record_stat(field, count=1):
+    if not count:
+        return
+    today = timezone.now().date()
+    stats = InferenceCacheStats.objects.filter(day=today)
+    if stats.update(**{field: F(field) + count}):
+        return
+    try:
+        with transaction.atomic():
+            InferenceCacheStats.objects.create(day=today, **{field: count})
+    except IntegrityError:
+        # Créé entre-temps par un autre process
+        stats.update(**{field: F(field) + count})
+
+
+def lookup(key):
+    """Entrée du cache pour ``key`` (marquée comme utilisée), ou None."""
+    entry = InferenceResultCache.objects.filter(pk=key).first()
+    if entry is None:
+        record_stat("misses")
+        return None
+    InferenceResultCache.objects.filter(pk=key).update(hits=F("hits") + 1, last_used_at=timezone.now())
+    record_stat("hits")
+    return entry
+
+
+def apply_cached(analyse, entry):
+    update_fields = list(CACHED_FIELDS)
+    for field in CACHED_FIELDS:
+        setattr(analyse, field, getattr(entry, field))
+    if entry.heatmap_img:
+        analyse.heatmap_img.name = entry.heatmap_img
+        update_fields.append("heatmap_img")
+    analyse.save(update_fields=update_fields)
+
+
+def store(analyses_by_key, model_version):
+    """Enregistre les sorties calculées : ``{clé: analyse}`` déjà mises à jour."""
+    if not analyses_by_key:
+        return
+    now = timezone.now()
+    InferenceResultCache.objects.bulk_create(
+        [
+            InferenceResultCache(
+                key=key,
+                model_version=model_version,
+                heatmap_img=analyse.heatmap_img.name or None,
+                last_used_at=now,
+                **{field: getattr(analyse, field) for field in CACHED_FIELDS},
+            )
+            for key, analyse in analyses_by_key.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["key"],
+        update_fields=["model_version", "heatmap_img", "last_used_at", *CACHED_FIELDS],
+    )
+    evict()
+
+
+def evict(max_entries=None):
+    """Supprime les entrées au-delà de ``max_entries``, les moins récemment utilisées d'abord."""
+    max_entries = MAX_ENTRIES if max_entries is None else max_entries
+    stale = list(
+        InferenceResultCache.objects.order_by("-last_used_at", "-key")
+        .values_list("pk", flat=True)[max_entries:]
+    )
+    if stale:
+        InferenceResultCache.objects.filter(pk__in=stale).delete()
+        record_stat("evictions", len(stale))
+    return len(stale)
+
+
+def cache_stats(since=None):
+    rows = InferenceCacheStats.objects.all()
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    totals = rows.aggregate(hits=Sum("hits"), misses=Sum("misses"), evictions=Sum("evictions"))
+    totals = {name: value or 0 for name, value in totals.items()}
+    lookups = totals["hits"] + totals["misses"]
+    totals["hit_rate"] = round(totals["hits"] / lookups, 4) if lookups else None
+    totals["entries"] = InferenceResultCache.objects.count()
+    return totals
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from api.biomarkers import BACKFILL_CHUNK_SIZE, backfill_biomarkers
+
+
+class Command(BaseCommand):
+    help = "Remplit la table BiomarkerValue depuis Analyse.biomarkers, par lots (reprenable avec --after)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=BACKFILL_CHUNK_SIZE, help="Analyses par lot.")
+        parser.add_argument("--after", type=int, default=0, help="Reprendre après cet id d'analyse.")
+
+    def handle(self, *args, **options):
+        chunks = values = 0
+        last_id = options["after"]
+        for last_id, written in backfill_biomarkers(options["chunk_size"], options["after"]):
+            chunks += 1
+            values += written
+            if chunks % 50 == 0:
+                self.stdout.write(f"🧪 ... id {last_id}, {values:,} valeurs")
+        self.stdout.write(self.style.SUCCESS(f"{values:,} biomarqueur(s) écrit(s), dernier id {last_id}"))
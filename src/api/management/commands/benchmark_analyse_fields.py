@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import PatientProfile
+from api.views import PatientAnalysesView
+
+
+class Command(BaseCommand):
+    help = "Compare taille et latence de patients/<id>/analyses/ en vue complète, résumée ou ?fields=."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--min-analyses", type=int, default=200, help="Patients avec au moins N analyses.")
+        parser.add_argument("--patients", type=int, default=5, help="Nombre de patients mesurés.")
+        parser.add_argument("--page-size", type=int, default=200)
+        parser.add_argument("--fields", default="id,date,result", help="Liste pour la variante ?fields=.")
+
+    def handle(self, *args, **options):
+        patients = list(
+            PatientProfile.objects.filter(doctor__isnull=False)
+            .annotate(total=Count("analyses"))
+            .filter(total__gte=options["min_analyses"])
+            .select_related("doctor__user")
+            .order_by("-total")[:options["patients"]]
+        )
+        if not patients:
+            self.stdout.write(f"⚠️ Aucun patient avec {options['min_analyses']}+ analyses")
+            return
+
+        variants = {
+            "full": {},
+            "summary": {"view": "summary"},
+            f"fields={options['fields']}": {"fields": options["fields"]},
+        }
+        factory = APIRequestFactory()
+        view = PatientAnalysesView.as_view()
+
+        self.stdout.write(f"📊 {len(patients)} patient(s), page de {options['page_size']}")
+        baseline = None
+        for label, params in variants.items():
+            size = elapsed = query_count = 0
+            for patient in patients:
+                url = f"/api/patients/{patient.pk}/analyses/"
+                request = factory.get(url, {"page_size": options["page_size"], **params})
+                force_authenticate(request, user=patient.doctor.user)
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    response = view(request, patient_id=patient.pk)
+                    response.render()
+                    elapsed += time.perf_counter() - start
+                size += len(response.content)
+                query_count += len(queries)
+
+            baseline = baseline or (size, elapsed)
+            self.stdout.write(
+                f"  {label:<28} {size / len(patients):>10,.0f} octets ({size / baseline[0]:.0%})"
+                f"  {elapsed / len(patients) * 1e3:>8.2f} ms ({elapsed / baseline[1]:.0%})"
+                f"  {query_count / len(patients):.0f} requête(s)"
+            )
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.biomarkers import backfill_biomarkers, filter_analyses
+from api.models import Analyse, CustomUser, PatientProfile
+
+
+MARKERS = {"abeta42": (750, 200), "tau": (300, 90), "ptau": (40, 15)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare un filtre par intervalle sur la table BiomarkerValue (index) et sur le JSON "
+        "Analyse.biomarkers, sur des analyses synthétiques (annulées en fin de mesure)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Analyses synthétiques créées.")
+        parser.add_argument("--marker", default="abeta42")
+        parser.add_argument(
+            "--max", type=float, nargs="+", default=[300, 600], help="Bornes hautes comparées : marker <= max.",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Mesures par requête (médiane).")
+
+    def handle(self, *args, **options):
+        marker = options["marker"]
+        with transaction.atomic():
+            self._seed(options["rows"])
+            for high in options["max"]:
+                self._compare(marker, high, options["repeat"])
+            # Données synthétiques : rien n'est conservé
+            transaction.set_rollback(True)
+
+    def _compare(self, marker, high, repeat):
+        variants = {
+            "JSON": Analyse.objects.filter(**{f"biomarkers__{marker}__lte": high}),
+            "BiomarkerValue": filter_analyses(Analyse.objects.all(), [(marker, None, high)]),
+        }
+        self.stdout.write(f"🔎 {marker} <= {high:g} (médiane de {repeat})")
+        for label, queryset in variants.items():
+            count = self._median(lambda: queryset.count(), repeat)
+            page = self._median(lambda: list(queryset.order_by("-id").values_list("id", flat=True)[:50]), repeat)
+            self.stdout.write(
+                f"  {label:<15} {queryset.count():>9,} analyses  "
+                f"count {count * 1000:>9.1f} ms  page de 50 {page * 1000:>8.1f} ms"
+            )
+            if connection.vendor == "postgresql":
+                for line in queryset.order_by("-id").values("id")[:50].explain().splitlines():
+                    self.stdout.write(f"      {line}")
+
+    def _seed(self, rows):
+        start = time.perf_counter()
+        user = CustomUser.objects.create_user(
+            username="benchmark-biomarkers", email="benchmark-biomarkers@example.invalid", role="patient",
+        )
+        patient = PatientProfile.objects.create(user=user, num_dossier="benchmark-biomarkers")
+        rng = np.random.default_rng(0)
+        batch = 10000
+        for offset in range(0, rows, batch):
+            size = min(batch, rows - offset)
+            columns = {name: rng.normal(mean, std, size).round(1).tolist() for name, (mean, std) in MARKERS.items()}
+            Analyse.objects.bulk_create([
+                Analyse(
+                    patient=patient, type_analyse="BIOMARKER",
+                    biomarkers={name: values[i] for name, values in columns.items()},
+                )
+                for i in range(size)
+            ])
+        seeded = time.perf_counter() - start
+
+        start = time.perf_counter()
+        written = sum(count for _, count in backfill_biomarkers(chunk_size=10000))
+        self.stdout.write(
+            f"📦 {rows:,} analyses en {seeded:.1f} s, {written:,} biomarqueurs typés "
+            f"(backfill_biomarkers) en {time.perf_counter() - start:.1f} s"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def _median(self, run, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
@@ -0,0 +1,75 @@
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from api import cohorts
+from api.fields import encode_vector
+from api.predictors import CLASSES
+
+
+MARKERS = ("abeta42", "ptau181", "ttau", "nfl")
+
+
+class Command(BaseCommand):
+    help = "Mesure les statistiques de cohorte (api/cohorts.py) : calcul à froid puis lecture en cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Nombre d'analyses synthétiques.")
+        parser.add_argument("--sections", default=",".join(cohorts.DEFAULT_SECTIONS))
+        parser.add_argument("--db", action="store_true", help="Analyses en base au lieu de lignes synthétiques.")
+
+    def handle(self, *args, **options):
+        filters, sections = cohorts.parse_params({"sections": options["sections"]})
+
+        if options["db"]:
+            cache.delete(cohorts.cache_key(filters, sections))
+            cold, analytics = self._time(lambda: cohorts.cohort_analytics(filters, sections))
+            warm, _ = self._time(lambda: cohorts.cohort_analytics(filters, sections))
+        else:
+            columns, rows = self._synthetic(options["rows"], sections)
+            self.stdout.write(f"📦 {len(rows):,} analyses synthétiques, sections : {', '.join(sections)}")
+            cold, analytics = self._time(
+                lambda: cohorts.compute_analytics(cohorts.frame_from_rows(rows, columns), sections)
+            )
+            key = cohorts.cache_key(filters, {"benchmark": len(rows), "sections": sections})
+            cache.set(key, analytics, 60)
+            warm, _ = self._time(lambda: cache.get(key))
+            cache.delete(key)
+
+        self.stdout.write(f"  {analytics['count']:,} analyses agrégées")
+        self.stdout.write(f"⏱️ à froid   {cold * 1000:>10.1f} ms")
+        self.stdout.write(f"⏱️ en cache  {warm * 1000:>10.3f} ms")
+
+    def _time(self, run):
+        start = time.perf_counter()
+        result = run()
+        return time.perf_counter() - start, result
+
+    def _synthetic(self, count, sections):
+        rng = np.random.default_rng(0)
+        maladies = np.array(list(CLASSES))[rng.integers(0, len(CLASSES), count)]
+        confidences = rng.random(count).round(4)
+        markers = rng.normal(1, 0.3, (count, len(MARKERS))).round(3)
+
+        columns = ["maladie"]
+        values = [maladies.tolist()]
+        if "classes" in sections:
+            columns.append("result")
+            values.append([CLASSES[m][i % len(CLASSES[m])] for i, m in enumerate(values[0])])
+        if "confidence" in sections:
+            columns.append("confidence")
+            values.append(confidences.tolist())
+        if "biomarkers" in sections:
+            columns.append("biomarkers")
+            values.append([dict(zip(MARKERS, row)) for row in markers.tolist()])
+        if "probabilities" in sections:
+            # Vecteurs binaires tels que stockés (CompactVectorField)
+            columns.append("probabilities")
+            scores = rng.random((count, max(map(len, CLASSES.values()))))
+            values.append([
+                encode_vector(dict(zip(CLASSES[m], (row[:len(CLASSES[m])] / row[:len(CLASSES[m])].sum()).tolist())))
+                for m, row in zip(values[0], scores)
+            ])
+        return columns, list(zip(*values))
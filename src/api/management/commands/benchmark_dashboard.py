@@ -0,0 +1,83 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.dashboard import _cache_key
+from api.models import Abonnement, CustomUser, DoctorProfile, VerificationDocument
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare GET /api/profile/ sans cache (tableau de bord recalculé) et avec le cache partagé "
+        "(CACHES) : requêtes SQL et latence p50/p95, sur un médecin synthétique (annulé en fin de mesure)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=200, help="Documents de vérification du médecin.")
+        parser.add_argument("--subscriptions", type=int, default=50, help="Abonnements du médecin.")
+        parser.add_argument("--repeat", type=int, default=200, help="Requêtes mesurées par variante.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🗄️  Cache : {settings.CACHES['default']['BACKEND']}")
+        with transaction.atomic():
+            doctor, client = self._seed(options["documents"], options["subscriptions"])
+            key = _cache_key(doctor.pk, timezone.now().date())
+            # Avant : chaque requête recalcule le tableau de bord
+            self._measure("sans cache", client, options["repeat"], before=lambda: cache.delete(key))
+            # Après : tableau de bord lu dans le cache partagé
+            client.get("/api/profile/")
+            self._measure("cache chaud", client, options["repeat"])
+            cache.delete(key)
+            # Données synthétiques : rien n'est conservé
+            transaction.set_rollback(True)
+
+    def _measure(self, label, client, repeat, before=None):
+        timings, queries = [], None
+        for _ in range(repeat):
+            if before is not None:
+                before()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get("/api/profile/")
+                timings.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.status_code
+            queries = len(captured)
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20)[-1]
+        self.stdout.write(
+            f"  {label:<12} {queries:>3} requêtes SQL  p50 {p50 * 1000:>7.2f} ms  p95 {p95 * 1000:>7.2f} ms"
+        )
+
+    def _seed(self, documents, subscriptions):
+        user = CustomUser.objects.create_user(
+            username="benchmark-dashboard", email="benchmark-dashboard@example.invalid", role="doctor",
+        )
+        doctor = DoctorProfile.objects.create(
+            user=user, speciality="Neurologie", numero_ordre="benchmark-dashboard", grade="PH",
+            is_approved=True, verification_status="approved",
+        )
+        VerificationDocument.objects.bulk_create([
+            VerificationDocument(doctor=doctor, document=f"verification_documents/{i}.pdf",
+                                 status=("approved", "pending", "rejected")[i % 3])
+            for i in range(documents)
+        ])
+        today = timezone.now().date()
+        Abonnement.objects.bulk_create([
+            Abonnement(doctor=doctor, type="Normal", mode_paiement="card", prix=10,
+                       date_debut=today - timedelta(days=30 * (i + 1)), date_fin=today - timedelta(days=30 * i))
+            for i in range(subscriptions)
+        ])
+        client = APIClient()
+        client.cookies["auth_token"] = Token.objects.create(user=user).key
+        # Authentification en cache : seules les requêtes de la vue sont comptées
+        client.get("/api/profile/")
+        return doctor, client
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.inference import PREDICTOR_PATH
+from api.predictors import load_predictor
+
+
+class Command(BaseCommand):
+    help = "Mesure le débit du prédicteur (analyses/s) selon la taille des lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 8, 32, 128], help="Tailles de lot à comparer.")
+        parser.add_argument("--samples", type=int, default=1024, help="Nombre d'analyses synthétiques.")
+        parser.add_argument("--type-analyse", default="BIOMARKER", help="type_analyse des entrées synthétiques.")
+        parser.add_argument("--maladie", default="Alzheimer")
+        parser.add_argument("--predictor", default=None, help="Chemin pointé du prédicteur (sinon INFERENCE_PREDICTOR).")
+
+    def handle(self, *args, **options):
+        predictor = load_predictor(options["predictor"] or PREDICTOR_PATH)
+        inputs = [
+            {
+                "analyse_id": i,
+                "type_analyse": options["type_analyse"],
+                "maladie": options["maladie"],
+                "irm_path": None,
+                "biomarkers": {"abeta42": 400 + i % 300, "tau": 200 + i % 150, "ptau": 20 + i % 40},
+            }
+            for i in range(options["samples"])
+        ]
+        # Chauffe (chargement paresseux des poids, caches)
+        predictor.predict_batch(inputs[:1])
+
+        self.stdout.write(f"📊 {predictor.__class__.__name__} ({predictor.version}), {len(inputs)} analyses")
+        # Référence : un appel predict() par analyse
+        start = time.perf_counter()
+        for item in inputs:
+            predictor.predict(item)
+        elapsed = time.perf_counter() - start
+        baseline = len(inputs) / elapsed if elapsed else float("inf")
+        self.stdout.write(f"  predict()   {baseline:>10.1f} analyses/s  x1.00")
+
+        for size in options["sizes"]:
+            start = time.perf_counter()
+            for offset in range(0, len(inputs), size):
+                predictor.predict_batch(inputs[offset:offset + size])
+            elapsed = time.perf_counter() - start
+
+            throughput = len(inputs) / elapsed if elapsed else float("inf")
+            self.stdout.write(
+                f"  batch={size:>4}  {throughput:>10.1f} analyses/s  x{throughput / baseline:.2f}"
+            )
@@ -0,0 +1,73 @@
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from api.fields import decode_vector, encode_vector
+from api.models import Analyse
+from api.serializers import AnalyseSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare JSON et float32 compressé pour probabilities / shap_values (taille, décodage, liste)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2000, help="Nombre d'analyses échantillonnées.")
+        parser.add_argument("--features", type=int, default=64, help="Taille des vecteurs SHAP synthétiques.")
+        parser.add_argument("--page-size", type=int, default=50, help="Taille de page pour la latence de liste.")
+        parser.add_argument("--synthetic", action="store_true", help="Vecteurs générés au lieu des analyses en base.")
+
+    def handle(self, *args, **options):
+        vectors = self._sample(options)
+        if not vectors:
+            self.stdout.write("⚠️ Aucune analyse avec des vecteurs (utiliser --synthetic)")
+            return
+
+        as_json = [json.dumps(v).encode() for v in vectors]
+        as_binary = [encode_vector(v) for v in vectors]
+        json_size, binary_size = sum(map(len, as_json)), sum(map(len, as_binary))
+        self.stdout.write(f"📦 {len(vectors)} vecteurs")
+        self.stdout.write(f"  JSON     {json_size:>12,} octets")
+        self.stdout.write(f"  binaire  {binary_size:>12,} octets  ({binary_size / json_size:.0%})")
+
+        self.stdout.write("⏱️ Décodage (µs / vecteur)")
+        for label, run in (
+            ("json.loads", lambda: [json.loads(raw) for raw in as_json]),
+            ("decode_vector", lambda: [decode_vector(raw) for raw in as_binary]),
+            ("decode_vector numpy", lambda: [decode_vector(raw, as_numpy=True) for raw in as_binary]),
+        ):
+            self.stdout.write(f"  {label:<20} {self._time(run) / len(vectors) * 1e6:>8.1f}")
+
+        if not options["synthetic"]:
+            self._list_latency(options["page_size"])
+
+    def _sample(self, options):
+        if options["synthetic"]:
+            rng = np.random.default_rng(0)
+            names = [f"feature_{i}" for i in range(options["features"])]
+            return [
+                {name: round(float(v), 4) for name, v in zip(names, rng.normal(0, 0.1, len(names)))}
+                for _ in range(options["rows"])
+            ]
+        vectors = []
+        rows = Analyse.objects.only("probabilities", "shap_values").order_by("-id")[:options["rows"]]
+        for analyse in rows:
+            vectors.extend(v for v in (analyse.probabilities, analyse.shap_values) if v)
+        return vectors
+
+    def _list_latency(self, page_size):
+        page = Analyse.objects.order_by("-date", "-id")
+        self.stdout.write(f"⏱️ Page de {page_size} analyses (ms)")
+        self.stdout.write(f"  requête seule        {self._time(lambda: list(page[:page_size])) * 1e3:>8.2f}")
+        self.stdout.write(
+            f"  requête + serializer {self._time(lambda: AnalyseSerializer(list(page[:page_size]), many=True).data) * 1e3:>8.2f}"
+        )
+
+    def _time(self, run, repeat=5):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        return best
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from api.derivatives import build_derivatives, make_pool
+from api.models import Analyse
+
+
+class Command(BaseCommand):
+    help = "Génère miniatures et WebP moyens des IRM / heatmaps dans un pool de process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Nombre de process du pool.")
+        parser.add_argument("--batch-size", type=int, default=16, help="Analyses traitées à la fois.")
+        parser.add_argument("--all", action="store_true", help="Remet en attente toutes les analyses avec une image.")
+        parser.add_argument("--loop", action="store_true", help="Tourne en continu (worker).")
+        parser.add_argument("--interval", type=float, default=5.0, help="Pause quand la file est vide (secondes).")
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            flagged = Analyse.objects.filter(
+                Q(irm_original__gt="") | Q(heatmap_img__gt="")
+            ).update(derivatives_pending=True)
+            self.stdout.write(f"🔁 {flagged} analyse(s) remise(s) en attente")
+
+        with make_pool(options["workers"]) as pool:
+            while True:
+                processed = build_derivatives(pool, options["batch_size"])
+                if processed:
+                    self.stdout.write(f"🖼️ {processed} analyse(s) traitée(s)")
+                    continue
+
+                if not options["loop"]:
+                    break
+                time.sleep(options["interval"])
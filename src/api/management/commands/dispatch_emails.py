@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.notifications import flush_notification_digests
+from api.outbox import dispatch_outbox
+
+
+class Command(BaseCommand):
+    help = (
+        "Regroupe les notifications de documents en digests puis envoie les emails "
+        "en attente dans l'outbox (une connexion SMTP par lot)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None, help="Emails par lot.")
+        parser.add_argument("--loop", action="store_true", help="Tourne en continu (worker).")
+        parser.add_argument("--interval", type=float, default=5.0, help="Pause entre deux lots vides (secondes).")
+
+    def handle(self, *args, **options):
+        while True:
+            digests = flush_notification_digests()
+            if digests:
+                self.stdout.write(f"🗞️ {digests} digest(s) mis en file")
+
+            # Lots successifs jusqu'à vider la file (les échecs sont replanifiés plus tard)
+            while True:
+                sent, failed = dispatch_outbox(batch_size=options["batch_size"])
+                if not (sent or failed):
+                    break
+                self.stdout.write(f"📤 {sent} envoyé(s), {failed} en échec")
+
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
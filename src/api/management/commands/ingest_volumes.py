@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from api.models import Analyse
+from api.volumes import VOLUME_EXTENSIONS, VolumeError, ingest_volume
+
+
+class Command(BaseCommand):
+    help = "Recopie les volumes NIfTI / NumPy des analyses dans le store mémoire-mappé."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--analyse", type=int, default=None, help="Une seule analyse (réingérée).")
+
+    def handle(self, *args, **options):
+        if options["analyse"]:
+            analyses = Analyse.objects.filter(pk=options["analyse"])
+        else:
+            is_volume = Q()
+            for extension in VOLUME_EXTENSIONS:
+                is_volume |= Q(irm_original__iendswith=extension)
+            # Pas encore ingérées, ou fichier source remplacé depuis
+            analyses = Analyse.objects.filter(is_volume).exclude(volume__source_name=F("irm_original"))
+
+        ingested = failed = 0
+        for analyse in analyses.only("id", "irm_original").iterator():
+            try:
+                volume = ingest_volume(analyse)
+            except (VolumeError, OSError) as e:
+                failed += 1
+                self.stdout.write(f"❌ Analyse {analyse.pk}: {e}")
+                continue
+            ingested += 1
+            self.stdout.write(f"🧊 Analyse {analyse.pk}: {volume.shape} {volume.dtype}")
+
+        self.stdout.write(f"✅ {ingested} volume(s) ingéré(s), {failed} échec(s)")
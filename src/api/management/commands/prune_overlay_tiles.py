@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.overlay import TILE_CACHE_DIR
+
+
+class Command(BaseCommand):
+    help = "Supprime du cache disque les tuiles IRM + heatmap non consultées depuis N jours."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=7, help="Âge maximal (dernier accès), en jours.")
+
+    def handle(self, *args, **options):
+        if not TILE_CACHE_DIR.exists():
+            return
+        cutoff = time.time() - options["days"] * 86400
+        removed = 0
+        for tile in TILE_CACHE_DIR.rglob("*.webp"):
+            stat = tile.stat()
+            if max(stat.st_atime, stat.st_mtime) < cutoff:
+                tile.unlink(missing_ok=True)
+                removed += 1
+
+        # Dossiers vidés (anciennes versions des images, analyses supprimées)
+        for directory in sorted(TILE_CACHE_DIR.rglob("*"), key=lambda p: len(p.parts), reverse=True):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+
+        self.stdout.write(f"🧹 {removed} tuile(s) supprimée(s)")
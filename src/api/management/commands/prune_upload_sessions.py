@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import UploadSession
+from api.uploads import discard_upload
+
+
+class Command(BaseCommand):
+    help = "Supprime les uploads reprenables abandonnés (et leurs fichiers partiels)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=float, default=48, help="Sans nouveau morceau depuis N heures.")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timezone.timedelta(hours=options["hours"])
+        stale = UploadSession.objects.filter(finalized_at__isnull=True, updated_at__lt=cutoff)
+        removed = 0
+        for session in stale.iterator():
+            discard_upload(session)
+            removed += 1
+
+        # Sessions finalisées : seul l'historique reste, plus de fichier partiel
+        purged, _ = UploadSession.objects.filter(finalized_at__lt=cutoff).delete()
+        self.stdout.write(f"🧹 {removed} upload(s) abandonné(s), {purged} session(s) finalisée(s) supprimés")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from api.counters import rebuild_doctor_counters
+from api.dashboard import invalidate_doctor_dashboard
+from api.models import DoctorProfile
+
+
+class Command(BaseCommand):
+    help = "Recalcule depuis zéro les compteurs par médecin (patients, analyses, 30 jours)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--doctor", type=int, action="append", dest="doctor_ids",
+            help="ID du DoctorProfile à reconstruire (répétable). Par défaut : tous.",
+        )
+
+    def handle(self, *args, **options):
+        doctor_ids = options["doctor_ids"]
+        if not doctor_ids:
+            doctor_ids = DoctorProfile.objects.order_by("pk").values_list("pk", flat=True).iterator()
+
+        rebuilt = 0
+        for doctor_id in doctor_ids:
+            counters = rebuild_doctor_counters(doctor_id)
+            invalidate_doctor_dashboard(doctor_id)
+            rebuilt += 1
+            self.stdout.write(
+                f"Doctor {doctor_id}: {counters.total_patients} patients, "
+                f"{counters.total_analyses} analyses, {counters.recent_analyses} récentes"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{rebuilt} médecin(s) reconstruit(s)"))
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.shap_importance import REBUILD_CHUNK_SIZE, rebuild_shap_importance
+
+
+class Command(BaseCommand):
+    help = "Recalcule depuis zéro l'importance SHAP globale (par maladie / type / résultat)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=REBUILD_CHUNK_SIZE, help="Analyses lues par lot.")
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = rebuild_shap_importance(options["chunk_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{rows} ligne(s) d'importance SHAP reconstruite(s) en {time.perf_counter() - start:.1f} s"
+        ))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.inference import BATCH_MAX_WAIT, make_pool, process_batches
+
+
+class Command(BaseCommand):
+    help = "Calcule les analyses en attente (InferenceJob) par lots, dans un pool de process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None, help="Nombre de process du pool.")
+        parser.add_argument("--batch-size", type=int, default=None, help="Taille max d'un lot (sinon INFERENCE_BATCH_SIZE).")
+        parser.add_argument("--max-wait", type=float, default=None, help="Attente max d'un lot incomplet, en secondes (sinon INFERENCE_BATCH_MAX_WAIT).")
+        parser.add_argument("--predictor", default=None, help="Chemin pointé du prédicteur (sinon INFERENCE_PREDICTOR).")
+        parser.add_argument("--loop", action="store_true", help="Tourne en continu (worker).")
+        parser.add_argument("--interval", type=float, default=2.0, help="Pause quand la file est vide (secondes).")
+
+    def handle(self, *args, **options):
+        max_wait = options["max_wait"]
+        if max_wait is None:
+            # Exécution ponctuelle : on vide la file sans attendre de lot plein
+            max_wait = BATCH_MAX_WAIT if options["loop"] else 0
+        # Un lot en cours de remplissage est revu avant la fin de son attente
+        idle = min(options["interval"], max_wait) if max_wait else options["interval"]
+
+        with make_pool(options["workers"], options["predictor"]) as pool:
+            while True:
+                processed = process_batches(
+                    pool, options["batch_size"], max_wait, options["workers"]
+                )
+                if processed:
+                    self.stdout.write(f"🧠 {processed} analyse(s) traitée(s)")
+                    continue
+
+                if not options["loop"]:
+                    break
+                time.sleep(idle)
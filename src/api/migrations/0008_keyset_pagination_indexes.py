@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_analyse_shap_values'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(fields=['patient', '-date', '-id'], name='analyse_patient_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['last_name', 'id'], name='customuser_lastname_id_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorCounters',
+            fields=[
+                ('doctor', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='api.doctorprofile')),
+                ('total_patients', models.IntegerField(default=0)),
+                ('total_analyses', models.IntegerField(default=0)),
+                ('recent_analyses', models.IntegerField(default=0)),
+                ('window_day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DoctorDailyAnalysisCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_analysis_counts', to='api.doctorprofile')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='doctordailyanalysiscount',
+            constraint=models.UniqueConstraint(fields=('doctor', 'day'), name='unique_doctor_day_bucket'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_outgoing_email'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentNotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('status', 'Status change'), ('comment', 'Comment'), ('account_approved', 'Account approved')], max_length=20)),
+                ('doc_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('status', models.CharField(blank=True, max_length=20, null=True)),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('doctor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='api.doctorprofile')),
+                ('document', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.verificationdocument')),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_document_notification_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('model_version', models.CharField(blank=True, max_length=50, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('analyse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inference_jobs', to='api.analyse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='inferencejob_status_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_inference_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InferenceCacheStats',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('hits', models.IntegerField(default=0)),
+                ('misses', models.IntegerField(default=0)),
+                ('evictions', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='InferenceResultCache',
+            fields=[
+                ('key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('model_version', models.CharField(max_length=50)),
+                ('result', models.CharField(blank=True, max_length=50, null=True)),
+                ('confidence', models.FloatField(blank=True, null=True)),
+                ('probabilities', models.JSONField(blank=True, null=True)),
+                ('shap_values', models.JSONField(blank=True, null=True)),
+                ('heatmap_img', models.CharField(blank=True, max_length=255, null=True)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_used_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='inferencejob',
+            name='input_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Conversion de Analyse.probabilities / shap_values : JSON -> float32 compressé
+# (api/fields.py). Conversion par lots, chaque lot dans sa propre transaction.
+
+import api.fields
+from django.db import migrations, transaction
+
+
+CHUNK_SIZE = 1000
+FIELDS = ("probabilities", "shap_values")
+
+
+def _convert(apps, source_suffix, target_suffix, convert):
+    Analyse = apps.get_model("api", "Analyse")
+    sources = [f"{name}{source_suffix}" for name in FIELDS]
+    targets = [f"{name}{target_suffix}" for name in FIELDS]
+
+    last_pk = 0
+    while True:
+        rows = list(
+            Analyse.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .values_list("pk", *sources)[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        with transaction.atomic():
+            Analyse.objects.bulk_update(
+                [
+                    Analyse(pk=row[0], **{
+                        target: convert(value) for target, value in zip(targets, row[1:])
+                    })
+                    for row in rows
+                ],
+                targets,
+            )
+        last_pk = rows[-1][0]
+
+
+def forwards(apps, schema_editor):
+    # JSONField -> dict/list ; CompactVectorField encode à l'écriture
+    _convert(apps, "", "_compact", lambda value: value)
+
+
+def backwards(apps, schema_editor):
+    _convert(apps, "_compact", "", lambda value: api.fields.decode_vector(value))
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0013_inference_result_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyse',
+            name='probabilities_compact',
+            field=api.fields.CompactVectorField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='shap_values_compact',
+            field=api.fields.CompactVectorField(blank=True, null=True),
+        ),
+        migrations.RunPython(forwards, backwards),
+        migrations.RemoveField(
+            model_name='analyse',
+            name='probabilities',
+        ),
+        migrations.RemoveField(
+            model_name='analyse',
+            name='shap_values',
+        ),
+        migrations.RenameField(
+            model_name='analyse',
+            old_name='probabilities_compact',
+            new_name='probabilities',
+        ),
+        migrations.RenameField(
+            model_name='analyse',
+            old_name='shap_values_compact',
+            new_name='shap_values',
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_analyse_compact_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyse',
+            name='derivatives',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='derivatives_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(condition=models.Q(('derivatives_pending', True)), fields=['id'], name='analyse_deriv_pending_idx'),
+        ),
+    ]
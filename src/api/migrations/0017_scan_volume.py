@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanVolume',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255)),
+                ('source_name', models.CharField(max_length=255)),
+                ('shape', models.JSONField()),
+                ('dtype', models.CharField(max_length=10)),
+                ('order', models.CharField(default='F', max_length=1)),
+                ('spacing', models.JSONField(default=list)),
+                ('intensity_min', models.FloatField(default=0)),
+                ('intensity_max', models.FloatField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('analyse', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='volume', to='api.analyse')),
+            ],
+        ),
+    ]
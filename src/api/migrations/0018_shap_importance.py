@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_scan_volume'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShapImportance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('maladie', models.CharField(max_length=100)),
+                ('type_analyse', models.CharField(max_length=20)),
+                ('result', models.CharField(blank=True, default='', max_length=50)),
+                ('feature', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+                ('sum_abs', models.FloatField(default=0)),
+                ('sum_signed', models.FloatField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='shapimportance',
+            constraint=models.UniqueConstraint(fields=('maladie', 'type_analyse', 'result', 'feature'), name='unique_shap_bucket_feature'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_shap_importance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiomarkerValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marker', models.CharField(max_length=50)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, default='', max_length=20)),
+                ('analyse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='biomarker_values', to='api.analyse')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['marker', 'value', 'analyse'], name='biomarker_marker_value_idx')],
+            },
+        ),
+    ]
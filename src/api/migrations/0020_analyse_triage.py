@@ -0,0 +1,86 @@
+# Colonnes de triage (top_class, top_probability, risk_score) dérivées de
+# Analyse.probabilities. Remplissage par lots, chaque lot dans sa propre
+# transaction, avant la création de l'index.
+
+import math
+
+import api.fields
+from django.db import migrations, models, transaction
+
+
+CHUNK_SIZE = 1000
+
+
+# Copie figée de api.predictors.risk_summary : la migration ne dépend pas des
+# évolutions ultérieures du module (api.fields reste le format de stockage)
+def risk_summary(probabilities):
+    if not isinstance(probabilities, dict):
+        return None, None, None
+    scores = {}
+    for name, value in probabilities.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(value):
+            scores[name] = value
+    if not scores:
+        return None, None, None
+    top_class = max(scores, key=scores.get)
+    risk = None
+    if "CN" in scores:
+        risk = round(min(max(1 - scores["CN"], 0.0), 1.0), 6)
+    return top_class, scores[top_class], risk
+
+
+def fill_triage_fields(apps, schema_editor):
+    Analyse = apps.get_model("api", "Analyse")
+    last_pk = 0
+    while True:
+        rows = list(
+            Analyse.objects.filter(pk__gt=last_pk, probabilities__isnull=False)
+            .order_by("pk")
+            .values_list("pk", "probabilities")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        analyses = []
+        for pk, raw in rows:
+            top_class, top_probability, risk_score = risk_summary(api.fields.decode_vector(raw))
+            analyses.append(
+                Analyse(pk=pk, top_class=top_class, top_probability=top_probability, risk_score=risk_score)
+            )
+        with transaction.atomic():
+            Analyse.objects.bulk_update(analyses, ["top_class", "top_probability", "risk_score"])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0019_biomarker_value'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyse',
+            name='risk_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='top_class',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='top_probability',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_triage_fields, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(condition=models.Q(('risk_score__isnull', False)), fields=['doctor', '-risk_score', '-id', 'date'], name='analyse_doctor_risk_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_analyse_triage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='writing_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Scores par classe malade (prob_ad, prob_mci, prob_pd) dérivés de
+# Analyse.probabilities. Remplissage par lots, chaque lot dans sa propre
+# transaction, avant la création des index.
+
+import math
+
+import api.fields
+from django.db import migrations, models, transaction
+
+
+CHUNK_SIZE = 1000
+
+
+# Copie figée de api.predictors.class_scores : la migration ne dépend pas des
+# évolutions ultérieures du module (api.fields reste le format de stockage)
+def class_scores(probabilities):
+    if not isinstance(probabilities, dict):
+        return None, None, None
+    scores = []
+    for name in ("AD", "MCI", "PD"):
+        try:
+            value = float(probabilities.get(name))
+        except (TypeError, ValueError):
+            value = None
+        if value is not None and math.isfinite(value):
+            scores.append(round(min(max(value, 0.0), 1.0), 6))
+        else:
+            scores.append(None)
+    return tuple(scores)
+
+
+def fill_class_scores(apps, schema_editor):
+    Analyse = apps.get_model("api", "Analyse")
+    last_pk = 0
+    while True:
+        rows = list(
+            Analyse.objects.filter(pk__gt=last_pk, probabilities__isnull=False)
+            .order_by("pk")
+            .values_list("pk", "probabilities")[:CHUNK_SIZE]
+        )
+        if not rows:
+            break
+        analyses = []
+        for pk, raw in rows:
+            prob_ad, prob_mci, prob_pd = class_scores(api.fields.decode_vector(raw))
+            analyses.append(Analyse(pk=pk, prob_ad=prob_ad, prob_mci=prob_mci, prob_pd=prob_pd))
+        with transaction.atomic():
+            Analyse.objects.bulk_update(analyses, ["prob_ad", "prob_mci", "prob_pd"])
+        last_pk = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('api', '0021_uploadsession_writing_until'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyse',
+            name='prob_ad',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='prob_mci',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyse',
+            name='prob_pd',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(fill_class_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(condition=models.Q(('prob_ad__isnull', False)), fields=['doctor', '-prob_ad', '-id', 'date'], name='analyse_doctor_ad_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(condition=models.Q(('prob_mci__isnull', False)), fields=['doctor', '-prob_mci', '-id', 'date'], name='analyse_doctor_mci_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyse',
+            index=models.Index(condition=models.Q(('prob_pd__isnull', False)), fields=['doctor', '-prob_pd', '-id', 'date'], name='analyse_doctor_pd_idx'),
+        ),
+    ]
@@ -1,5 +1,11 @@
-from django.db import models
+import uuid
+
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+
+from .fields import CompactVectorField
+from .predictors import class_scores, risk_summary
 
 # --------------------
 # USER DE BASE (PERSONNE + LOGIN)
@@ -21,6 +27,13 @@ class CustomUser(AbstractUser):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        swappable = 'AUTH_USER_MODEL'
+        indexes = [
+            # Pagination keyset des patients : ORDER BY last_name, id
+            models.Index(fields=['last_name', 'id'], name='customuser_lastname_id_idx'),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.role})"
 
@@ -46,35 +59,45 @@ class DoctorProfile(models.Model):
         default="pending"
     )
 
+    def update_approval_status(self):
+        """
+        Moteur d'approbation unique : un seul agrégat sur les documents, ligne du
+        médecin verrouillée (select_for_update) contre les revues concurrentes,
+        écriture seulement en cas de transition.
+        Renvoie ``(was_approved, is_approved)``.
+        """
+        with transaction.atomic():
+            current = (
+                DoctorProfile.objects.select_for_update()
+                .only('is_approved', 'verification_status')
+                .get(pk=self.pk)
+            )
+            counts = self.documents.aggregate(
+                total=models.Count('id'),
+                approved=models.Count('id', filter=models.Q(status='approved')),
+                rejected=models.Count('id', filter=models.Q(status='rejected')),
+            )
+
+            if counts['total'] and counts['approved'] == counts['total']:
+                # All documents approved
+                is_approved, verification_status = True, "approved"
+            elif counts['rejected']:
+                # At least one document rejected
+                is_approved, verification_status = False, "rejected"
+            else:
+                # No documents yet, or some documents still pending
+                is_approved, verification_status = False, "pending"
+
+            self.is_approved = is_approved
+            self.verification_status = verification_status
+            if (current.is_approved, current.verification_status) != (is_approved, verification_status):
+                self.save(update_fields=['is_approved', 'verification_status'])
+
+        return current.is_approved, is_approved
+
     def check_approval_status(self):
         """Check if all documents are approved and update status accordingly"""
-        documents = self.documents.all()
-        
-        if not documents.exists():
-            # No documents uploaded yet
-            self.is_approved = False
-            self.verification_status = "pending"
-            self.save()
-            return False
-            
-        if all(doc.status == "approved" for doc in documents):
-            # All documents approved
-            self.is_approved = True
-            self.verification_status = "approved"
-            self.save()
-            return True
-        elif any(doc.status == "rejected" for doc in documents):
-            # At least one document rejected
-            self.is_approved = False
-            self.verification_status = "rejected"
-            self.save()
-            return False
-        else:
-            # Some documents still pending
-            self.is_approved = False
-            self.verification_status = "pending"
-            self.save()
-            return False
+        return self.update_approval_status()[1]
     
     def __str__(self):
         return f"Doctor {self.user.first_name} {self.user.last_name}"
@@ -158,13 +181,20 @@ class Analyse(models.Model):
     irm_original = models.ImageField(upload_to="irm/", blank=True, null=True)
     heatmap_img = models.ImageField(upload_to="heatmaps/", blank=True, null=True)
 
-    # --- Biomarqueurs ---
+    # --- Biomarqueurs --- (copie typée et indexée : BiomarkerValue, cf. api/biomarkers.py)
     biomarkers = models.JSONField(blank=True, null=True)
 
     # --- Résultats IA ---
     result = models.CharField(max_length=50, blank=True, null=True)
     confidence = models.FloatField(blank=True, null=True)
-    probabilities = models.JSONField(blank=True, null=True)  # {AD: xx, CN: xx, ...}
+    probabilities = CompactVectorField(blank=True, null=True)  # {AD: xx, CN: xx, ...}
+    # --- Triage : dérivés de probabilities (cf. update_triage_fields), indexés
+    top_class = models.CharField(max_length=50, blank=True, null=True)
+    top_probability = models.FloatField(blank=True, null=True)
+    risk_score = models.FloatField(blank=True, null=True)  # 1 - P(CN)
+    prob_ad = models.FloatField(blank=True, null=True)
+    prob_mci = models.FloatField(blank=True, null=True)
+    prob_pd = models.FloatField(blank=True, null=True)
 
     # --- Diagnostic & Rapport ---
     diagnostic = models.TextField(blank=True, null=True)  # résumé IA
@@ -175,12 +205,274 @@ class Analyse(models.Model):
 
     # --- Visualisations XAI ---
     xai_biomarkers = models.ImageField(upload_to="xai_biomarkers/", blank=True, null=True)
-    # --- Valeurs SHAP en JSON
+    # --- Valeurs SHAP (float32 compressé, décodé à l'accès, cf. api/fields.py)
+    shap_values = CompactVectorField(blank=True, null=True)
+
+    # --- Images dérivées (miniature, WebP moyen), cf. api/derivatives.py
+    derivatives = models.JSONField(blank=True, null=True)
+    derivatives_pending = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Historique d'un patient, pagination keyset : ORDER BY date DESC, id DESC
+            models.Index(fields=['patient', '-date', '-id'], name='analyse_patient_date_id_idx'),
+            # File de build_image_derivatives
+            models.Index(
+                fields=['id'], condition=models.Q(derivatives_pending=True),
+                name='analyse_deriv_pending_idx',
+            ),
+            # Triage médecin, pagination keyset : ORDER BY risk_score DESC, id DESC
+            # (date en dernière colonne : filtre "récentes" évalué dans l'index)
+            models.Index(
+                fields=['doctor', '-risk_score', '-id', 'date'],
+                condition=models.Q(risk_score__isnull=False),
+                name='analyse_doctor_risk_idx',
+            ),
+            # Même parcours par classe malade : ORDER BY prob_<classe> DESC, id DESC
+            models.Index(
+                fields=['doctor', '-prob_ad', '-id', 'date'],
+                condition=models.Q(prob_ad__isnull=False),
+                name='analyse_doctor_ad_idx',
+            ),
+            models.Index(
+                fields=['doctor', '-prob_mci', '-id', 'date'],
+                condition=models.Q(prob_mci__isnull=False),
+                name='analyse_doctor_mci_idx',
+            ),
+            models.Index(
+                fields=['doctor', '-prob_pd', '-id', 'date'],
+                condition=models.Q(prob_pd__isnull=False),
+                name='analyse_doctor_pd_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_analyse_display()} - {self.maladie} ({self.result})"
+
+    DERIVATIVE_SOURCES = ("irm_original", "heatmap_img")
+
+    def outdated_derivatives(self, fields=DERIVATIVE_SOURCES):
+        """Images dont les dérivées ne correspondent pas au fichier courant."""
+        derivatives = self.derivatives or {}
+        return [
+            field for field in fields
+            if (getattr(self, field).name or None) != (derivatives.get(field) or {}).get("source")
+        ]
+
+    TRIAGE_FIELDS = ("top_class", "top_probability", "risk_score", "prob_ad", "prob_mci", "prob_pd")
+
+    def update_triage_fields(self):
+        """Recopie classe principale, risque et scores par classe de ``probabilities`` dans les colonnes indexées."""
+        self.top_class, self.top_probability, self.risk_score = risk_summary(self.probabilities)
+        self.prob_ad, self.prob_mci, self.prob_pd = class_scores(self.probabilities)
+
+    def save(self, *args, **kwargs):
+        # Colonnes de triage recalculées quand probabilities est écrit
+        # (pas pour une instance partielle .only() sans probabilities)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None:
+            if "probabilities" not in self.get_deferred_fields():
+                self.update_triage_fields()
+        elif "probabilities" in update_fields:
+            self.update_triage_fields()
+            kwargs["update_fields"] = {*update_fields, *self.TRIAGE_FIELDS}
+
+        # Nouvelle image : les dérivées obsolètes sont retirées et régénérées
+        # par build_image_derivatives
+        update_fields = kwargs.get("update_fields")
+        image_fields = self.DERIVATIVE_SOURCES
+        if update_fields is not None:
+            image_fields = [field for field in image_fields if field in update_fields]
+
+        if image_fields:
+            outdated = self.outdated_derivatives(image_fields)
+            if outdated:
+                self.derivatives = {
+                    field: names for field, names in (self.derivatives or {}).items()
+                    if field not in outdated
+                }
+                self.derivatives_pending = True
+                if update_fields is not None:
+                    kwargs["update_fields"] = {*update_fields, "derivatives", "derivatives_pending"}
+        super().save(*args, **kwargs)
+
+
+# --------------------
+# BIOMARQUEURS TYPÉS (copie indexée de Analyse.biomarkers, cf. api/biomarkers.py)
+# --------------------
+class BiomarkerValue(models.Model):
+    analyse = models.ForeignKey(Analyse, on_delete=models.CASCADE, related_name="biomarker_values")
+    marker = models.CharField(max_length=50)
+    value = models.FloatField()
+    unit = models.CharField(max_length=20, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            # Filtres par intervalle : WHERE marker = %s AND value BETWEEN ... -> analyse_id
+            models.Index(fields=['marker', 'value', 'analyse'], name='biomarker_marker_value_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.marker}={self.value} {self.unit}".strip()
+
+# --------------------
+# JOBS D'INFÉRENCE (cf. api/inference.py)
+# --------------------
+class InferenceJob(models.Model):
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    analyse = models.ForeignKey(Analyse, on_delete=models.CASCADE, related_name="inference_jobs")
+    status = models.CharField(max_length=20, choices=STATUSES, default='queued')
+    progress = models.PositiveSmallIntegerField(default=0)  # 0 - 100
+    attempts = models.PositiveIntegerField(default=0)
+    # Version attendue à la mise en file, version effective une fois calculé
+    model_version = models.CharField(max_length=50, blank=True, null=True)
+    # Empreinte de l'entrée (cf. api/inference_cache.py), None si le cache est désactivé
+    input_hash = models.CharField(max_length=64, blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # File du worker : WHERE status='queued' ORDER BY created_at
+            models.Index(fields=['status', 'created_at'], name='inferencejob_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} for analyse {self.analyse_id} - {self.status}"
+
+
+class UploadSession(models.Model):
+    """Upload reprenable d'un examen (cf. api/uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(blank=True, null=True)  # taille annoncée (optionnelle)
+    offset = models.BigIntegerField(default=0)  # octets reçus et validés
+    # sha256 de chaque bloc reçu, concaténés (32 octets par bloc)
+    block_digests = models.BinaryField(default=b"")
+    # Morceau en cours d'écriture à ``offset`` (réservation, sans verrou pendant le transfert)
+    writing_until = models.DateTimeField(blank=True, null=True)
+    analyse = models.ForeignKey(
+        Analyse, on_delete=models.SET_NULL, blank=True, null=True, related_name="upload_sessions"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finalized_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.size or '?'})"
+
+
+class ScanVolume(models.Model):
+    """Volume 3D d'une analyse, stocké brut pour un accès np.memmap (cf. api/volumes.py)."""
+    analyse = models.OneToOneField(Analyse, on_delete=models.CASCADE, related_name="volume")
+    path = models.CharField(max_length=255)  # relatif à VOLUME_STORE_DIR
+    source_name = models.CharField(max_length=255)
+    shape = models.JSONField()  # [x, y, z]
+    dtype = models.CharField(max_length=10)  # numpy, boutisme compris : "<i2"
+    order = models.CharField(max_length=1, default="F")  # F : x varie le plus vite (NIfTI)
+    spacing = models.JSONField(default=list)  # taille des voxels (mm)
+    intensity_min = models.FloatField(default=0)
+    intensity_max = models.FloatField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Volume {self.shape} for analyse {self.analyse_id}"
+
+
+class InferenceResultCache(models.Model):
+    """Sorties du modèle indexées par l'empreinte du contenu de l'entrée."""
+    key = models.CharField(max_length=64, primary_key=True)  # sha256(version + entrée canonique)
+    model_version = models.CharField(max_length=50)
+    result = models.CharField(max_length=50, blank=True, null=True)
+    confidence = models.FloatField(blank=True, null=True)
+    probabilities = models.JSONField(blank=True, null=True)
     shap_values = models.JSONField(blank=True, null=True)
+    # Nom du fichier de heatmap, partagé par les analyses identiques
+    heatmap_img = models.CharField(max_length=255, blank=True, null=True)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)  # éviction LRU
+
+    def __str__(self):
+        return f"{self.key[:12]} ({self.model_version}) - {self.result}"
 
 
+class InferenceCacheStats(models.Model):
+    """Succès / échecs / évictions du cache d'inférence, par jour."""
+    day = models.DateField(primary_key=True)
+    hits = models.IntegerField(default=0)
+    misses = models.IntegerField(default=0)
+    evictions = models.IntegerField(default=0)
+
     def __str__(self):
-        return f"{self.get_type_analyse_display()} - {self.maladie} ({self.result})"
+        return f"{self.day}: {self.hits} hits / {self.misses} misses"
+
+
+# --------------------
+# COMPTEURS PAR MÉDECIN (dénormalisés, cf. api/counters.py)
+# --------------------
+class DoctorCounters(models.Model):
+    doctor = models.OneToOneField(
+        DoctorProfile, on_delete=models.CASCADE, primary_key=True, related_name="counters"
+    )
+    total_patients = models.IntegerField(default=0)
+    total_analyses = models.IntegerField(default=0)
+    # Analyses datées de [window_day - 30 jours, window_day]
+    recent_analyses = models.IntegerField(default=0)
+    window_day = models.DateField()
+
+    def __str__(self):
+        return f"Counters for doctor {self.doctor_id}"
+
+
+class DoctorDailyAnalysisCount(models.Model):
+    """Un compteur par médecin et par jour, pour faire glisser la fenêtre de 30 jours."""
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="daily_analysis_counts")
+    day = models.DateField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'day'], name='unique_doctor_day_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor_id} {self.day}: {self.count}"
+
+
+# --------------------
+# IMPORTANCE SHAP GLOBALE (sommes incrémentales, cf. api/shap_importance.py)
+# --------------------
+class ShapImportance(models.Model):
+    """Somme des |SHAP| et des SHAP signés d'une variable, par maladie / type / résultat."""
+    maladie = models.CharField(max_length=100)
+    type_analyse = models.CharField(max_length=20)
+    result = models.CharField(max_length=50, blank=True, default="")  # "" : pas de résultat
+    feature = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+    sum_abs = models.FloatField(default=0)
+    sum_signed = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['maladie', 'type_analyse', 'result', 'feature'], name='unique_shap_bucket_feature',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.maladie}/{self.type_analyse}/{self.result} {self.feature}: {self.count}"
+
 
 # --------------------
 # ABONNEMENT
@@ -214,6 +506,57 @@ class Paiement(models.Model):
         return f"Paiement {self.id} - {self.montant}€"
 
 
+# --------------------
+# NOTIFICATIONS DOCUMENTS (regroupées en digest, cf. api/notifications.py)
+# --------------------
+class DocumentNotificationEvent(models.Model):
+    KINDS = [
+        ('status', 'Status change'),
+        ('comment', 'Comment'),
+        ('account_approved', 'Account approved'),
+    ]
+
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name="notification_events")
+    document = models.ForeignKey(
+        VerificationDocument, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    kind = models.CharField(max_length=20, choices=KINDS)
+    doc_type = models.CharField(max_length=50, blank=True, null=True)
+    status = models.CharField(max_length=20, blank=True, null=True)
+    comment = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.kind} for doctor {self.doctor_id} ({self.created_at})"
+
+
+# --------------------
+# OUTBOX EMAIL (envoyé par manage.py dispatch_emails, cf. api/outbox.py)
+# --------------------
+class OutgoingEmail(models.Model):
+    STATUSES = [('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUSES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # File d'attente du dispatcher : WHERE status='pending' ORDER BY next_attempt_at
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"Email {self.id} to {self.to_email} - {self.status}"
+
+
 
 
 
@@ -249,12 +592,10 @@ ________________________________________________________________________________
 
 
 # models.py - Add at the bottom of the file
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
-from django.conf import settings
 from django.urls import reverse
 
 # models.py - ajoutez cette fonction AVANT le signal
@@ -262,8 +603,17 @@ from django.urls import reverse
 def send_email_to_doctor(subject, template_name, context, to_email):
     """
     Fonction utilitaire pour envoyer des emails avec templates en dur
+    (mis en file dans OutgoingEmail, pas d'appel SMTP pendant la requête)
     """
     try:
+        # Liste des documents (email récapitulatif documents_reviewed)
+        documents_html = "\n".join(
+            f"<li><strong>{doc.get('document_type', '')}</strong> : {doc.get('status', '')}"
+            + (f" — {doc.get('comment')}" if doc.get('comment') else "")
+            + "</li>"
+            for doc in context.get('documents', [])
+        )
+
         # Templates en dur pour éviter les problèmes de chemin
         templates = {
             'emails/document_approved.html': f"""
@@ -305,6 +655,19 @@ def send_email_to_doctor(subject, template_name, context, to_email):
                 <p>Un commentaire a été ajouté à votre document <strong>{context.get('document_type', '')}</strong> (Status: {context.get('status', '')}).</p>
                 <p><strong>Commentaire:</strong> {context.get('comment', '')}</p>
             </body></html>
+            """,
+            
+            'emails/documents_reviewed.html': f"""
+            <!DOCTYPE html>
+            <html><body>
+                <h2>Vos documents ont été examinés</h2>
+                <p>Cher Dr. {context.get('doctor_name', '')},</p>
+                <ul>
+                {documents_html}
+                </ul>
+                {"<p>Veuillez uploader un nouveau document pour chaque document rejeté.</p>" if context.get('has_rejected') else ""}
+                {f"<p>Votre compte Neurevia est maintenant <strong>entièrement approuvé</strong> ! Connectez-vous : <a href='{context.get('login_url', '')}'>{context.get('login_url', '')}</a></p>" if context.get('fully_approved') else ""}
+            </body></html>
             """
         }
         
@@ -312,18 +675,15 @@ def send_email_to_doctor(subject, template_name, context, to_email):
         html_content = templates.get(template_name, f"<p>Email: {subject}</p>")
         text_content = strip_tags(html_content)
         
-        # Create email
-        email = EmailMultiAlternatives(
+        # Mise en file dans l'outbox, dans la même transaction que le changement
+        # de statut : l'envoi SMTP est fait hors requête par `manage.py dispatch_emails`
+        OutgoingEmail.objects.create(
             subject=subject,
-            body=text_content,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[to_email]
+            text_body=text_content,
+            html_body=html_content,
+            to_email=to_email,
         )
-        email.attach_alternative(html_content, "text/html")
-        
-        # Send email
-        email.send()
-        print(f"✅ Email envoyé à {to_email}")
+        print(f"📬 Email mis en file pour {to_email}")
         return True
         
     except Exception as e:
@@ -331,98 +691,63 @@ def send_email_to_doctor(subject, template_name, context, to_email):
         return False
     
 
+@receiver(pre_save, sender=VerificationDocument)
+def remember_previous_document_state(sender, instance, **kwargs):
+    """Mémorise statut / commentaire avant la sauvegarde (comparés en post_save)"""
+    previous = None
+    if instance.pk and not instance._state.adding:
+        previous = sender.objects.filter(pk=instance.pk).values('status', 'comment').first()
+    instance._previous_state = previous
+
+
 @receiver(post_save, sender=VerificationDocument)
 def update_doctor_status_on_document_change(sender, instance, created, **kwargs):
-    """Update doctor approval status when a document is saved and send email"""
+    """Update doctor approval status when a document is saved and queue notifications"""
     
     print(f"📨 Signal déclenché pour document {instance.id}, créé: {created}")
     
-    # Skip if this is a new creation (not an update)
+    # Skip emails if this is a new creation (not an update)
     if created:
         print("➡️ Nouveau document, skip email")
+        instance.doctor.update_approval_status()
         return
     
-    # Get the previous state to check if status changed
-    try:
-        old_instance = VerificationDocument.objects.get(pk=instance.pk)
-        status_changed = old_instance.status != instance.status
-        comment_changed = old_instance.comment != instance.comment
+    # Compare with the state captured in pre_save
+    previous = getattr(instance, '_previous_state', None)
+    if previous is not None:
+        status_changed = previous['status'] != instance.status
+        comment_changed = previous['comment'] != instance.comment
         print(f"🔄 Status changé: {status_changed}, Comment changé: {comment_changed}")
-    except VerificationDocument.DoesNotExist:
+    else:
         status_changed = True
         comment_changed = True
         print("⚠️ Document précédent non trouvé")
     
-    # Update doctor status
+    # Update doctor status (writes only on an actual transition)
     doctor = instance.doctor
-    previous_approved_status = doctor.is_approved
-    doctor.check_approval_status()
+    previous_approved_status, _ = doctor.update_approval_status()
     
     print(f"👨‍⚕️ Docteur {doctor.user.email}, précédemment approuvé: {previous_approved_status}, maintenant: {doctor.is_approved}")
     
-    # Send email notifications based on changes
-    doctor_email = doctor.user.email
-    doctor_name = f"{doctor.user.first_name} {doctor.user.last_name}"
-    
-    # Send email if status changed to approved
-    if status_changed and instance.status == 'approved':
-        print("✅ Envoi email d'approbation")
-        send_email_to_doctor(
-            subject="Votre document a été approuvé - Neurevia",
-            template_name="emails/document_approved.html",
-            context={
-                'doctor_name': doctor_name,
-                'document_type': instance.doc_type or "Document de vérification",
-                'comment': instance.comment
-            },
-            to_email=doctor_email
-        )
-    
-    # Send email if status changed to rejected
-    elif status_changed and instance.status == 'rejected':
-        print("❌ Envoi email de rejet")
-        send_email_to_doctor(
-            subject="Votre document a été rejeté - Neurevia",
-            template_name="emails/document_rejected.html",
-            context={
-                'doctor_name': doctor_name,
-                'document_type': instance.doc_type or "Document de vérification",
-                'comment': instance.comment
-            },
-            to_email=doctor_email
-        )
-    
-    # Send email if comment was added/changed (without status change)
+    # Notifications bufferisées par médecin : un seul email récapitulatif est
+    # envoyé à la fin de la fenêtre (manage.py dispatch_emails)
+    events = []
+    if status_changed and instance.status in ('approved', 'rejected'):
+        print(f"📝 Événement statut ({instance.status}) mis en attente")
+        events.append(DocumentNotificationEvent(
+            doctor=doctor, document=instance, kind='status',
+            doc_type=instance.doc_type, status=instance.status, comment=instance.comment,
+        ))
     elif comment_changed and instance.comment and not status_changed:
-        print("💬 Envoi email de commentaire")
-        status_display = "Approuvé" if instance.status == 'approved' else "Rejeté" if instance.status == 'rejected' else "En attente"
-        
-        send_email_to_doctor(
-            subject=f"Commentaire ajouté à votre document {status_display} - Neurevia",
-            template_name="emails/document_comment.html",
-            context={
-                'doctor_name': doctor_name,
-                'document_type': instance.doc_type or "Document de vérification",
-                'status': status_display,
-                'comment': instance.comment
-            },
-            to_email=doctor_email
-        )
+        print("💬 Événement commentaire mis en attente")
+        events.append(DocumentNotificationEvent(
+            doctor=doctor, document=instance, kind='comment',
+            doc_type=instance.doc_type, status=instance.status, comment=instance.comment,
+        ))
     
-    # Send congratulatory email if doctor just became fully approved
+    # Doctor just became fully approved
     if not previous_approved_status and doctor.is_approved:
-        print("🎉 Envoi email de félicitations pour approbation complète")
-        login_url = f"{getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')}/auth"
-        send_email_to_doctor(
-        subject="Félicitations ! Votre compte Neurevia est entièrement approuvé",
-        template_name="emails/doctor_fully_approved.html",  # ← NOM COURT!
-        context={
-            'doctor_name': doctor_name,
-            'login_url': login_url
-        },
-        to_email=doctor_email
-    )
-        
-
-
-
+        print("🎉 Événement approbation complète mis en attente")
+        events.append(DocumentNotificationEvent(doctor=doctor, kind='account_approved'))
+    
+    DocumentNotificationEvent.objects.bulk_create(events)
@@ -0,0 +1,94 @@
+# backend/api/notifications.py
+"""
+Regroupement des notifications de documents de vérification.
+
+Les changements de statut / commentaires sont enregistrés comme
+``DocumentNotificationEvent`` (signal post_save, actions groupées de l'admin).
+``flush_notification_digests`` envoie UN email par médecin dès que son plus
+ancien événement a dépassé la fenêtre ``NOTIFICATION_DIGEST_WINDOW`` : une
+session de revue de plusieurs documents ne produit qu'un seul email.
+"""
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import DocumentNotificationEvent, send_email_to_doctor
+
+
+DIGEST_WINDOW = getattr(settings, "NOTIFICATION_DIGEST_WINDOW", 300)  # secondes
+
+STATUS_LABELS = {"approved": "Approuvé", "rejected": "Rejeté", "pending": "En attente"}
+
+
+def _build_digest_context(doctor, events):
+    # Dernier état connu de chaque document, dans l'ordre d'apparition
+    documents = {}
+    fully_approved = False
+    for event in events:
+        if event.kind == "account_approved":
+            fully_approved = True
+            continue
+        key = event.document_id or f"event-{event.pk}"
+        documents.pop(key, None)
+        documents[key] = {
+            "document_type": event.doc_type or "Document de vérification",
+            "status": STATUS_LABELS.get(event.status, event.status),
+            "comment": event.comment,
+            "raw_status": event.status,
+        }
+
+    return {
+        "doctor_name": f"{doctor.user.first_name} {doctor.user.last_name}",
+        "documents": list(documents.values()),
+        "has_rejected": any(doc["raw_status"] == "rejected" for doc in documents.values()),
+        "fully_approved": fully_approved,
+        "login_url": f"{getattr(settings, 'FRONTEND_URL', 'http://localhost:3000')}/auth",
+    }
+
+
+def flush_notification_digests(force=False, window=None):
+    """
+    Envoie (via l'outbox) un digest par médecin dont la fenêtre est écoulée.
+    ``force=True`` ignore la fenêtre. Renvoie le nombre de digests.
+    """
+    window = DIGEST_WINDOW if window is None else window
+    cutoff = timezone.now() - timezone.timedelta(seconds=window)
+
+    with transaction.atomic():
+        due = DocumentNotificationEvent.objects.values("doctor_id").annotate(first=Min("created_at"))
+        if not force:
+            due = due.filter(first__lte=cutoff)
+        doctor_ids = [row["doctor_id"] for row in due]
+        if not doctor_ids:
+            return 0
+
+        events = list(
+            DocumentNotificationEvent.objects.select_for_update(skip_locked=True, of=("self",))
+            .select_related("doctor__user")
+            .filter(doctor_id__in=doctor_ids)
+            .order_by("doctor_id", "id")
+        )
+
+        digests = 0
+        queued = []
+        for _, doctor_events in groupby(events, key=lambda event: event.doctor_id):
+            doctor_events = list(doctor_events)
+            doctor = doctor_events[0].doctor
+            context = _build_digest_context(doctor, doctor_events)
+            subject = (
+                "Félicitations ! Votre compte Neurevia est entièrement approuvé"
+                if context["fully_approved"] else
+                "Vos documents ont été examinés - Neurevia"
+            )
+            # Email non mis en file : les événements sont gardés pour le prochain passage
+            if not send_email_to_doctor(subject, "emails/documents_reviewed.html", context, doctor.user.email):
+                continue
+            queued.extend(event.pk for event in doctor_events)
+            digests += 1
+
+        DocumentNotificationEvent.objects.filter(pk__in=queued).delete()
+
+    return digests
@@ -0,0 +1,98 @@
+# backend/api/outbox.py
+"""
+Envoi des emails de l'outbox (OutgoingEmail).
+
+Les emails sont écrits en base par ``send_email_to_doctor`` dans la même
+transaction que le changement qui les déclenche ; ``dispatch_outbox`` les
+envoie par lots sur UNE connexion SMTP réutilisée, avec retry et backoff
+exponentiel. Lancé par ``manage.py dispatch_emails`` (cron ou ``--loop``).
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, "EMAIL_OUTBOX_BATCH_SIZE", 50)
+MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+RETRY_BASE_DELAY = getattr(settings, "EMAIL_OUTBOX_RETRY_DELAY", 60)  # secondes
+
+
+def _build_message(outgoing, connection):
+    message = EmailMultiAlternatives(
+        subject=outgoing.subject,
+        body=outgoing.text_body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[outgoing.to_email],
+        connection=connection,
+    )
+    if outgoing.html_body:
+        message.attach_alternative(outgoing.html_body, "text/html")
+    return message
+
+
+def _schedule_retry(outgoing, error, now):
+    outgoing.attempts += 1
+    outgoing.last_error = str(error)
+    if outgoing.attempts >= MAX_ATTEMPTS:
+        outgoing.status = "failed"
+    else:
+        # 1 min, 2 min, 4 min, ...
+        delay = RETRY_BASE_DELAY * 2 ** (outgoing.attempts - 1)
+        outgoing.next_attempt_at = now + timezone.timedelta(seconds=delay)
+    outgoing.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def dispatch_outbox(batch_size=None, connection=None):
+    """
+    Envoie un lot d'emails en attente. Renvoie ``(envoyés, en échec)``.
+
+    Les lignes sont verrouillées avec ``skip_locked`` : plusieurs dispatchers
+    peuvent tourner en parallèle sans envoyer deux fois le même email.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    now = timezone.now()
+    sent = failed = 0
+
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", next_attempt_at__lte=now)
+            .order_by("next_attempt_at", "id")[:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        connection = connection or get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            # Serveur SMTP injoignable : tout le lot est replanifié
+            logger.warning("Outbox: connexion SMTP impossible: %s", e)
+            for outgoing in batch:
+                _schedule_retry(outgoing, e, now)
+            return 0, len(batch)
+
+        try:
+            for outgoing in batch:
+                try:
+                    _build_message(outgoing, connection).send()
+                except Exception as e:
+                    logger.warning("Outbox: échec envoi email %s à %s: %s", outgoing.pk, outgoing.to_email, e)
+                    _schedule_retry(outgoing, e, now)
+                    failed += 1
+                    continue
+                outgoing.status = "sent"
+                outgoing.attempts += 1
+                outgoing.sent_at = timezone.now()
+                outgoing.save(update_fields=["status", "attempts", "sent_at"])
+                sent += 1
+        finally:
+            connection.close()
+
+    return sent, failed
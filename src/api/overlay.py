@@ -0,0 +1,146 @@
+# backend/api/overlay.py
+"""
+Superposition heatmap / IRM côté serveur, servie en tuiles "deep zoom".
+
+- Niveau ``max_level`` = pleine résolution, chaque niveau inférieur divise
+  la taille par 2 (convention DZI) ; tuiles de ``OVERLAY_TILE_SIZE`` pixels.
+- Une tuile ne lit que sa région des images sources (``resize(box=...)``),
+  puis mélange IRM et heatmap avec NumPy : le client ne télécharge que les
+  tuiles visibles, jamais les images pleine taille.
+- Cache disque : ``OVERLAY_TILE_CACHE_DIR/<analyse>/<version>/<opacité>/<niveau>/<col>_<row>.webp``
+  où ``version`` dépend des fichiers sources (une nouvelle heatmap invalide
+  les tuiles). ``manage.py prune_overlay_tiles`` purge les anciennes tuiles.
+"""
+import hashlib
+import io
+import math
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .derivatives import to_8bit
+
+
+TILE_SIZE = getattr(settings, "OVERLAY_TILE_SIZE", 256)
+TILE_QUALITY = getattr(settings, "OVERLAY_TILE_QUALITY", 85)
+TILE_CACHE_DIR = Path(getattr(settings, "OVERLAY_TILE_CACHE_DIR", Path(tempfile.gettempdir()) / "overlay_tiles"))
+OPACITY_STEP = 5  # opacité arrondie à 5 % : nombre borné de variantes en cache
+DEFAULT_OPACITY = 50
+
+
+class TileOutOfRange(Exception):
+    pass
+
+
+def parse_opacity(value):
+    """'0.35' -> 35 (pourcentage, arrondi à ``OPACITY_STEP``)."""
+    try:
+        opacity = float(value) if value not in (None, "") else DEFAULT_OPACITY / 100
+    except ValueError:
+        raise ValueError("opacity must be a number between 0 and 1")
+    if not 0 <= opacity <= 1:
+        raise ValueError("opacity must be a number between 0 and 1")
+    return int(round(opacity * 100 / OPACITY_STEP) * OPACITY_STEP)
+
+
+def sources_version(analyse):
+    names = f"{analyse.irm_original.name}|{analyse.heatmap_img.name or ''}"
+    return hashlib.sha256(names.encode()).hexdigest()[:12]
+
+
+# ---- Images sources (décodées une fois par process) ----
+def _jet(values):
+    # Palette bleu -> cyan -> jaune -> rouge pour les heatmaps en niveaux de gris
+    anchors = np.array([0, 85, 170, 255], dtype=np.float32)
+    channels = [(0, 0, 255, 255), (0, 255, 255, 0), (255, 255, 0, 0)]
+    return np.stack([np.interp(values, anchors, c) for c in channels], axis=-1)
+
+
+def _load_heatmap(image):
+    if image.mode not in ("L", "I;16", "I;16B", "I", "F"):
+        return image.convert("RGBA")
+    # Niveaux de gris : l'intensité donne la couleur et l'opacité
+    values = np.asarray(to_8bit(image), dtype=np.float32)
+    rgba = np.concatenate([_jet(values), values[..., None]], axis=-1)
+    return Image.fromarray(rgba.astype(np.uint8))
+
+
+@lru_cache(maxsize=getattr(settings, "OVERLAY_SOURCE_CACHE_SIZE", 8))
+def load_sources(irm_name, heatmap_name):
+    """(IRM en 'L', heatmap en 'RGBA' ou None), indexé par nom de fichier (unique par contenu)."""
+    from .models import Analyse
+
+    def _open(field, name):
+        storage = Analyse._meta.get_field(field).storage
+        with storage.open(name, "rb") as f:
+            image = Image.open(io.BytesIO(f.read()))
+            image.load()
+        return image
+
+    mri = to_8bit(_open("irm_original", irm_name)).convert("L")
+    heatmap = _load_heatmap(_open("heatmap_img", heatmap_name)) if heatmap_name else None
+    return mri, heatmap
+
+
+# ---- Pyramide ----
+def pyramid(width, height):
+    max_level = math.ceil(math.log2(max(width, height, 1)))
+    return {"width": width, "height": height, "tile_size": TILE_SIZE, "max_level": max_level}
+
+
+def render_tile(mri, heatmap, level, col, row, opacity):
+    width, height = mri.size
+    max_level = pyramid(width, height)["max_level"]
+    if not 0 <= level <= max_level:
+        raise TileOutOfRange()
+
+    scale = 2 ** (max_level - level)
+    level_width, level_height = math.ceil(width / scale), math.ceil(height / scale)
+    x0, y0 = col * TILE_SIZE, row * TILE_SIZE
+    if col < 0 or row < 0 or x0 >= level_width or y0 >= level_height:
+        raise TileOutOfRange()
+    x1, y1 = min(x0 + TILE_SIZE, level_width), min(y0 + TILE_SIZE, level_height)
+
+    # Région de la tuile en coordonnées pleine résolution
+    box = (x0 * scale, y0 * scale, min(x1 * scale, width), min(y1 * scale, height))
+    size = (x1 - x0, y1 - y0)
+    base = np.asarray(mri.resize(size, Image.BILINEAR, box=box, reducing_gap=2.0), dtype=np.float32)
+    composite = np.repeat(base[..., None], 3, axis=-1)
+
+    if heatmap is not None and opacity:
+        # La heatmap (souvent plus petite) est lue dans ses propres coordonnées
+        sx, sy = heatmap.width / width, heatmap.height / height
+        heat_box = (box[0] * sx, box[1] * sy, box[2] * sx, box[3] * sy)
+        heat = np.asarray(heatmap.resize(size, Image.BILINEAR, box=heat_box), dtype=np.float32)
+        alpha = heat[..., 3:] * (opacity / 100 / 255)
+        composite = composite * (1 - alpha) + heat[..., :3] * alpha
+
+    return Image.fromarray(np.clip(composite + 0.5, 0, 255).astype(np.uint8))
+
+
+# ---- Cache disque ----
+def tile_path(analyse, level, col, row, opacity):
+    return TILE_CACHE_DIR / str(analyse.pk) / sources_version(analyse) / str(opacity) / str(level) / f"{col}_{row}.webp"
+
+
+def get_tile(analyse, level, col, row, opacity):
+    """Chemin de la tuile en cache, calculée au premier accès."""
+    path = tile_path(analyse, level, col, row, opacity)
+    if path.exists():
+        return path
+
+    mri, heatmap = load_sources(analyse.irm_original.name, analyse.heatmap_img.name or None)
+    tile = render_tile(mri, heatmap, level, col, row, opacity)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Écriture atomique : un autre process ne lit jamais une tuile partielle
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        tile.save(f, "WEBP", quality=TILE_QUALITY, method=4)
+    os.replace(tmp, path)
+    return path
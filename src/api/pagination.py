@@ -0,0 +1,236 @@
+# backend/api/pagination.py
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import OperationalError, connections, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Pagination par curseur (keyset) sur des colonnes indexées.
+
+    Le curseur encode les valeurs de tri de la dernière ligne renvoyée ; la page
+    suivante est un simple ``WHERE (a, b) > (x, y) ORDER BY a, b LIMIT n``.
+    Pas de ``COUNT(*)`` ni d'OFFSET : la page N coûte autant que la page 1.
+    Le dernier champ de tri doit être unique (``id``) pour des pages stables.
+    """
+    ordering = ('-id',)
+    page_size = getattr(settings, 'KEYSET_PAGE_SIZE', 50)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'KEYSET_MAX_PAGE_SIZE', 200)
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.current_page_size = self.get_page_size(request)
+
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request, queryset.model)
+        if position is not None:
+            queryset = queryset.filter(self.get_after_filter(position))
+
+        # Une ligne de plus pour savoir s'il existe une page suivante
+        rows = list(queryset[:self.current_page_size + 1])
+        self.has_next = len(rows) > self.current_page_size
+        rows = rows[:self.current_page_size]
+        self.next_position = self.get_position(rows[-1]) if self.has_next else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_position))
+
+    # ---- Curseur ----
+    def encode_cursor(self, position):
+        raw = json.dumps(position, default=str, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request, model=None):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        if model is None:
+            return position
+        # Chaque valeur est convertie par son champ : un curseur forgé donne un 404, pas un 500
+        try:
+            return [
+                self.clean_value(self.get_ordering_field(model, field), value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_ordering_field(self, model, field):
+        *relations, name = field.lstrip('-').split('__')
+        for relation in relations:
+            model = model._meta.get_field(relation).related_model
+        return model._meta.get_field(name)
+
+    def clean_value(self, field, value):
+        # Pas de comparaison lt/gt possible avec NULL ; pas d'objet JSON composite
+        if value is None or isinstance(value, (dict, list)):
+            raise ValueError('invalid cursor value')
+        return field.get_prep_value(field.to_python(value))
+
+    # ---- Keyset ----
+    def get_position(self, obj):
+        position = []
+        for field in self.ordering:
+            value = obj
+            for attr in field.lstrip('-').split('__'):
+                value = getattr(value, attr)
+            position.append(value)
+        return position
+
+    def get_after_filter(self, position):
+        """
+        (a, b, c) après (x, y, z) :
+        a > x  OR  (a = x AND b > y)  OR  (a = x AND b = y AND c > z)
+        (``<`` pour les champs triés en ordre décroissant).
+        """
+        condition = Q()
+        equal_prefix = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+
+class PatientKeysetPagination(KeysetPagination):
+    # Index : api_customuser (last_name, id) -- user est unique par patient
+    ordering = ('user__last_name', 'user__id')
+
+
+class AnalyseKeysetPagination(KeysetPagination):
+    # Index : api_analyse (patient_id, date, id)
+    ordering = ('-date', '-id')
+
+
+class TriageKeysetPagination(KeysetPagination):
+    # Index : api_analyse (doctor_id, risk_score DESC, id DESC, date),
+    # ou (doctor_id, prob_<classe> DESC, id DESC, date) via ``score_field``
+    ordering = ('-risk_score', '-id')
+
+    def __init__(self, score_field=None):
+        if score_field is not None:
+            self.ordering = (f'-{score_field}', '-id')
+
+
+# --------------------
+# ADMIN : comptage estimé
+# --------------------
+class CappedCount(int):
+    """Nombre de lignes tronqué (ou estimé) : s'affiche "10,000+"."""
+    def __str__(self):
+        return f"{int(self):,}+"
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator des changelists admin sur les grosses tables.
+
+    - Sans filtre : estimation du planificateur (``pg_class.reltuples``),
+      comptage exact sur SQLite ou si la table est petite / jamais analysée.
+    - Avec filtre : ``COUNT(*)`` plafonné à ``ADMIN_COUNT_CAP`` lignes.
+    - Chaque comptage est limité à ``ADMIN_COUNT_TIMEOUT_MS`` (PostgreSQL).
+    """
+    count_cap = getattr(settings, 'ADMIN_COUNT_CAP', 10000)
+    count_timeout_ms = getattr(settings, 'ADMIN_COUNT_TIMEOUT_MS', 200)
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+
+        if not queryset.query.where:
+            estimate = self._planner_estimate(queryset, connection)
+            if estimate is not None and estimate > self.count_cap:
+                return estimate
+            exact = self._timed(connection, lambda: queryset.count())
+            return exact if exact is not None else CappedCount(self.count_cap)
+
+        # Filtré : SELECT COUNT(*) FROM (SELECT ... LIMIT cap + 1)
+        capped = self._timed(connection, lambda: queryset.order_by()[:self.count_cap + 1].count())
+        if capped is None or capped > self.count_cap:
+            return CappedCount(self.count_cap)
+        return capped
+
+    def _planner_estimate(self, queryset, connection):
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # -1 : table jamais analysée
+        if not row or row[0] is None or row[0] < 0:
+            return None
+        return row[0]
+
+    def _timed(self, connection, run):
+        """Exécute ``run`` avec un statement_timeout ; None si le délai est dépassé."""
+        if connection.vendor != 'postgresql':
+            return run()
+        try:
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout = %s", [self.count_timeout_ms])
+                result = run()
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout TO DEFAULT")
+                return result
+        except OperationalError:
+            return None
+
+
+class EstimatedCountAdminMixin:
+    """ModelAdmin : paginator estimé, sans second COUNT(*) non filtré."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,193 @@
+# backend/api/predictors.py
+"""
+Modèles d'inférence "branchables".
+
+Ce module ne dépend pas des modèles Django : il est importé dans les process
+du pool d'inférence (cf. api/inference.py). Le prédicteur utilisé est choisi
+par ``settings.INFERENCE_PREDICTOR`` (chemin pointé vers une classe).
+
+Entrée d'une prédiction (dict) :
+    analyse_id, type_analyse, maladie, irm_path (ou None), biomarkers (ou None)
+Sortie (dict) :
+    result, confidence, probabilities, shap_values (optionnel),
+    heatmap_png (bytes, optionnel)
+"""
+import hashlib
+import json
+import math
+
+import numpy as np
+from django.utils.module_loading import import_string
+
+
+# Classes de sortie par maladie
+CLASSES = {
+    "Alzheimer": ["CN", "MCI", "AD"],
+    "Parkinson": ["CN", "PD"],
+}
+DEFAULT_CLASSES = ["CN", "AD"]
+# Classe "sain" : le risque d'une analyse est 1 - P(CN)
+HEALTHY_CLASS = "CN"
+# Classes malades : un score par classe, recopié dans Analyse.prob_<classe>
+SCORE_CLASSES = ("AD", "MCI", "PD")
+
+
+class Predictor:
+    """
+    Interface d'un modèle. ``predict_batch`` reçoit un lot d'entrées du même
+    ``type_analyse`` et renvoie les sorties dans le même ordre : un modèle
+    vectorisé (NumPy, ONNX) le surcharge pour un seul passage par lot.
+    """
+    version = "base"
+
+    def predict(self, inputs):
+        raise NotImplementedError
+
+    def predict_batch(self, batch):
+        return [self.predict(inputs) for inputs in batch]
+
+
+class StubPredictor(Predictor):
+    """
+    Modèle factice déterministe (tests, développement sans GPU) : les
+    probabilités dépendent uniquement du contenu de l'entrée, pas du lot.
+
+    ``predict_batch`` est vectorisé : une graine (SHA-256) par entrée, puis
+    une matrice de scores (n, classes) dérivée des graines (splitmix64), un
+    softmax et un argmax pour tout le lot ; de même pour les SHAP.
+    """
+    version = "stub-2"
+    # Amplitude des logits factices (softmax moins plat qu'une normalisation)
+    logit_scale = 4.0
+    shap_scale = 0.1
+
+    def _seed(self, inputs):
+        payload = json.dumps(
+            [inputs.get("type_analyse"), inputs.get("maladie"), inputs.get("biomarkers")],
+            sort_keys=True, default=str,
+        ).encode()
+        digest = hashlib.sha256(payload)
+        if inputs.get("irm_path"):
+            with open(inputs["irm_path"], "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+        return int.from_bytes(digest.digest()[:8], "big")
+
+    def predict(self, inputs):
+        return self.predict_batch([inputs])[0]
+
+    def predict_batch(self, batch):
+        if not batch:
+            return []
+        seeds = np.array([self._seed(inputs) for inputs in batch], dtype=np.uint64)
+        outputs = [None] * len(batch)
+
+        # Un passage par jeu de classes (maladies d'un même lot)
+        groups = {}
+        for row, inputs in enumerate(batch):
+            groups.setdefault(tuple(CLASSES.get(inputs.get("maladie"), DEFAULT_CLASSES)), []).append(row)
+        for classes, rows in groups.items():
+            logits = self.logit_scale * _uniform(seeds[rows], len(classes))
+            logits -= logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            best = probabilities.argmax(axis=1)
+            confidence = probabilities[np.arange(len(rows)), best].round(4).tolist()
+            for row, probs, index, conf in zip(rows, probabilities.round(4).tolist(), best.tolist(), confidence):
+                outputs[row] = {
+                    "result": classes[index],
+                    "confidence": conf,
+                    "probabilities": dict(zip(classes, probs)),
+                    "shap_values": None,
+                }
+
+        # SHAP : une matrice (lignes avec biomarqueurs, nb max de biomarqueurs)
+        names = {
+            row: sorted(inputs["biomarkers"]) for row, inputs in enumerate(batch)
+            if isinstance(inputs.get("biomarkers"), dict) and inputs["biomarkers"]
+        }
+        if names:
+            rows = list(names)
+            width = max(len(row_names) for row_names in names.values())
+            shap = (self.shap_scale * _normal(seeds[rows], width)).round(4).tolist()
+            for row, values in zip(rows, shap):
+                outputs[row]["shap_values"] = dict(zip(names[row], values))
+        return outputs
+
+
+# ---- Nombres pseudo-aléatoires vectorisés (StubPredictor) ----
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _splitmix64(x):
+    x = x + _GOLDEN
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _uniform(seeds, width):
+    """Matrice (len(seeds), width) de flottants dans [0, 1), fonction de chaque graine seule."""
+    counters = np.arange(1, width + 1, dtype=np.uint64) * _GOLDEN
+    with np.errstate(over="ignore"):
+        bits = _splitmix64(seeds[:, None] ^ counters[None, :])
+    return (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def _normal(seeds, width):
+    """Loi normale centrée réduite (Box-Muller), même forme que ``_uniform``."""
+    uniform = _uniform(seeds, 2 * width)
+    radius = np.sqrt(-2.0 * np.log1p(-uniform[:, :width]))
+    return radius * np.cos(2.0 * np.pi * uniform[:, width:])
+
+
+def risk_summary(probabilities):
+    """
+    ``(classe la plus probable, sa probabilité, risque)`` d'un dict de
+    probabilités ; le risque est la probabilité des classes malades
+    (1 - P(CN)), comparable d'une maladie à l'autre.
+    """
+    if not isinstance(probabilities, dict):
+        return None, None, None
+    scores = {}
+    for name, value in probabilities.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        # NaN / inf : jamais dans les colonnes triées
+        if math.isfinite(value):
+            scores[name] = value
+    if not scores:
+        return None, None, None
+    top_class = max(scores, key=scores.get)
+    risk = None
+    if HEALTHY_CLASS in scores:
+        risk = round(min(max(1 - scores[HEALTHY_CLASS], 0.0), 1.0), 6)
+    return top_class, scores[top_class], risk
+
+
+def class_scores(probabilities):
+    """``(P(AD), P(MCI), P(PD))`` dans l'ordre de ``SCORE_CLASSES`` ; None si absente."""
+    if not isinstance(probabilities, dict):
+        return (None,) * len(SCORE_CLASSES)
+    scores = []
+    for name in SCORE_CLASSES:
+        try:
+            value = float(probabilities.get(name))
+        except (TypeError, ValueError):
+            value = None
+        if value is not None and math.isfinite(value):
+            scores.append(round(min(max(value, 0.0), 1.0), 6))
+        else:
+            scores.append(None)
+    return tuple(scores)
+
+
+def load_predictor(path):
+    return import_string(path)()
+
+
+def predictor_version(path):
+    # Attribut de classe : pas besoin de charger le modèle
+    return import_string(path).version
@@ -0,0 +1,66 @@
+# backend/api/reviews.py
+"""
+Revue groupée des documents de vérification (actions de l'admin).
+
+Un seul UPDATE pour tous les documents, puis recalcul de l'approbation une
+seule fois par médecin concerné ; les notifications partent dans le digest du
+médecin (api/notifications.py), au lieu d'un ``save()`` (signaux, recalcul,
+email) par document.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from .dashboard import invalidate_doctor_dashboard
+from .models import DocumentNotificationEvent, VerificationDocument
+
+
+def bulk_review_documents(queryset, new_status, reviewer, default_comment=None):
+    """
+    Passe tous les documents de ``queryset`` à ``new_status``.
+    Renvoie le nombre de médecins notifiés.
+    """
+    with transaction.atomic():
+        documents = list(queryset.select_related("doctor__user").order_by("doctor_id", "id"))
+        if not documents:
+            return 0
+
+        ids = [doc.pk for doc in documents]
+        VerificationDocument.objects.filter(pk__in=ids).update(status=new_status, reviewed_by=reviewer)
+        if default_comment:
+            VerificationDocument.objects.filter(
+                Q(comment__isnull=True) | Q(comment=""), pk__in=ids
+            ).update(comment=default_comment)
+
+        # Seuls les documents dont le statut change sont notifiés
+        changed_by_doctor = defaultdict(list)
+        doctors = {}
+        for doc in documents:
+            doctors[doc.doctor_id] = doc.doctor
+            if doc.status != new_status:
+                doc.status = new_status
+                doc.comment = doc.comment or default_comment
+                changed_by_doctor[doc.doctor_id].append(doc)
+
+        notified = 0
+        for doctor_id, doctor in doctors.items():
+            previous_approved_status, _ = doctor.update_approval_status()
+            # Après le commit : sinon une lecture concurrente remettrait l'ancien état en cache
+            transaction.on_commit(lambda doctor_id=doctor_id: invalidate_doctor_dashboard(doctor_id))
+
+            # Événements regroupés dans le digest du médecin (api/notifications.py)
+            events = [
+                DocumentNotificationEvent(
+                    doctor=doctor, document=doc, kind="status",
+                    doc_type=doc.doc_type, status=doc.status, comment=doc.comment,
+                )
+                for doc in changed_by_doctor.get(doctor_id, [])
+            ]
+            if not previous_approved_status and doctor.is_approved:
+                events.append(DocumentNotificationEvent(doctor=doctor, kind="account_approved"))
+            if events:
+                DocumentNotificationEvent.objects.bulk_create(events)
+                notified += 1
+
+    return notified
@@ -1,6 +1,8 @@
 # api/serializers.py
+from django.db.models import OuterRef, Subquery
 from rest_framework import serializers
-from .models import CustomUser, VerificationDocument , DoctorProfile , PatientProfile
+from .derivatives import DERIVATIVE_SIZES
+from .models import CustomUser, VerificationDocument , DoctorProfile , PatientProfile, Analyse
 
 class VerificationDocumentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -168,14 +170,35 @@ class PatientListSerializer(serializers.ModelSerializer):
             "last_visit_date"
         ]
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Charge l'utilisateur et la dernière analyse (maladie, date) dans la
+        requête principale : nombre de requêtes constant quel que soit le
+        nombre de patients.
+        """
+        latest = Analyse.objects.filter(patient=OuterRef('pk')).order_by('-date', '-id')
+        return queryset.select_related('user').annotate(
+            last_analysis_maladie=Subquery(latest.values('maladie')[:1]),
+            last_analysis_date=Subquery(latest.values('date')[:1]),
+        )
+
+    def _last_analysis(self, obj):
+        # Repli si le queryset n'est pas passé par setup_eager_loading
+        return obj.analyses.order_by('-date', '-id').first()
+
     def get_primary_condition(self, obj):
         # Obtenir la condition principale à partir de la dernière analyse
-        last_analysis = obj.analyses.order_by('-date').first()
+        if hasattr(obj, 'last_analysis_maladie'):
+            return obj.last_analysis_maladie or "Not diagnosed"
+        last_analysis = self._last_analysis(obj)
         return last_analysis.maladie if last_analysis else "Not diagnosed"
 
     def get_last_visit_date(self, obj):
         # Obtenir la date de la dernière visite (dernière analyse)
-        last_analysis = obj.analyses.order_by('-date').first()
+        if hasattr(obj, 'last_analysis_date'):
+            return obj.last_analysis_date
+        last_analysis = self._last_analysis(obj)
         return last_analysis.date if last_analysis else None
 
 
@@ -185,7 +208,12 @@ from .models import Analyse
 
 class AnalyseSerializer(serializers.ModelSerializer):
     patient = serializers.PrimaryKeyRelatedField(queryset=PatientProfile.objects.all())
-    
+    # Stockés en binaire compressé (api/fields.py), exposés en JSON
+    probabilities = serializers.JSONField(required=False, allow_null=True)
+    shap_values = serializers.JSONField(required=False, allow_null=True)
+    # URLs des miniatures / WebP moyens (api/derivatives.py)
+    derivatives = serializers.SerializerMethodField()
+
     class Meta:
         model = Analyse
         fields = '__all__'
@@ -193,9 +221,76 @@ class AnalyseSerializer(serializers.ModelSerializer):
             'irm_original': {'required': False},
             'heatmap_img': {'required': False},
             'rapport': {'required': False},
-            'probabilities': {'required': False},
+            'derivatives_pending': {'read_only': True},
+            # Dérivés de probabilities (Analyse.update_triage_fields)
+            'top_class': {'read_only': True},
+            'top_probability': {'read_only': True},
+            'risk_score': {'read_only': True},
+            'prob_ad': {'read_only': True},
+            'prob_mci': {'read_only': True},
+            'prob_pd': {'read_only': True},
         }
 
+    # ?view=summary : une ligne de tableau, sans les colonnes volumineuses
+    SUMMARY_FIELDS = (
+        'id', 'patient', 'doctor', 'date', 'type_analyse', 'maladie', 'result', 'confidence', 'derivatives',
+    )
+
+    # Liste de triage (TriageView)
+    TRIAGE_FIELDS = (
+        'id', 'patient', 'date', 'type_analyse', 'maladie', 'result', 'confidence',
+        'top_class', 'top_probability', 'risk_score', 'prob_ad', 'prob_mci', 'prob_pd',
+    )
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    def get_derivatives(self, obj):
+        """``{"irm_original": {"thumb": url, "medium": url}, "heatmap_img": {...}}``"""
+        request = self.context.get('request')
+        urls = {}
+        for field, names in (obj.derivatives or {}).items():
+            storage = Analyse._meta.get_field(field).storage
+            urls[field] = {
+                label: request.build_absolute_uri(storage.url(name)) if request else storage.url(name)
+                for label, name in names.items()
+                if label in DERIVATIVE_SIZES
+            }
+        return urls
+
+    @classmethod
+    def requested_fields(cls, query_params):
+        """
+        Champs demandés par ``?fields=a,b`` ou ``?view=summary`` ; None pour
+        tous les champs.
+        """
+        if query_params.get('fields'):
+            fields = [name.strip() for name in query_params['fields'].split(',') if name.strip()]
+            unknown = sorted(set(fields) - set(cls().fields))
+            if unknown:
+                raise serializers.ValidationError({'fields': [f"Unknown field(s): {', '.join(unknown)}"]})
+            return fields
+
+        view = query_params.get('view', 'full')
+        if view == 'summary':
+            return list(cls.SUMMARY_FIELDS)
+        if view != 'full':
+            raise serializers.ValidationError({'view': ["Expected 'summary' or 'full'."]})
+        return None
+
+    @staticmethod
+    def setup_eager_loading(queryset, fields=None, keep=()):
+        """
+        Ne lit en base que les colonnes des champs demandés (plus ``keep``,
+        par exemple les colonnes de tri de la pagination).
+        """
+        if fields is None:
+            return queryset
+        return queryset.only(*fields, *keep)
+
 
 class PatientProfileSerializer(serializers.ModelSerializer):
     first_name = serializers.CharField(source='user.first_name')
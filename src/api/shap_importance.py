@@ -0,0 +1,225 @@
+# backend/api/shap_importance.py
+"""
+Importance SHAP globale, maintenue de façon incrémentale.
+
+Pour chaque (maladie, type_analyse, résultat, variable), ``ShapImportance``
+garde le nombre d'analyses, la somme des |SHAP| et la somme des SHAP signés :
+moyenne |SHAP| et moyenne signée s'en déduisent sans relire les vecteurs.
+
+- Création / modification / suppression d'une Analyse : la contribution
+  précédente est retirée et la nouvelle ajoutée (signals.py), en un UPDATE
+  par groupe avec des expressions F() ; le pipeline d'inférence (bulk_update,
+  sans signal) passe par ``record_changes`` pour tout le lot.
+- ``rebuild_shap_importance`` recalcule tout depuis zéro, par lots
+  vectorisés (commande ``manage.py rebuild_shap_importance``).
+"""
+import math
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, FloatField, IntegerField, Sum, Value, When
+
+from .fields import decode_vector
+from .models import Analyse, ShapImportance
+
+
+# Champs dont dépend la contribution d'une analyse
+TRACKED_FIELDS = ("maladie", "type_analyse", "result", "shap_values")
+FILTERS = ("maladie", "type_analyse", "result")
+REBUILD_CHUNK_SIZE = 5000
+FEATURE_MAX_LENGTH = 100
+
+
+# ---- Contributions ----
+def contribution(maladie, type_analyse, result, shap_values):
+    """``((maladie, type_analyse, result), {variable: shap})`` ou None sans SHAP."""
+    if isinstance(shap_values, (bytes, memoryview)):
+        shap_values = decode_vector(shap_values)
+    if not isinstance(shap_values, dict):
+        return None
+    values = {}
+    for name, value in shap_values.items():
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            continue
+        if math.isfinite(value):
+            values[str(name)[:FEATURE_MAX_LENGTH]] = value
+    if not values:
+        return None
+    return (maladie, type_analyse, result or ""), values
+
+
+def analyse_contribution(analyse):
+    return contribution(analyse.maladie, analyse.type_analyse, analyse.result, analyse.shap_values)
+
+
+def stored_contribution(pk):
+    """Contribution de l'analyse telle qu'enregistrée en base (avant un save)."""
+    row = Analyse.objects.filter(pk=pk).values_list(*TRACKED_FIELDS).first()
+    return contribution(*row) if row else None
+
+
+def tracks(update_fields):
+    return update_fields is None or bool(set(update_fields) & set(TRACKED_FIELDS))
+
+
+# ---- Mise à jour incrémentale ----
+def _deltas(changes):
+    """``[(avant, après)]`` -> ``{groupe: {variable: [count, sum_abs, sum_signed]}}``."""
+    deltas = defaultdict(lambda: defaultdict(lambda: [0, 0.0, 0.0]))
+    for previous, current in changes:
+        if previous == current:
+            continue
+        for item, sign in ((previous, -1), (current, +1)):
+            if item is None:
+                continue
+            bucket, values = item
+            for name, value in values.items():
+                delta = deltas[bucket][name]
+                delta[0] += sign
+                delta[1] += sign * abs(value)
+                delta[2] += sign * value
+    return deltas
+
+
+def _increment(bucket, deltas):
+    """Un UPDATE pour toutes les variables du groupe ; renvoie le nombre de lignes modifiées."""
+    def per_feature(index, output_field):
+        return Case(
+            *(When(feature=name, then=Value(delta[index])) for name, delta in deltas.items()),
+            default=Value(0), output_field=output_field,
+        )
+
+    maladie, type_analyse, result = bucket
+    return ShapImportance.objects.filter(
+        maladie=maladie, type_analyse=type_analyse, result=result, feature__in=list(deltas),
+    ).update(
+        count=F("count") + per_feature(0, IntegerField()),
+        sum_abs=F("sum_abs") + per_feature(1, FloatField()),
+        sum_signed=F("sum_signed") + per_feature(2, FloatField()),
+    )
+
+
+def _create(bucket, name, delta):
+    maladie, type_analyse, result = bucket
+    try:
+        with transaction.atomic():
+            ShapImportance.objects.create(
+                maladie=maladie, type_analyse=type_analyse, result=result, feature=name,
+                count=delta[0], sum_abs=delta[1], sum_signed=delta[2],
+            )
+    except IntegrityError:
+        # Créée entre-temps par une requête concurrente
+        _increment(bucket, {name: delta})
+
+
+def record_changes(changes):
+    """Applique des couples ``(contribution avant, contribution après)``."""
+    deltas = _deltas(changes)
+    with transaction.atomic():
+        for bucket, features in deltas.items():
+            features = {name: delta for name, delta in features.items() if any(delta)}
+            if not features or _increment(bucket, features) == len(features):
+                continue
+            maladie, type_analyse, result = bucket
+            existing = set(
+                ShapImportance.objects.filter(
+                    maladie=maladie, type_analyse=type_analyse, result=result, feature__in=list(features),
+                ).values_list("feature", flat=True)
+            )
+            for name, delta in features.items():
+                # Retrait d'une variable absente : rien à retirer
+                if name not in existing and delta[0] > 0:
+                    _create(bucket, name, delta)
+
+
+# ---- Reconstruction ----
+def _chunk_totals(rows, totals):
+    """Ajoute un lot de lignes à ``totals`` : un calcul NumPy par (groupe, noms de variables)."""
+    groups = defaultdict(list)
+    for maladie, type_analyse, result, raw in rows:
+        if raw is None:
+            continue
+        decoded = decode_vector(raw, as_numpy=True)
+        bucket = (maladie, type_analyse, result or "")
+        if isinstance(decoded, tuple) and decoded[0]:
+            names, values = decoded
+            groups[(bucket, tuple(str(name)[:FEATURE_MAX_LENGTH] for name in names))].append(values)
+            continue
+        # Vecteur JSON (valeurs non numériques...) : chemin Python
+        item = contribution(maladie, type_analyse, result, decoded)
+        if item is not None:
+            bucket, values = item
+            groups[(bucket, tuple(values))].append(np.array(list(values.values()), dtype=np.float64))
+
+    for (bucket, names), vectors in groups.items():
+        matrix = np.vstack(vectors).astype(np.float64)
+        finite = np.isfinite(matrix)
+        matrix = np.where(finite, matrix, 0.0)
+        counts, sums_abs, sums_signed = finite.sum(axis=0), np.abs(matrix).sum(axis=0), matrix.sum(axis=0)
+        for name, count, sum_abs, sum_signed in zip(names, counts, sums_abs, sums_signed):
+            total = totals[(bucket, name)]
+            total[0] += int(count)
+            total[1] += float(sum_abs)
+            total[2] += float(sum_signed)
+
+
+def rebuild_shap_importance(chunk_size=None):
+    """Recalcule toute la table depuis les analyses ; renvoie le nombre de lignes écrites."""
+    chunk_size = chunk_size or REBUILD_CHUNK_SIZE
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    rows = (
+        Analyse.objects.filter(shap_values__isnull=False)
+        .order_by()
+        .values_list(*TRACKED_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        _chunk_totals(chunk, totals)
+
+    with transaction.atomic():
+        ShapImportance.objects.all().delete()
+        ShapImportance.objects.bulk_create(
+            [
+                ShapImportance(
+                    maladie=maladie, type_analyse=type_analyse, result=result, feature=name,
+                    count=count, sum_abs=sum_abs, sum_signed=sum_signed,
+                )
+                for ((maladie, type_analyse, result), name), (count, sum_abs, sum_signed) in totals.items()
+                if count
+            ],
+            batch_size=1000,
+        )
+    return sum(1 for total in totals.values() if total[0])
+
+
+# ---- Lecture ----
+def parse_filters(params):
+    return {name: params[name].strip() for name in FILTERS if (params.get(name) or "").strip()}
+
+
+def global_importance(filters, top=None):
+    """Moyenne |SHAP| et moyenne signée par variable, groupes fusionnés selon ``filters``."""
+    rows = (
+        ShapImportance.objects.filter(count__gt=0, **filters)
+        .values("feature")
+        .annotate(total=Sum("count"), total_abs=Sum("sum_abs"), total_signed=Sum("sum_signed"))
+        .order_by()
+    )
+    features = [
+        {
+            "feature": row["feature"],
+            "count": row["total"],
+            "mean_abs": round(row["total_abs"] / row["total"], 6),
+            "mean_signed": round(row["total_signed"] / row["total"], 6),
+        }
+        for row in rows
+    ]
+    features.sort(key=lambda item: (-item["mean_abs"], item["feature"]))
+    return {"filters": filters, "features": features[:top] if top else features}
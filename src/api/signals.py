@@ -1,27 +1,187 @@
-from django.db.models.signals import post_save, post_delete
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from .models import VerificationDocument, DoctorProfile
 
 def update_doctor_status(doctor: DoctorProfile):
-    docs = doctor.documents.all()
+    # Moteur unique : DoctorProfile.update_approval_status
+    doctor.update_approval_status()
 
-    if not docs.exists():
-        doctor.is_approved = False
-        doctor.verification_status = "pending"
-    elif all(doc.status == "approved" for doc in docs):
-        doctor.is_approved = True
-        doctor.verification_status = "approved"
-    elif any(doc.status == "rejected" for doc in docs):
-        doctor.is_approved = False
-        doctor.verification_status = "rejected"
-    else:
-        doctor.is_approved = False
-        doctor.verification_status = "pending"
 
-    doctor.save()
+# post_save est géré par models.update_doctor_status_on_document_change
+@receiver(post_delete, sender=VerificationDocument)
+def update_doctor_on_document_change(sender, instance, **kwargs):
+    update_doctor_status(instance.doctor)
+
+
+# --------------------
+# AUTH CACHE INVALIDATION
+# --------------------
+from rest_framework.authtoken.models import Token
+from authentication import auth_cache
+from .models import CustomUser
+
+
+# Invalidation après le commit : une requête concurrente ne peut pas remettre
+# en cache l'état d'avant la transaction (approbation, statut...)
+@receiver(post_delete, sender=Token)
+def invalidate_auth_cache_on_token_delete(sender, instance, **kwargs):
+    key = instance.key
+    transaction.on_commit(lambda: auth_cache.invalidate(key))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_auth_cache_on_user_change(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: auth_cache.invalidate_user(user_id))
+
+
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_delete, sender=DoctorProfile)
+def invalidate_auth_cache_on_doctor_change(sender, instance, **kwargs):
+    user_id = instance.user_id
+    transaction.on_commit(lambda: auth_cache.invalidate_user(user_id))
+
+
+# --------------------
+# COMPTEURS PAR MÉDECIN
+# --------------------
+from .counters import record_analysis, record_patient
+from .models import Analyse, PatientProfile
+
+
+@receiver(pre_save, sender=Analyse)
+@receiver(pre_save, sender=PatientProfile)
+def remember_counted_doctor(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Médecin actuellement crédité : un changement de médecin déplace les compteurs
+    instance._counted_doctor = None
+    if raw or instance._state.adding:
+        return
+    if update_fields is None or {"doctor", "doctor_id"} & set(update_fields):
+        # Tuple (doctor_id,) : un médecin précédent None reste distinct de "non suivi"
+        instance._counted_doctor = sender.objects.filter(pk=instance.pk).values_list("doctor_id").first()
+
+
+def doctor_change(instance):
+    """``(ancien médecin, nouveau)`` si la ligne vient de changer de médecin, sinon None (lu une seule fois)."""
+    counted = getattr(instance, "_counted_doctor", None)
+    instance._counted_doctor = None
+    if counted is None or counted[0] == instance.doctor_id:
+        return None
+    return counted[0], instance.doctor_id
+
+
+@receiver(post_save, sender=Analyse)
+def count_analysis_on_save(sender, instance, created, **kwargs):
+    if created:
+        record_analysis(instance.doctor_id, instance.date, +1)
+        return
+    change = doctor_change(instance)
+    if change is not None:
+        previous, current = change
+        record_analysis(previous, instance.date, -1)
+        record_analysis(current, instance.date, +1)
+
+
+@receiver(post_delete, sender=Analyse)
+def count_analysis_on_delete(sender, instance, **kwargs):
+    record_analysis(instance.doctor_id, instance.date, -1)
+
+
+@receiver(post_save, sender=PatientProfile)
+def count_patient_on_save(sender, instance, created, **kwargs):
+    if created:
+        record_patient(instance.doctor_id, +1)
+        return
+    change = doctor_change(instance)
+    if change is not None:
+        previous, current = change
+        record_patient(previous, -1)
+        record_patient(current, +1)
 
 
+@receiver(post_delete, sender=PatientProfile)
+def count_patient_on_delete(sender, instance, **kwargs):
+    record_patient(instance.doctor_id, -1)
+
+
+# --------------------
+# DASHBOARD CACHE INVALIDATION
+# --------------------
+from .dashboard import invalidate_doctor_dashboard
+from .models import Abonnement
+
+
+@receiver(post_save, sender=Analyse)
+@receiver(post_delete, sender=Analyse)
+@receiver(post_save, sender=PatientProfile)
+@receiver(post_delete, sender=PatientProfile)
 @receiver(post_save, sender=VerificationDocument)
 @receiver(post_delete, sender=VerificationDocument)
-def update_doctor_on_document_change(sender, instance, **kwargs):
-    update_doctor_status(instance.doctor)
+@receiver(post_save, sender=Abonnement)
+@receiver(post_delete, sender=Abonnement)
+def invalidate_dashboard_on_change(sender, instance, **kwargs):
+    # Après le commit : sinon une lecture concurrente remettrait l'ancien état en cache
+    doctor_id = instance.doctor_id
+    transaction.on_commit(lambda: invalidate_doctor_dashboard(doctor_id))
+
+
+# --------------------
+# JOBS D'INFÉRENCE
+# --------------------
+from .inference import enqueue_inference
+
+
+@receiver(post_save, sender=Analyse)
+def enqueue_inference_on_create(sender, instance, created, **kwargs):
+    # Une analyse créée sans résultat IA est calculée par run_inference_worker
+    if created and instance.result is None:
+        enqueue_inference(instance)
+
+
+# --------------------
+# IMPORTANCE SHAP GLOBALE
+# --------------------
+from . import shap_importance
+
+
+@receiver(pre_save, sender=Analyse)
+def remember_shap_contribution(sender, instance, update_fields=None, raw=False, **kwargs):
+    # Contribution actuellement comptée, retirée au post_save si elle a changé
+    instance._shap_tracked = not raw and shap_importance.tracks(update_fields)
+    if instance._shap_tracked:
+        instance._shap_previous = (
+            None if instance._state.adding else shap_importance.stored_contribution(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Analyse)
+def update_shap_importance_on_save(sender, instance, **kwargs):
+    if getattr(instance, "_shap_tracked", False):
+        shap_importance.record_changes(
+            [(instance._shap_previous, shap_importance.analyse_contribution(instance))]
+        )
+        # Compté une fois : un save imbriqué (apply_cached dans le post_save de
+        # la création) ne doit pas être recompté par le post_save englobant
+        instance._shap_tracked = False
+
+
+@receiver(post_delete, sender=Analyse)
+def update_shap_importance_on_delete(sender, instance, **kwargs):
+    shap_importance.record_changes([(shap_importance.analyse_contribution(instance), None)])
+
+
+# --------------------
+# BIOMARQUEURS TYPÉS
+# --------------------
+from .biomarkers import sync_biomarkers
+
+
+@receiver(post_save, sender=Analyse)
+def sync_biomarkers_on_save(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and "biomarkers" not in update_fields):
+        return
+    if created and not instance.biomarkers:
+        return
+    sync_biomarkers(instance, created=created)
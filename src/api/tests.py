@@ -0,0 +1,1112 @@
+# backend/api/tests.py
+import base64
+import gzip
+import io
+import json
+import struct
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.base import ContentFile
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication import auth_cache
+
+from api.counters import get_doctor_counters, rebuild_doctor_counters
+from api.derivatives import build_derivatives
+from api.fields import COMPRESSED, KIND_JSON, MAGIC, decode_vector, encode_vector
+from api.models import (
+    Abonnement, Analyse, BiomarkerValue, CustomUser, DocumentNotificationEvent, DoctorCounters,
+    DoctorDailyAnalysisCount, DoctorProfile, InferenceCacheStats, InferenceJob, InferenceResultCache, OutgoingEmail,
+    PatientProfile, ShapImportance, UploadSession, VerificationDocument,
+)
+from api.notifications import flush_notification_digests
+from api.serializers import AnalyseSerializer
+from api import (
+    biomarkers, cohorts, exports, inference, inference_cache, overlay, predictors, reviews, shap_importance, uploads,
+    volumes,
+)
+from api.uploads import UploadError, append_chunk, finalize_upload, start_upload
+
+
+def make_doctor(email="doctor@example.com", approved=True):
+    user = CustomUser.objects.create_user(
+        username=email, email=email, password="password", role="doctor", first_name="Doc", last_name="Tor",
+    )
+    doctor = DoctorProfile.objects.create(
+        user=user, speciality="Neurologie", numero_ordre="1", grade="PH",
+        is_approved=approved, verification_status="approved" if approved else "pending",
+    )
+    client = APIClient()
+    client.cookies["auth_token"] = Token.objects.create(user=user).key
+    return doctor, client
+
+
+class AuthCacheTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+
+    def test_check_auth_is_served_from_cache(self):
+        self.assertEqual(self.client.get("/api/check-auth/").status_code, 200)
+        # État stable : ni token, ni utilisateur, ni profil relus en base
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/check-auth/")
+        self.assertEqual(response.json()["is_approved"], True)
+
+    def test_doctor_change_invalidates_after_commit(self):
+        self.client.get("/api/check-auth/")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            DoctorProfile.objects.get(pk=self.doctor.pk).save()
+        # Pas d'invalidation avant le commit
+        with self.assertNumQueries(0):
+            self.client.get("/api/check-auth/")
+
+        for callback in callbacks:
+            callback()
+        # Relecture unique : token + utilisateur + profil (select_related)
+        with self.assertNumQueries(1):
+            self.client.get("/api/check-auth/")
+
+
+def make_patients(doctor, count, start=0):
+    for index in range(start, start + count):
+        user = CustomUser.objects.create_user(
+            username=f"patient{index}@example.com", email=f"patient{index}@example.com",
+            password=None, role="patient", first_name="Pat", last_name=f"Ient{index:04d}",
+        )
+        patient = PatientProfile.objects.create(user=user, num_dossier=f"D{index:05d}", doctor=doctor)
+        Analyse.objects.create(patient=patient, doctor=doctor, type_analyse="BIOMARKER", maladie="Alzheimer")
+
+
+class DoctorPatientsQueryCountTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+        # Authentification mise en cache : seules les requêtes de la vue sont comptées
+        self.client.get("/api/check-auth/")
+
+    def assertPatientsQueries(self, expected_count):
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/doctor/patients/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), expected_count)
+
+    def test_query_count_does_not_depend_on_patient_count(self):
+        # Page + dernière analyse (sous-requête) en une requête, quelle que soit la taille
+        make_patients(self.doctor, 2)
+        self.assertPatientsQueries(2)
+        make_patients(self.doctor, 38, start=2)
+        self.assertPatientsQueries(40)
+
+
+def cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+class KeysetCursorTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+        make_patients(self.doctor, 3)
+        self.patient = PatientProfile.objects.first()
+
+    def test_forged_cursor_is_not_found(self):
+        for url, position in (
+            ("/api/analyses/triage/", [{"a": 1}, 2]),
+            ("/api/analyses/triage/", [None, 2]),
+            (f"/api/patients/{self.patient.pk}/analyses/", ["not-a-date", 1]),
+            (f"/api/patients/{self.patient.pk}/analyses/", ["2024-02-30", "x"]),
+        ):
+            with self.subTest(url=url, position=position):
+                response = self.client.get(url, {"cursor": cursor(position)})
+                self.assertEqual(response.status_code, 404)
+
+    def test_next_link_round_trip(self):
+        response = self.client.get("/api/doctor/patients/", {"page_size": 2})
+        self.assertEqual(len(response.json()["results"]), 2)
+        response = self.client.get(response.json()["next"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNone(response.json()["next"])
+
+
+class DoctorDashboardCacheTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        cache.clear()
+        self.doctor, self.client = make_doctor()
+        self.client.get("/api/profile/")
+
+    def test_dashboard_is_served_from_cache(self):
+        # Profil + lecture du cache partagé
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/profile/")
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_invalidated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            VerificationDocument.objects.create(doctor=self.doctor, document="verification_documents/a.pdf")
+        # Transaction non validée : le cache reste valable
+        self.assertEqual(self.client.get("/api/profile/").json()["verification"]["total_documents"], 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get("/api/profile/").json()["verification"]["total_documents"], 1)
+
+
+SMTP_DELAY = 1.0
+
+
+class SlowEmailBackend(EmailBackend):
+    """Backend de test : chaque envoi coûte ``SMTP_DELAY`` secondes, comme un SMTP lent."""
+
+    def send_messages(self, messages):
+        time.sleep(SMTP_DELAY * len(messages))
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND=f"{__name__}.SlowEmailBackend")
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor(approved=False)
+        self.admin = CustomUser.objects.create_superuser(
+            username="admin@example.com", email="admin@example.com", password="password", role="admin",
+        )
+        self.client.force_login(self.admin)
+
+    def review(self, document, status):
+        start = time.perf_counter()
+        response = self.client.post(
+            f"/admin/api/verificationdocument/{document.pk}/change/", {"status": status, "comment": ""},
+        )
+        self.assertEqual(response.status_code, 302)
+        return time.perf_counter() - start
+
+    def test_admin_review_does_not_wait_for_smtp(self):
+        documents = [
+            VerificationDocument.objects.create(doctor=self.doctor, document=f"verification_documents/{i}.pdf")
+            for i in range(3)
+        ]
+        # Temps de sauvegarde constant : aucun envoi SMTP pendant la requête
+        for document in documents:
+            self.assertLess(self.review(document, "approved"), SMTP_DELAY / 2)
+        self.assertEqual(mail.outbox, [])
+
+        # Un seul email récapitulatif, écrit dans l'outbox
+        self.assertEqual(flush_notification_digests(force=True), 1)
+        self.assertEqual(OutgoingEmail.objects.filter(to_email=self.doctor.user.email, status="pending").count(), 1)
+
+    def test_dispatch_once_drains_the_outbox(self):
+        OutgoingEmail.objects.bulk_create([
+            OutgoingEmail(to_email=f"doctor{i}@example.com", subject="Neurevia", text_body="...") for i in range(5)
+        ])
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            call_command("dispatch_emails", batch_size=2, stdout=io.StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutgoingEmail.objects.filter(status="pending").exists())
+
+
+class NotificationDigestTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        DocumentNotificationEvent.objects.create(doctor=self.doctor, kind="account_approved")
+
+    def test_events_kept_when_email_not_queued(self):
+        with mock.patch("api.notifications.send_email_to_doctor", return_value=False):
+            self.assertEqual(flush_notification_digests(force=True), 0)
+        self.assertEqual(DocumentNotificationEvent.objects.count(), 1)
+
+        # Passage suivant : email mis en file, événements supprimés
+        self.assertEqual(flush_notification_digests(force=True), 1)
+        self.assertFalse(DocumentNotificationEvent.objects.exists())
+        self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+
+class AdminChangelistQueryCountTests(TestCase):
+    ROWS = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        # bulk_create : pas de signaux, mise en place rapide
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f"user{i}@example.com", email=f"user{i}@example.com", password="!",
+                       role="doctor" if i % 2 else "patient", first_name="First", last_name=f"Last{i:04d}")
+            for i in range(2 * cls.ROWS)
+        ])
+        doctors = DoctorProfile.objects.bulk_create([
+            DoctorProfile(user=user, speciality="Neurologie", numero_ordre=str(user.pk), grade="PH")
+            for user in users[1::2]
+        ])
+        patients = PatientProfile.objects.bulk_create([
+            PatientProfile(user=user, num_dossier=f"D{user.pk}", doctor=doctor)
+            for user, doctor in zip(users[::2], doctors)
+        ])
+        Analyse.objects.bulk_create([
+            Analyse(patient=patient, doctor=patient.doctor, type_analyse="BIOMARKER") for patient in patients
+        ])
+        VerificationDocument.objects.bulk_create([
+            VerificationDocument(doctor=doctor, document=f"verification_documents/{doctor.pk}-{i}.pdf",
+                                 status=("approved", "pending", "rejected")[i])
+            for doctor in doctors for i in range(3)
+        ])
+        today = timezone.now().date()
+        Abonnement.objects.bulk_create([
+            Abonnement(doctor=doctor, type="Normal", mode_paiement="card", prix=10, date_debut=today)
+            for doctor in doctors for _ in range(2)
+        ])
+        cls.admin = CustomUser.objects.create_superuser(
+            username="admin@example.com", email="admin@example.com", password="password", role="admin",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assertChangelistQueries(self, url, count):
+        # Session + admin + comptage + page, puis les listes de filtres : indépendant de ROWS
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_doctor_profile_changelist(self):
+        response = self.assertChangelistQueries("/admin/api/doctorprofile/", 6)
+        self.assertContains(response, "1✓ 1⏳ 1✗")
+        self.assertContains(response, "2 abonnement(s)")
+
+    def test_patient_profile_changelist(self):
+        self.assertChangelistQueries("/admin/api/patientprofile/", 6)
+
+    def test_analyse_changelist(self):
+        self.assertChangelistQueries("/admin/api/analyse/", 7)
+
+
+class DerivativesTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.analyse = Analyse.objects.get()
+
+    def test_volume_source_is_not_flagged_again(self):
+        self.analyse.irm_original.name = "irm/scan.nii.gz"
+        self.analyse.save()
+        self.assertTrue(self.analyse.derivatives_pending)
+
+        # Pas de rendu pour un volume : aucun process du pool sollicité
+        self.assertEqual(build_derivatives(pool=None, limit=10), 1)
+        self.analyse.refresh_from_db()
+        self.assertEqual(self.analyse.derivatives, {"irm_original": {"source": "irm/scan.nii.gz"}})
+        self.assertFalse(self.analyse.derivatives_pending)
+
+        self.analyse.save()
+        self.analyse.refresh_from_db()
+        self.assertFalse(self.analyse.derivatives_pending)
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=str(self.root / "media"))
+        media.enable()
+        self.addCleanup(media.disable)
+        tmp_dir = mock.patch.object(uploads, "TMP_DIR", self.root / "tmp")
+        tmp_dir.start()
+        self.addCleanup(tmp_dir.stop)
+
+    def upload(self, data, filename="scan.bin"):
+        session = start_upload(self.doctor, filename, len(data))
+        return append_chunk(session.pk, self.doctor, 0, io.BytesIO(data), len(data))
+
+    def finalize(self, session):
+        serializer = SimpleNamespace(validated_data={"patient": self.patient, "type_analyse": "MRI"})
+        return finalize_upload(session, serializer)
+
+    def test_concurrent_chunk_is_refused_while_streaming(self):
+        session = start_upload(self.doctor, "scan.bin", 10)
+        test = self
+
+        class Stream(io.BytesIO):
+            def read(self, size=-1):
+                # Pendant le transfert : offset réservé, aucune ligne verrouillée
+                with test.assertRaises(UploadError) as raised:
+                    append_chunk(session.pk, test.doctor, 0, io.BytesIO(b"x" * 10), 10)
+                test.assertEqual(raised.exception.status, 409)
+                return super().read(size)
+
+        session = append_chunk(session.pk, self.doctor, 0, Stream(b"0123456789"), 10)
+        self.assertEqual(session.offset, 10)
+        self.assertIsNone(UploadSession.objects.get(pk=session.pk).writing_until)
+
+    def test_offset_moved_during_streaming_is_refused(self):
+        session = start_upload(self.doctor, "scan.bin", 10)
+
+        class Stream(io.BytesIO):
+            def read(self, size=-1):
+                # Réservation expirée, un autre morceau a été enregistré
+                UploadSession.objects.filter(pk=session.pk).update(offset=10, writing_until=None)
+                return super().read(size)
+
+        with self.assertRaises(UploadError) as raised:
+            append_chunk(session.pk, self.doctor, 0, Stream(b"0123456789"), 10)
+        self.assertEqual((raised.exception.status, raised.exception.offset), (409, 10))
+
+    def test_finalize_reserves_a_unique_name(self):
+        first, second = self.upload(b"first"), self.upload(b"second")
+        field = Analyse._meta.get_field("irm_original")
+        storage, name = field.storage, field.generate_filename(None, "scan.bin")
+        # Course simulée : le second upload se voit proposer le nom déjà pris
+        with mock.patch.object(storage, "get_available_name", side_effect=[name, name, "irm/scan_2.bin"]):
+            analyses = [self.finalize(first), self.finalize(second)]
+
+        names = [analyse.irm_original.name for analyse in analyses]
+        self.assertEqual(names, [name, "irm/scan_2.bin"])
+        with storage.open(names[0]) as f:
+            self.assertEqual(f.read(), b"first")
+        with storage.open(names[1]) as f:
+            self.assertEqual(f.read(), b"second")
+        self.assertFalse(uploads.partial_path(first).exists())
+
+
+class OverlayTileTests(SimpleTestCase):
+    def setUp(self):
+        # 600 x 400 : max_level = ceil(log2(600)) = 10
+        self.mri = Image.fromarray(np.tile(np.arange(600, dtype=np.uint8), (400, 1)), "L")
+        heat = np.zeros((100, 150, 4), dtype=np.uint8)
+        heat[..., 0], heat[..., 3] = 255, 255
+        self.heatmap = Image.fromarray(heat, "RGBA")
+
+    def tile(self, level, col, row, opacity=50):
+        return overlay.render_tile(self.mri, self.heatmap, level, col, row, opacity)
+
+    def test_pyramid(self):
+        self.assertEqual(overlay.pyramid(600, 400), {"width": 600, "height": 400, "tile_size": 256, "max_level": 10})
+        self.assertEqual(overlay.pyramid(512, 512)["max_level"], 9)
+        self.assertEqual(overlay.pyramid(1, 1)["max_level"], 0)
+
+    def test_tile_sizes(self):
+        # Niveau max = pleine résolution, tuiles de bord tronquées
+        self.assertEqual(self.tile(10, 0, 0).size, (256, 256))
+        self.assertEqual(self.tile(10, 2, 1).size, (600 - 512, 400 - 256))
+        # Niveau 9 : image de 300 x 200
+        self.assertEqual(self.tile(9, 1, 0).size, (300 - 256, 200))
+        # Niveau 0 : un seul pixel
+        tile = self.tile(0, 0, 0)
+        self.assertEqual((tile.mode, tile.size), ("RGB", (1, 1)))
+
+    def test_opacity(self):
+        plain = np.asarray(self.tile(10, 0, 0, opacity=0))
+        self.assertTrue((plain[..., 0] == plain[..., 1]).all())
+        self.assertEqual(tuple(np.asarray(self.tile(10, 0, 0, opacity=100))[0, 0]), (255, 0, 0))
+        self.assertEqual(overlay.render_tile(self.mri, None, 10, 0, 0, 100).size, (256, 256))
+
+    def test_out_of_range(self):
+        for level, col, row in ((-1, 0, 0), (11, 0, 0), (10, 3, 0), (10, 0, 2), (10, -1, 0), (0, 1, 0), (0, 0, 1)):
+            with self.subTest(level=level, col=col, row=row), self.assertRaises(overlay.TileOutOfRange):
+                self.tile(level, col, row)
+
+
+def nifti_bytes(array, spacing=(1.0, 1.0, 1.0)):
+    """NIfTI-1 minimal (en-tête de 348 octets, voxels à l'offset 352, ordre F)."""
+    dtypes = {"<i2": (4, 16), "<f4": (16, 32)}
+    datatype, bitpix = dtypes[array.dtype.str]
+    header = bytearray(348)
+    struct.pack_into("<i", header, 0, 348)
+    struct.pack_into("<8h", header, 40, 3, *array.shape, 1, 1, 1, 1)
+    struct.pack_into("<2h", header, 70, datatype, bitpix)
+    struct.pack_into("<8f", header, 76, 1.0, *spacing, 1.0, 1.0, 1.0, 1.0)
+    struct.pack_into("<f", header, 108, 352.0)
+    header[344:348] = b"n+1\0"
+    return bytes(header) + b"\0" * 4 + array.tobytes(order="F")
+
+
+class VolumeTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        media = override_settings(MEDIA_ROOT=str(self.root / "media"))
+        media.enable()
+        self.addCleanup(media.disable)
+        store = mock.patch.object(volumes, "STORE_DIR", self.root / "volumes")
+        store.start()
+        self.addCleanup(store.stop)
+        # x = 4, y = 5, z = 6 : dimensions distinctes pour repérer les axes
+        self.array = np.arange(4 * 5 * 6, dtype=np.int16).reshape(4, 5, 6) - 20
+
+    def ingest(self, name, data):
+        analyse = Analyse.objects.create(patient=self.patient, doctor=self.doctor, type_analyse="MRI")
+        analyse.irm_original.save(name, ContentFile(data), save=False)
+        return volumes.ingest_volume(analyse)
+
+    def assert_slices(self, volume, array):
+        self.assertEqual(volume.shape, [4, 5, 6])
+        for plane, axis in volumes.PLANES.items():
+            for index in range(array.shape[axis]):
+                with self.subTest(plane=plane, index=index):
+                    expected = np.flipud(np.take(array, index, axis=axis).T)
+                    np.testing.assert_array_equal(volumes.read_slice(volume, plane, index), expected)
+            for index in (-1, array.shape[axis]):
+                with self.subTest(plane=plane, index=index), self.assertRaises(IndexError):
+                    volumes.read_slice(volume, plane, index)
+
+    def test_npy(self):
+        for order, array in (("C", self.array), ("F", np.asfortranarray(self.array))):
+            buffer = io.BytesIO()
+            np.save(buffer, array)
+            volume = self.ingest("scan.npy", buffer.getvalue())
+            self.assertEqual((volume.order, volume.dtype, volume.spacing), (order, "<i2", [1.0, 1.0, 1.0]))
+            self.assertEqual((volume.intensity_min, volume.intensity_max), (-20.0, 99.0))
+            self.assert_slices(volume, self.array)
+
+    def test_nifti_gz(self):
+        array = self.array.astype(np.float32)
+        array[0, 0, 0] = np.nan
+        volume = self.ingest("scan.nii.gz", gzip.compress(nifti_bytes(array, spacing=(1.0, 1.5, 2.0))))
+        self.assertEqual((volume.order, volume.dtype, volume.spacing), ("F", "<f4", [1.0, 1.5, 2.0]))
+        # NaN ignoré pour les bornes d'intensité
+        self.assertEqual((volume.intensity_min, volume.intensity_max), (-19.0, 99.0))
+        self.assert_slices(volume, array)
+
+    def test_reingest_replaces_the_stored_file(self):
+        buffer = io.BytesIO()
+        np.save(buffer, self.array)
+        first = self.ingest("scan.npy", buffer.getvalue())
+        second = volumes.ingest_volume(first.analyse)
+        self.assertEqual(first.pk, second.pk)
+        self.assertNotEqual(first.path, second.path)
+        self.assertEqual([p.name for p in (self.root / "volumes" / str(first.analyse_id)).iterdir()],
+                         [Path(second.path).name])
+
+
+class CohortProbabilityTests(SimpleTestCase):
+    def test_mean_probabilities(self):
+        rows = [
+            ("Alzheimer", encode_vector({"CN": 0.2, "MCI": 0.3, "AD": 0.5})),
+            ("Alzheimer", encode_vector({"CN": 0.4, "MCI": 0.1, "AD": 0.5})),
+            ("Parkinson", encode_vector({"CN": 0.9, "PD": 0.1})),
+            # Vecteur compressé (décodé à part), valeurs absentes ou non numériques ignorées
+            ("Autre", encode_vector({f"x{i}": 0.25 for i in range(40)})),
+            ("Parkinson", None),
+            ("Parkinson", encode_vector({"CN": "n/a"})),
+        ]
+        frame = cohorts.frame_from_rows(rows, ["maladie", "probabilities"])
+        self.assertEqual(cohorts.mean_probabilities(frame), {
+            "Alzheimer": {"CN": 0.3, "MCI": 0.2, "AD": 0.5},
+            "Parkinson": {"CN": 0.9, "PD": 0.1},
+            "Autre": {f"x{i}": 0.25 for i in range(40)},
+        })
+
+    def test_mean_probabilities_across_class_sets_and_orders(self):
+        # Plusieurs jeux de classes pour une même maladie : moyenne sur toutes les lignes
+        rows = [
+            ("Alzheimer", encode_vector({"CN": 0.2, "MCI": 0.3, "AD": 0.5})),
+            ("Alzheimer", encode_vector({"CN": 0.8, "AD": 0.2})),
+            ("Alzheimer", encode_vector({"AD": 0.5, "MCI": 0.1, "CN": 0.4})),
+            ("Parkinson", encode_vector({"PD": 0.6, "CN": 0.4})),
+            ("Parkinson", encode_vector({"CN": 0.2, "PD": 0.8})),
+        ]
+        frame = cohorts.frame_from_rows(rows, ["maladie", "probabilities"])
+        self.assertEqual(cohorts.mean_probabilities(frame), {
+            "Alzheimer": {"CN": 0.4667, "MCI": 0.2, "AD": 0.4},
+            "Parkinson": {"CN": 0.3, "PD": 0.7},
+        })
+
+
+class ExportPseudonymKeyTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            username="researcher@example.com", email="researcher@example.com", password=None, role="researcher",
+        )
+        self.client = APIClient()
+        self.client.cookies["auth_token"] = Token.objects.create(user=user).key
+
+    @override_settings(EXPORT_PSEUDONYM_KEY="")
+    def test_export_refused_without_dedicated_key(self):
+        response = self.client.get("/api/cohorts/export/")
+        self.assertEqual(response.status_code, 503)
+        with self.assertRaises(ImproperlyConfigured):
+            exports.stream_export(Analyse.objects.all(), "csv")
+
+    @override_settings(EXPORT_PSEUDONYM_KEY="export-key")
+    def test_export_with_dedicated_key(self):
+        response = self.client.get("/api/cohorts/export/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content).decode().splitlines()[0], ",".join(exports.BASE_COLUMNS))
+        with override_settings(EXPORT_PSEUDONYM_KEY="other-key"):
+            other = exports.pseudonym("patient", "P1")
+        self.assertNotEqual(exports.pseudonym("patient", "P1"), other)
+
+
+class TriageTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+        make_patients(self.doctor, 1)
+        patient = PatientProfile.objects.get()
+        for maladie, probabilities in (
+            ("Alzheimer", {"CN": 0.1, "MCI": 0.7, "AD": 0.2}),
+            ("Alzheimer", {"CN": 0.3, "MCI": 0.1, "AD": 0.6}),
+            ("Parkinson", {"CN": 0.05, "PD": 0.95}),
+        ):
+            Analyse.objects.create(patient=patient, doctor=self.doctor, maladie=maladie, probabilities=probabilities)
+
+    def scores(self, field, **params):
+        response = self.client.get("/api/analyses/triage/", params)
+        self.assertEqual(response.status_code, 200)
+        return [row[field] for row in response.json()["results"]]
+
+    def test_sort_by_risk_and_by_class_score(self):
+        self.assertEqual(self.scores("risk_score"), [0.95, 0.9, 0.7])
+        # Seules les analyses ayant ce score (index partiel)
+        self.assertEqual(self.scores("prob_ad", sort="ad"), [0.6, 0.2])
+        self.assertEqual(self.scores("prob_mci", sort="mci"), [0.7, 0.1])
+        self.assertEqual(self.scores("prob_pd", sort="pd"), [0.95])
+        self.assertEqual(self.client.get("/api/analyses/triage/", {"sort": "cn"}).status_code, 400)
+
+    def test_class_score_next_link(self):
+        response = self.client.get("/api/analyses/triage/", {"sort": "ad", "page_size": 1})
+        self.assertEqual([row["prob_ad"] for row in response.json()["results"]], [0.6])
+        response = self.client.get(response.json()["next"])
+        self.assertEqual([row["prob_ad"] for row in response.json()["results"]], [0.2])
+        self.assertIsNone(response.json()["next"])
+
+
+def run_inference(**kwargs):
+    """process_batches dans un pool de threads (le prédicteur ne lit pas la base)."""
+    with ThreadPoolExecutor(max_workers=1, initializer=inference._init_process,
+                            initargs=(inference.PREDICTOR_PATH,)) as pool:
+        return inference.process_batches(pool, max_wait=kwargs.pop("max_wait", 0), **kwargs)
+
+
+class ShapImportanceTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+
+    def create(self, biomarkers):
+        return Analyse.objects.create(
+            patient=self.patient, doctor=self.doctor, type_analyse="BIOMARKER", biomarkers=biomarkers,
+        )
+
+    def totals(self):
+        return sorted(
+            (row.maladie, row.type_analyse, row.result, row.feature, row.count,
+             round(row.sum_abs, 6), round(row.sum_signed, 6))
+            for row in ShapImportance.objects.filter(count__gt=0)
+        )
+
+    def test_incremental_totals_match_rebuild(self):
+        first = self.create({"abeta42": 600, "ptau": 25})
+        self.create({"abeta42": 450, "ptau": 40, "ttau": 300})
+        run_inference()
+        # Même contenu : résultat repris du cache (save imbriqué dans le post_save de la création)
+        cached = self.create({"abeta42": 600, "ptau": 25})
+        self.assertEqual(cached.inference_jobs.get().status, "done")
+        self.assertEqual(cached.shap_values, Analyse.objects.get(pk=first.pk).shap_values)
+        # Modification puis suppression
+        first.shap_values = {"abeta42": 0.5}
+        first.save()
+        Analyse.objects.get(pk=cached.pk).delete()
+
+        incremental = self.totals()
+        self.assertTrue(incremental)
+        shap_importance.rebuild_shap_importance()
+        self.assertEqual(incremental, self.totals())
+
+
+class InferencePipelineTests(TestCase):
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        # File vide : seules les analyses du test sont réclamées
+        InferenceJob.objects.all().delete()
+
+    def create(self, **fields):
+        return Analyse.objects.create(patient=self.patient, doctor=self.doctor, type_analyse="BIOMARKER", **fields)
+
+    def test_analyse_goes_through_the_pipeline(self):
+        analyse = self.create(maladie="Alzheimer", biomarkers={"abeta42": 600, "ptau": 25})
+        job = analyse.inference_jobs.get()
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(self.client.get(f"/api/analyses/{analyse.pk}/status/").json()["status"], "queued")
+
+        self.assertEqual(run_inference(), 1)
+        job.refresh_from_db()
+        analyse = Analyse.objects.get(pk=analyse.pk)
+        self.assertEqual((job.status, job.progress, job.attempts, job.model_version), ("done", 100, 1, "stub-2"))
+        self.assertEqual(set(analyse.probabilities), {"CN", "MCI", "AD"})
+        self.assertEqual(analyse.result, max(analyse.probabilities, key=analyse.probabilities.get))
+        self.assertEqual(set(analyse.shap_values), {"abeta42", "ptau"})
+        # Colonnes de triage remplies par le bulk_update du lot
+        self.assertEqual(analyse.top_class, analyse.result)
+        self.assertAlmostEqual(analyse.risk_score, 1 - analyse.probabilities["CN"], places=4)
+        self.assertAlmostEqual(analyse.prob_mci, analyse.probabilities["MCI"], places=4)
+        self.assertIsNone(analyse.prob_pd)
+
+        response = self.client.get(f"/api/analyses/{analyse.pk}/status/").json()
+        self.assertEqual((response["status"], response["result"]), ("done", analyse.result))
+        self.assertEqual(response["probabilities"], analyse.probabilities)
+
+    def test_failed_job_is_retried_then_failed(self):
+        analyse = self.create(biomarkers={"abeta42": 600})
+        for attempt in range(1, inference.MAX_ATTEMPTS + 1):
+            [job] = inference.claim_jobs(10)
+            inference.fail_job(job, "model crashed")
+            job.refresh_from_db()
+            expected = "queued" if attempt < inference.MAX_ATTEMPTS else "failed"
+            self.assertEqual((job.status, job.attempts, job.error), (expected, attempt, "model crashed"))
+        self.assertEqual(inference.claim_jobs(10), [])
+        response = self.client.get(f"/api/analyses/{analyse.pk}/status/").json()
+        self.assertEqual((response["status"], response["error"]), ("failed", "model crashed"))
+
+    def test_stale_running_jobs_are_requeued_then_failed(self):
+        job = self.create(biomarkers={"abeta42": 600}).inference_jobs.get()
+        self.assertEqual(inference.claim_jobs(10), [job])
+        # Worker arrêté après la réclamation
+        InferenceJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(inference.requeue_stale_jobs(timeout=60), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+
+        # Dernier essai réclamé puis perdu : échec définitif
+        InferenceJob.objects.filter(pk=job.pk).update(
+            status="running", attempts=inference.MAX_ATTEMPTS, started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(inference.requeue_stale_jobs(timeout=60), (0, 1))
+        response = self.client.get(f"/api/analyses/{job.analyse_id}/status/")
+        self.assertEqual(response.json()["status"], "failed")
+
+    def test_recent_running_jobs_are_left_alone(self):
+        self.create(biomarkers={"abeta42": 600})
+        inference.claim_jobs(10)
+        self.assertEqual(inference.requeue_stale_jobs(timeout=60), (0, 0))
+
+
+class InferenceBatchTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        InferenceJob.objects.all().delete()
+
+    def queue(self, type_analyse, count):
+        return [
+            Analyse.objects.create(
+                patient=self.patient, doctor=self.doctor, type_analyse=type_analyse, biomarkers={"n": index},
+            ).inference_jobs.get().pk
+            for index in range(count)
+        ]
+
+    def claimed(self, **kwargs):
+        return [job.pk for job in inference.claim_batch(**kwargs)]
+
+    def test_batch_is_capped_and_grouped_by_type(self):
+        mri = self.queue("MRI", 3)
+        biomarker = self.queue("BIOMARKER", 2)
+        # Type du plus ancien job, au plus max_size jobs, dans l'ordre d'arrivée
+        self.assertEqual(self.claimed(max_size=2, max_wait=0), mri[:2])
+        self.assertEqual(self.claimed(max_size=2, max_wait=0), mri[2:])
+        self.assertEqual(self.claimed(max_size=2, max_wait=0), biomarker)
+        self.assertEqual(self.claimed(max_size=2, max_wait=0), [])
+
+    def test_incomplete_batch_waits_for_max_wait(self):
+        jobs = self.queue("MRI", 2)
+        self.assertEqual(self.claimed(max_size=3, max_wait=60), [])
+        # Lot complété par une arrivée : réclamé sans attendre
+        jobs += self.queue("MRI", 1)
+        self.assertEqual(self.claimed(max_size=3, max_wait=60), jobs)
+
+        late = self.queue("MRI", 1)
+        InferenceJob.objects.filter(pk__in=late).update(created_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(self.claimed(max_size=3, max_wait=60), late)
+
+
+class InferenceCacheTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        InferenceJob.objects.all().delete()
+        InferenceCacheStats.objects.all().delete()
+
+    def create(self, biomarkers):
+        return Analyse.objects.create(
+            patient=self.patient, doctor=self.doctor, type_analyse="BIOMARKER", maladie="Parkinson",
+            biomarkers=biomarkers,
+        )
+
+    def test_miss_then_hit_for_same_content(self):
+        first = self.create({"abeta42": 600, "ptau": 25})
+        self.assertEqual(first.inference_jobs.get().status, "queued")
+        run_inference()
+        first = Analyse.objects.get(pk=first.pk)
+
+        # Même contenu (1 et 1.0, ordre des clés indifférents) : résultat repris immédiatement
+        second = self.create({"ptau": 25.0, "abeta42": 600})
+        job = second.inference_jobs.get()
+        self.assertEqual(job.input_hash, first.inference_jobs.get().input_hash)
+        self.assertEqual((job.status, job.model_version), ("done", "stub-2"))
+        second = Analyse.objects.get(pk=second.pk)
+        for field in inference_cache.CACHED_FIELDS:
+            self.assertEqual(getattr(second, field), getattr(first, field))
+        self.assertEqual(second.risk_score, first.risk_score)
+
+        self.create({"abeta42": 601, "ptau": 25})
+        stats = inference_cache.cache_stats()
+        self.assertEqual(
+            {name: stats[name] for name in ("hits", "misses", "evictions", "entries", "hit_rate")},
+            {"hits": 1, "misses": 2, "evictions": 0, "entries": 1, "hit_rate": 0.3333},
+        )
+        self.assertEqual(InferenceResultCache.objects.get().hits, 1)
+
+    def test_evict_least_recently_used(self):
+        now = timezone.now()
+        for index, key in enumerate(("a" * 64, "b" * 64, "c" * 64)):
+            InferenceResultCache.objects.create(
+                key=key, model_version="stub-2", last_used_at=now - timedelta(minutes=10 - index),
+            )
+        # Le plus ancien, relu, redevient le plus récent
+        self.assertIsNotNone(inference_cache.lookup("a" * 64))
+        self.assertEqual(inference_cache.evict(max_entries=2), 1)
+        self.assertEqual(sorted(InferenceResultCache.objects.values_list("key", flat=True)), ["a" * 64, "c" * 64])
+        self.assertEqual(inference_cache.evict(max_entries=2), 0)
+        stats = inference_cache.cache_stats()
+        self.assertEqual((stats["hits"], stats["evictions"], stats["entries"]), (1, 1, 2))
+
+
+class BulkReviewTests(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            username="admin@example.com", email="admin@example.com", password=None, role="admin",
+        )
+        self.doctors = [make_doctor(f"doctor{index}@example.com", approved=False)[0] for index in range(2)]
+        for doctor, count in zip(self.doctors, (2, 3)):
+            for index in range(count):
+                VerificationDocument.objects.create(doctor=doctor, document=f"verification_documents/{index}.pdf")
+
+    def test_one_update_one_recompute_and_one_event_batch_per_doctor(self):
+        with mock.patch.object(
+            DoctorProfile, "update_approval_status", autospec=True, side_effect=DoctorProfile.update_approval_status,
+        ) as recompute, mock.patch("api.reviews.invalidate_doctor_dashboard") as invalidate, \
+                self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            notified = reviews.bulk_review_documents(VerificationDocument.objects.all(), "approved", self.admin)
+            # Cache du tableau de bord invalidé seulement après le commit
+            invalidate.assert_not_called()
+
+        self.assertEqual(notified, 2)
+        statements = [query["sql"] for query in queries.captured_queries]
+        self.assertEqual(sum(sql.startswith('UPDATE "api_verificationdocument"') for sql in statements), 1)
+        self.assertEqual(sum(sql.startswith('INSERT INTO "api_documentnotificationevent"') for sql in statements), 2)
+        self.assertEqual(sorted(call.args[0].pk for call in recompute.call_args_list),
+                         [doctor.pk for doctor in self.doctors])
+        self.assertEqual(sorted(call.args[0] for call in invalidate.call_args_list),
+                         [doctor.pk for doctor in self.doctors])
+
+        for doctor, count in zip(self.doctors, (2, 3)):
+            doctor.refresh_from_db()
+            self.assertEqual((doctor.is_approved, doctor.verification_status), (True, "approved"))
+            events = DocumentNotificationEvent.objects.filter(doctor=doctor)
+            self.assertEqual(events.filter(kind="status").count(), count)
+            self.assertEqual(events.filter(kind="account_approved").count(), 1)
+        self.assertEqual(VerificationDocument.objects.exclude(status="approved").count(), 0)
+
+
+class RiskSummaryTests(SimpleTestCase):
+    def test_non_finite_scores_are_ignored(self):
+        self.assertEqual(predictors.risk_summary({"CN": float("nan"), "AD": 0.7, "MCI": float("inf")}), ("AD", 0.7, None))
+        self.assertEqual(predictors.risk_summary({"CN": 0.25, "AD": float("-inf")}), ("CN", 0.25, 0.75))
+        self.assertEqual(predictors.risk_summary({"CN": float("nan")}), (None, None, None))
+        self.assertEqual(predictors.class_scores({"AD": float("nan"), "MCI": "0.3", "PD": None}), (None, 0.3, None))
+
+
+class ApprovalStatusTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor(approved=False)
+        # bulk_create / update : pas de signal, seul update_approval_status recalcule
+        VerificationDocument.objects.bulk_create([
+            VerificationDocument(doctor=self.doctor, document=f"verification_documents/{index}.pdf")
+            for index in range(3)
+        ])
+
+    def statuses(self, *statuses):
+        for document, status in zip(self.doctor.documents.order_by("id"), statuses):
+            VerificationDocument.objects.filter(pk=document.pk).update(status=status)
+
+    def update(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = self.doctor.update_approval_status()
+        updates = [q["sql"] for q in queries.captured_queries if q["sql"].startswith('UPDATE "api_doctorprofile"')]
+        return result, len(updates)
+
+    def test_single_aggregate_outcome(self):
+        for statuses, expected in (
+            (("approved", "pending", "pending"), (False, "pending")),
+            (("approved", "rejected", "pending"), (False, "rejected")),
+            (("approved", "approved", "approved"), (True, "approved")),
+        ):
+            with self.subTest(statuses=statuses):
+                self.statuses(*statuses)
+                self.doctor.update_approval_status()
+                self.doctor.refresh_from_db()
+                self.assertEqual((self.doctor.is_approved, self.doctor.verification_status), expected)
+
+    def test_no_documents_is_pending(self):
+        self.doctor, _ = make_doctor("nodocs@example.com", approved=False)
+        self.assertEqual(self.update(), ((False, False), 0))
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.verification_status, "pending")
+
+    def test_written_only_on_transition(self):
+        self.statuses("approved", "approved", "approved")
+        self.assertEqual(self.update(), ((False, True), 1))
+        # Statut inchangé : aucun UPDATE de la ligne du médecin
+        self.assertEqual(self.update(), ((True, True), 0))
+        self.statuses("rejected")
+        self.assertEqual(self.update(), ((True, False), 1))
+        self.assertEqual(self.update(), ((False, False), 0))
+
+
+class DoctorCountersTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        self.today = timezone.now().date()
+
+    def counts(self, doctor=None, today=None):
+        counters = get_doctor_counters((doctor or self.doctor).pk, today)
+        return counters.total_patients, counters.total_analyses, counters.recent_analyses
+
+    def rebuilt(self, doctor=None, today=None):
+        counters = rebuild_doctor_counters((doctor or self.doctor).pk, today)
+        return counters.total_patients, counters.total_analyses, counters.recent_analyses
+
+    def test_record_patient_and_analysis(self):
+        self.assertEqual(self.counts(), (0, 0, 0))
+        make_patients(self.doctor, 2)
+        patient = PatientProfile.objects.first()
+        Analyse.objects.create(patient=patient, doctor=self.doctor)
+        self.assertEqual(self.counts(), (2, 3, 3))
+
+        Analyse.objects.filter(patient=patient).first().delete()
+        self.assertEqual(self.counts(), (2, 2, 2))
+        # Suppression en cascade : le patient et ses analyses
+        patient.delete()
+        self.assertEqual(self.counts(), (1, 1, 1))
+        self.assertEqual(self.counts(), self.rebuilt())
+
+    def test_window_rolls_once_per_day(self):
+        make_patients(self.doctor, 3)
+        first, second, _ = Analyse.objects.order_by("id")
+        # update() : dates passées sans signal, puis compteurs recalculés
+        Analyse.objects.filter(pk=first.pk).update(date=self.today - timedelta(days=25))
+        Analyse.objects.filter(pk=second.pk).update(date=self.today - timedelta(days=10))
+        self.assertEqual(self.rebuilt(), (3, 3, 3))
+
+        later = self.today + timedelta(days=10)
+        self.assertEqual(self.counts(today=later), (3, 3, 2))
+        self.assertFalse(DoctorDailyAnalysisCount.objects.filter(day=self.today - timedelta(days=25)).exists())
+        # Même jour : pas de second retrait
+        self.assertEqual(self.counts(today=later), (3, 3, 2))
+        self.assertEqual(self.counts(today=self.today + timedelta(days=25)), (3, 3, 1))
+        self.assertEqual(self.rebuilt(today=self.today + timedelta(days=25)), (3, 3, 1))
+
+    def test_rebuild_repairs_drift(self):
+        make_patients(self.doctor, 2)
+        DoctorCounters.objects.filter(pk=self.doctor.pk).update(total_patients=7, total_analyses=-1, recent_analyses=9)
+        self.assertEqual(self.rebuilt(), (2, 2, 2))
+        self.assertEqual(list(DoctorDailyAnalysisCount.objects.values_list("day", "count")), [(self.today, 2)])
+
+    def test_moving_to_another_doctor_moves_the_counts(self):
+        other, _ = make_doctor("other@example.com")
+        make_patients(self.doctor, 2)
+        patient = PatientProfile.objects.first()
+        analyse = patient.analyses.get()
+
+        patient.doctor = other
+        patient.save()
+        analyse.doctor = other
+        analyse.save(update_fields=["doctor"])
+        self.assertEqual((self.counts(), self.counts(other)), ((1, 1, 1), (1, 1, 1)))
+        # Sauvegarde sans changement de médecin : rien ne bouge
+        analyse.save()
+        patient.save(update_fields=["num_dossier"])
+        self.assertEqual((self.counts(), self.counts(other)), ((1, 1, 1), (1, 1, 1)))
+        self.assertEqual((self.rebuilt(), self.rebuilt(other)), ((1, 1, 1), (1, 1, 1)))
+
+
+class CompactVectorFieldTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+
+    def round_trip(self, probabilities):
+        analyse = Analyse.objects.create(
+            patient=self.patient, doctor=self.doctor, result="CN", probabilities=probabilities,
+        )
+        raw = Analyse.objects.filter(pk=analyse.pk).values_list("probabilities", flat=True).get()
+        return raw, Analyse.objects.get(pk=analyse.pk).probabilities
+
+    def test_dict_and_list(self):
+        for value in ({"CN": 0.5322, "MCI": 0.1, "AD": 0.3678}, [0.25, -1.5, 3e-05, 0.0]):
+            with self.subTest(value=value):
+                raw, decoded = self.round_trip(value)
+                self.assertTrue(raw.startswith(MAGIC))
+                self.assertFalse(raw[len(MAGIC)] & COMPRESSED)
+                self.assertEqual(decoded, value)
+
+    def test_compressed_payload(self):
+        value = {f"feature_{index:03d}": 0.125 for index in range(200)}
+        raw, decoded = self.round_trip(value)
+        self.assertTrue(raw[len(MAGIC)] & COMPRESSED)
+        self.assertLess(len(raw), len(json.dumps(value)) // 4)
+        self.assertEqual(decoded, value)
+        # Chemin NumPy du décodage (plus de SMALL_VECTOR valeurs)
+        self.assertEqual(decode_vector(raw, as_numpy=True)[0], list(value))
+
+    def test_non_numeric_json(self):
+        value = {"CN": "n/a", "nested": {"AD": [1, 2]}}
+        raw, decoded = self.round_trip(value)
+        self.assertEqual(raw[len(MAGIC)] & ~COMPRESSED, KIND_JSON)
+        self.assertEqual(decoded, value)
+
+    def test_legacy_json_text(self):
+        field = Analyse._meta.get_field("probabilities")
+        # Texte JSON d'avant la migration 0014, formulaires de l'admin
+        self.assertEqual(field.to_python('{"CN": 0.2, "AD": 0.8}'), {"CN": 0.2, "AD": 0.8})
+        self.assertEqual(field.to_python("[0.5, 0.5]"), [0.5, 0.5])
+        with self.assertRaises(ValidationError):
+            field.to_python("{not json")
+        self.assertEqual(self.round_trip(field.to_python('{"CN": 0.2, "AD": 0.8}'))[1], {"CN": 0.2, "AD": 0.8})
+
+
+class AnalyseFieldsetTests(TestCase):
+    LARGE_COLUMNS = ("probabilities", "shap_values", "biomarkers", "diagnostic", "rapport")
+
+    def setUp(self):
+        auth_cache.clear()
+        self.doctor, self.client = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+        Analyse.objects.filter(patient=self.patient).update(
+            result="AD", probabilities=encode_vector({"CN": 0.2, "AD": 0.8}), diagnostic="x" * 1000,
+        )
+        self.url = f"/api/patients/{self.patient.pk}/analyses/"
+
+    def selected_columns(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        [sql] = [q["sql"] for q in queries.captured_queries if 'FROM "api_analyse"' in q["sql"]]
+        columns = sql.split(" FROM ")[0].removeprefix("SELECT ")
+        return {name for name in (column.strip() for column in columns.split(",")) if name}, response.json()
+
+    def column(self, name):
+        return f'"api_analyse"."{name}"'
+
+    def test_summary_view_defers_large_columns(self):
+        columns, data = self.selected_columns({"view": "summary"})
+        for name in self.LARGE_COLUMNS:
+            self.assertNotIn(self.column(name), columns)
+        self.assertIn(self.column("result"), columns)
+        self.assertEqual(set(data["results"][0]), set(AnalyseSerializer.SUMMARY_FIELDS))
+
+    def test_fields_param_reads_only_requested_columns(self):
+        columns, data = self.selected_columns({"fields": "id,result"})
+        # Colonnes demandées + tri de la pagination (date, id)
+        self.assertEqual(columns, {self.column(name) for name in ("id", "result", "date")})
+        self.assertEqual(data["results"][0], {"id": data["results"][0]["id"], "result": "AD"})
+
+    def test_full_view_reads_everything(self):
+        columns, data = self.selected_columns({})
+        for name in self.LARGE_COLUMNS:
+            self.assertIn(self.column(name), columns)
+        self.assertEqual(data["results"][0]["probabilities"], {"CN": 0.2, "AD": 0.8})
+
+    def test_deferred_fields_on_instances(self):
+        fields = AnalyseSerializer.requested_fields({"view": "summary"})
+        analyse = AnalyseSerializer.setup_eager_loading(Analyse.objects.filter(patient=self.patient), fields).get()
+        self.assertTrue(set(self.LARGE_COLUMNS) <= analyse.get_deferred_fields())
+        self.assertEqual(self.client.get(self.url, {"fields": "nope"}).status_code, 400)
+
+
+class BiomarkerTableTests(TestCase):
+    def setUp(self):
+        self.doctor, _ = make_doctor()
+        make_patients(self.doctor, 1)
+        self.patient = PatientProfile.objects.get()
+
+    def create(self, biomarkers):
+        return Analyse.objects.create(patient=self.patient, doctor=self.doctor, result="CN", biomarkers=biomarkers)
+
+    def rows(self, analyse):
+        return sorted(analyse.biomarker_values.values_list("marker", "value", "unit"))
+
+    def test_sync_on_save_and_delete(self):
+        analyse = self.create({
+            "abeta42": 600, "ptau": "25,5 pg/mL", "ttau": {"value": "300", "unit": "pg/mL"},
+            "note": "hémolysé", "flag": True, "nan": "NaN",
+        })
+        self.assertEqual(self.rows(analyse), [("abeta42", 600.0, ""), ("ptau", 25.5, "pg/mL"), ("ttau", 300.0, "pg/mL")])
+
+        # JSON inchangé : aucune écriture
+        with CaptureQueriesContext(connection) as queries:
+            analyse.save()
+        self.assertFalse([q for q in queries.captured_queries
+                          if q["sql"].startswith(('INSERT INTO "api_biomarkervalue"', 'DELETE FROM "api_biomarkervalue"'))])
+
+        analyse.biomarkers = {"abeta42": 450}
+        analyse.save(update_fields=["biomarkers"])
+        self.assertEqual(self.rows(analyse), [("abeta42", 450.0, "")])
+
+        analyse.delete()
+        self.assertFalse(BiomarkerValue.objects.exists())
+
+    def test_range_filters(self):
+        low = self.create({"abeta42": 450, "ptau": 40})
+        edge = self.create({"abeta42": 600, "ptau": 20})
+        high = self.create({"abeta42": 900})
+
+        def matching(*ranges):
+            return sorted(biomarkers.filter_analyses(Analyse.objects.all(), biomarkers.parse_ranges(ranges))
+                          .values_list("pk", flat=True))
+
+        # Bornes incluses, vide = non bornée
+        self.assertEqual(matching("abeta42::600"), [low.pk, edge.pk])
+        self.assertEqual(matching("abeta42:600:"), [edge.pk, high.pk])
+        self.assertEqual(matching("abeta42:600:600"), [edge.pk])
+        # Tous les intervalles ; marqueur absent = non retenu
+        self.assertEqual(matching("abeta42::600", "ptau:30:"), [low.pk])
+        self.assertEqual(matching("ptau::100"), [low.pk, edge.pk])
+        self.assertEqual(matching("ttau:0:"), [])
+
+        for invalid in ("abeta42", "abeta42::", ":1:2", "abeta42:x:2", "a:1:2:3"):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                biomarkers.parse_ranges([invalid])
@@ -0,0 +1,276 @@
+# backend/api/uploads.py
+"""
+Uploads reprenables des examens volumineux (IRM, DaTscan).
+
+Protocole :
+    POST   uploads/                     {filename, size?}      -> session, offset 0
+    GET    uploads/<id>/                                       -> offset courant (reprise)
+    PATCH  uploads/<id>/   Upload-Offset: n, corps brut        -> nouvel offset
+    POST   uploads/<id>/finalize/       {patient, type_analyse, ...} -> Analyse
+
+- Chaque morceau est écrit sur disque par blocs de ``UPLOAD_BLOCK_SIZE``,
+  sans jamais être gardé entier en mémoire.
+- Empreinte "par blocs" : sha256 de la suite des sha256 des blocs. Le
+  condensat de chaque bloc est conservé dans la session : le calcul reprend
+  sur n'importe quel process, sans relire le fichier. Un morceau doit donc
+  commencer sur une frontière de bloc ; un morceau plus court que le bloc
+  termine l'upload.
+- Un morceau ne verrouille la session que pour valider et réserver
+  l'offset (``writing_until``) ; il est écrit hors transaction, puis le
+  nouvel offset est enregistré par un UPDATE conditionnel sur l'ancien.
+- La finalisation déplace le fichier dans le stockage des médias (simple
+  renommage sur le même disque, sous un nom réservé par création
+  exclusive) et transmet l'empreinte au cache d'inférence : le fichier
+  n'est pas relu.
+"""
+import errno
+import hashlib
+import os
+import shutil
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Analyse, UploadSession
+
+
+BLOCK_SIZE = getattr(settings, "UPLOAD_BLOCK_SIZE", 1024 * 1024)
+MAX_SIZE = getattr(settings, "UPLOAD_MAX_SIZE", 4 * 1024 ** 3)
+TMP_DIR = Path(getattr(settings, "UPLOAD_TMP_DIR", settings.BASE_DIR / "uploads_tmp"))
+CHUNK_TIMEOUT = getattr(settings, "UPLOAD_CHUNK_TIMEOUT", 600)  # secondes
+DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class UploadError(Exception):
+    """Requête refusée ; ``status`` est le code HTTP à renvoyer."""
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+# --------------------
+# EMPREINTE PAR BLOCS
+# --------------------
+def combine_block_digests(block_digests):
+    return hashlib.sha256(bytes(block_digests)).hexdigest()
+
+
+def file_digest(f):
+    """Empreinte par blocs d'un fichier déjà stocké (même valeur qu'après un upload)."""
+    block_digests = bytearray()
+    for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+        block_digests += hashlib.sha256(block).digest()
+    return combine_block_digests(block_digests)
+
+
+# --------------------
+# SESSIONS
+# --------------------
+def partial_path(session):
+    return TMP_DIR / f"{session.pk}.part"
+
+
+def start_upload(doctor, filename, size=None):
+    filename = os.path.basename(filename or "").strip()
+    if not filename:
+        raise UploadError("filename is required")
+    if size is not None and not 0 < size <= MAX_SIZE:
+        raise UploadError(f"size must be between 1 and {MAX_SIZE} bytes")
+
+    session = UploadSession.objects.create(doctor=doctor, filename=filename, size=size)
+    TMP_DIR.mkdir(parents=True, exist_ok=True)
+    partial_path(session).touch()
+    return session
+
+
+def _read_exact(stream, size):
+    # Un bloc peut arriver en plusieurs lectures réseau
+    data = b""
+    while len(data) < size:
+        more = stream.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _writing(session, now):
+    return session.writing_until is not None and session.writing_until > now
+
+
+def _reserve_chunk(session_id, doctor, offset, length):
+    """Valide le morceau et réserve l'offset ; verrou le temps de cette seule transaction."""
+    with transaction.atomic():
+        session = (
+            UploadSession.objects.select_for_update()
+            .filter(pk=session_id, doctor=doctor)
+            .first()
+        )
+        if session is None:
+            raise UploadError("Upload not found", status=404)
+        if session.finalized_at is not None:
+            raise UploadError("Upload already finalized", status=409, offset=session.offset)
+        if offset != session.offset:
+            raise UploadError("Offset mismatch", status=409, offset=session.offset)
+        now = timezone.now()
+        if _writing(session, now):
+            raise UploadError("A chunk is already being written", status=409, offset=session.offset)
+        if session.offset % BLOCK_SIZE:
+            raise UploadError("Upload is complete, finalize it", status=409, offset=session.offset)
+        limit = session.size if session.size is not None else MAX_SIZE
+        if length <= 0 or session.offset + length > limit:
+            raise UploadError(f"Chunk exceeds the upload size ({limit} bytes)", status=413, offset=session.offset)
+
+        session.writing_until = now + timedelta(seconds=CHUNK_TIMEOUT)
+        session.save(update_fields=["writing_until", "updated_at"])
+    return session
+
+
+def append_chunk(session_id, doctor, offset, stream, length):
+    """
+    Écrit ``length`` octets de ``stream`` à ``offset``. Renvoie la session à
+    jour. L'offset est réservé avant l'écriture : un second morceau concurrent
+    reçoit un 409, sans attendre la fin du transfert.
+    """
+    session = _reserve_chunk(session_id, doctor, offset, length)
+    current = UploadSession.objects.filter(pk=session.pk, offset=session.offset)
+
+    block_digests = bytearray(session.block_digests or b"")
+    written = 0
+    try:
+        with open(partial_path(session), "r+b") as f:
+            f.seek(session.offset)
+            while written < length:
+                block = _read_exact(stream, min(BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                f.write(block)
+                block_digests += hashlib.sha256(block).digest()
+                written += len(block)
+                if len(block) < BLOCK_SIZE:
+                    break
+            # Octets d'un morceau précédent interrompu au-delà de l'offset validé
+            f.truncate()
+    except BaseException:
+        current.update(writing_until=None)
+        raise
+
+    if written != length:
+        current.update(writing_until=None)
+        raise UploadError("Incomplete chunk", status=400, offset=session.offset)
+
+    # Conditionnel : si la réservation a expiré et qu'un autre morceau a avancé
+    # l'offset entre-temps, ce morceau est refusé
+    updated_at = timezone.now()
+    if not current.update(
+        offset=session.offset + written, block_digests=bytes(block_digests),
+        writing_until=None, updated_at=updated_at,
+    ):
+        session.refresh_from_db(fields=["offset"])
+        raise UploadError("Offset mismatch", status=409, offset=session.offset)
+
+    session.offset += written
+    session.block_digests = bytes(block_digests)
+    session.writing_until = None
+    session.updated_at = updated_at
+    return session
+
+
+def finalize_upload(session, analyse_serializer):
+    """
+    Crée l'analyse décrite par ``analyse_serializer`` (déjà validé) avec le
+    fichier assemblé comme ``irm_original``. Idempotent : une session déjà
+    finalisée renvoie son analyse.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(pk=session.pk)
+        if session.finalized_at is not None:
+            return session.analyse
+        if not session.offset:
+            raise UploadError("Upload is empty", status=409, offset=0)
+        if _writing(session, timezone.now()):
+            raise UploadError("A chunk is still being written", status=409, offset=session.offset)
+        if session.size is not None and session.offset != session.size:
+            raise UploadError("Upload is incomplete", status=409, offset=session.offset)
+
+        field = Analyse._meta.get_field("irm_original")
+        path = partial_path(session)
+        name, target = _reserve_name(field.storage, field.generate_filename(None, session.filename), path)
+        try:
+            fields = {
+                name: value for name, value in analyse_serializer.validated_data.items()
+                if name not in ("doctor", "irm_original")
+            }
+            analyse = Analyse(doctor=session.doctor, **fields)
+            analyse.irm_original.name = name
+            # Empreinte déjà connue : le cache d'inférence ne relit pas le fichier
+            analyse._irm_digest = combine_block_digests(session.block_digests)
+            analyse.save()
+
+            session.analyse = analyse
+            session.finalized_at = timezone.now()
+            session.save(update_fields=["analyse", "finalized_at", "updated_at"])
+
+            # En dernier : une erreur annule la transaction, le fichier partiel reste en place
+            if target is not None:
+                _move_into(path, target)
+            else:
+                path.unlink()
+        except BaseException:
+            _release_name(field.storage, name, target)
+            raise
+    return analyse
+
+
+def _reserve_name(storage, name, path):
+    """
+    ``(nom, chemin local)`` d'un fichier du stockage réservé pour l'upload :
+    fichier vide créé avec O_EXCL, aucun autre upload ne peut obtenir ce nom.
+    Stockage distant : le fichier y est envoyé tout de suite par
+    ``storage.save`` (qui choisit un nom libre) ; chemin local None.
+    """
+    try:
+        storage.path(name)
+    except NotImplementedError:
+        # Seul cas où le fichier est relu
+        with open(path, "rb") as f:
+            return storage.save(name, File(f, name=name)), None
+
+    while True:
+        name = storage.get_available_name(name)
+        target = Path(storage.path(name))
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.close(os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        except FileExistsError:
+            # Pris entre get_available_name et la création : nom suivant
+            continue
+        return name, target
+
+
+def _release_name(storage, name, target):
+    if target is not None:
+        target.unlink(missing_ok=True)
+    else:
+        storage.delete(name)
+
+
+def _move_into(path, target):
+    # Remplace le fichier réservé : renommage si même disque, copie sinon
+    try:
+        os.replace(path, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.copyfile(path, target)
+        path.unlink()
+
+
+def discard_upload(session):
+    partial_path(session).unlink(missing_ok=True)
+    session.delete()
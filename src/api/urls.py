@@ -7,6 +7,12 @@ from .views import (
     # Auth & Doctor
     RegisterView, CustomLoginView_2,CheckSubscriptionView, EnhancedLogoutView , CheckAuthView,
     DoctorProfileView, DoctorProfileUpdateView, PatientCreateView , DoctorPatientsView , get_patient_details,
+    PatientAnalysesView, AnalyseCreateView, AnalyseStatusView,
+    AnalyseOverlayView, AnalyseOverlayTileView,
+    UploadStartView, UploadSessionView, UploadFinalizeView,
+    AnalyseVolumeView, AnalyseVolumeSliceView,
+    CohortAnalyticsView, AnalysesExportView, ShapImportanceView,
+    BiomarkerAnalysesView, BiomarkerPatientsView, TriageView,
 )
 
 urlpatterns = [
@@ -26,6 +32,36 @@ urlpatterns = [
     path("patient/", PatientCreateView.as_view(), name="create-patient"),
     path("doctor/patients/", DoctorPatientsView.as_view(), name="doctor-patients"),
     path("patients/<int:patient_id>/", get_patient_details, name="patient-details"),
+    path("patients/<int:patient_id>/analyses/", PatientAnalysesView.as_view(), name="patient-analyses"),
+
+    # === Analyses ===
+    path("analyses/", AnalyseCreateView.as_view(), name="create-analyse"),
+    path("analyses/triage/", TriageView.as_view(), name="analyses-triage"),
+    path("analyses/<int:analyse_id>/status/", AnalyseStatusView.as_view(), name="analyse-status"),
+    path("analyses/<int:analyse_id>/overlay/", AnalyseOverlayView.as_view(), name="analyse-overlay"),
+    path(
+        "analyses/<int:analyse_id>/overlay/<int:level>/<int:col>_<int:row>.webp",
+        AnalyseOverlayTileView.as_view(), name="analyse-overlay-tile",
+    ),
+    path("analyses/<int:analyse_id>/volume/", AnalyseVolumeView.as_view(), name="analyse-volume"),
+    path(
+        "analyses/<int:analyse_id>/volume/<str:plane>/<int:index>/",
+        AnalyseVolumeSliceView.as_view(), name="analyse-volume-slice",
+    ),
+
+    # === Recherche par biomarqueurs ===
+    path("biomarkers/analyses/", BiomarkerAnalysesView.as_view(), name="biomarker-analyses"),
+    path("biomarkers/patients/", BiomarkerPatientsView.as_view(), name="biomarker-patients"),
+
+    # === Uploads reprenables ===
+    path("uploads/", UploadStartView.as_view(), name="upload-start"),
+    path("uploads/<uuid:upload_id>/", UploadSessionView.as_view(), name="upload-session"),
+    path("uploads/<uuid:upload_id>/finalize/", UploadFinalizeView.as_view(), name="upload-finalize"),
+
+    # === Chercheurs ===
+    path("cohorts/analytics/", CohortAnalyticsView.as_view(), name="cohort-analytics"),
+    path("cohorts/export/", AnalysesExportView.as_view(), name="analyses-export"),
+    path("cohorts/shap-importance/", ShapImportanceView.as_view(), name="shap-importance"),
 
 
 ]+ static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,28 +1,38 @@
+import io
+from datetime import date, timedelta
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from .serializers import DoctorRegisterSerializer , PatientSerializer ,  PatientProfileSerializer ,  AnalyseSerializer , PatientListSerializer
 
-from django.http import JsonResponse
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from PIL import Image
 from django.utils import timezone
 from django.contrib.auth import logout
 from django.middleware.csrf import get_token
 
 from .models import (
-    VerificationDocument,
-    DoctorProfile, Abonnement, PatientProfile
+    DoctorProfile, Abonnement, PatientProfile, Analyse, UploadSession, ScanVolume
 )
 from .serializers import (
     DoctorRegisterSerializer, AnalyseSerializer,
     PatientListSerializer
 )
 
-from authentication import CookieTokenAuthentication
+from .pagination import KeysetPagination, PatientKeysetPagination, AnalyseKeysetPagination, TriageKeysetPagination
+from .dashboard import get_doctor_dashboard
+from . import biomarkers, cohorts, exports, overlay, shap_importance, volumes
+from .uploads import BLOCK_SIZE as UPLOAD_BLOCK_SIZE, UploadError, append_chunk, finalize_upload, start_upload
+
+from authentication import CookieTokenAuthentication, auth_cache
 
 
 
@@ -304,31 +314,11 @@ class DoctorProfileView(APIView):
         user = request.user
         
         try:
-            doctor_profile = DoctorProfile.objects.get(user=user)
-            
-            # Get current subscription
-            current_subscription = Abonnement.objects.filter(
-                doctor=doctor_profile,
-                date_debut__lte=timezone.now().date(),
-                date_fin__gte=timezone.now().date(),
-                statut="active"
-            ).first()
-            
-            # Get verification documents status
-            documents = VerificationDocument.objects.filter(doctor=doctor_profile)
-            document_status = {
-                "total_documents": documents.count(),
-                "approved_documents": documents.filter(status="approved").count(),
-                "pending_documents": documents.filter(status="pending").count(),
-                "rejected_documents": documents.filter(status="rejected").count(),
-            }
-            
-            # Get subscription history
-            subscription_history = Abonnement.objects.filter(
-                doctor=doctor_profile
-            ).order_by('-date_debut')[:5].values(
-                'type', 'date_debut', 'date_fin', 'statut', 'prix'
-            )
+            doctor_profile = DoctorProfile.objects.select_related('user').get(user=user)
+            user = doctor_profile.user
+
+            # Abonnement, documents, historique et statistiques (en cache par médecin)
+            dashboard = get_doctor_dashboard(doctor_profile)
             
             response_data = {
                 # User basic info
@@ -357,36 +347,16 @@ class DoctorProfileView(APIView):
                 },
                 
                 # Subscription info
-                "subscription": {
-                    "current_type": current_subscription.type if current_subscription else "FreeTrial",
-                    "current_status": current_subscription.statut if current_subscription else "inactive",
-                    "start_date": current_subscription.date_debut if current_subscription else None,
-                    "end_date": current_subscription.date_fin if current_subscription else None,
-                    "price": float(current_subscription.prix) if current_subscription else 0.0,
-                    "payment_method": current_subscription.mode_paiement if current_subscription else None,
-                } if current_subscription else {
-                    "current_type": "FreeTrial",
-                    "current_status": "inactive",
-                    "start_date": None,
-                    "end_date": None,
-                    "price": 0.0,
-                    "payment_method": None,
-                },
+                "subscription": dashboard["subscription"],
                 
                 # Verification documents
-                "verification": document_status,
+                "verification": dashboard["verification"],
                 
                 # Subscription history
-                "subscription_history": list(subscription_history),
+                "subscription_history": dashboard["subscription_history"],
                 
                 # Statistics (optional)
-                "statistics": {
-                    "total_patients": doctor_profile.patients.count(),
-                    "total_analyses": doctor_profile.analyses.count(),
-                    "recent_analyses": doctor_profile.analyses.filter(
-                        date__gte=timezone.now().date() - timezone.timedelta(days=30)
-                    ).count(),
-                }
+                "statistics": dashboard["statistics"],
             }
             
             return Response(response_data)
@@ -465,9 +435,10 @@ class EnhancedLogoutView(APIView):
 
     def post(self, request):
         try:
-            # Delete the auth token
-            if hasattr(request.user, 'auth_token'):
-                request.user.auth_token.delete()
+            # Delete the auth token (and drop it from the auth cache right away)
+            if request.auth is not None:
+                auth_cache.invalidate(request.auth.key)
+                request.auth.delete()
             
             # Clear Django session (important!)
             logout(request)
@@ -496,9 +467,13 @@ class DoctorPatientsView(APIView):
             return Response({"error": "Only approved doctors can view their patients."}, status=403)
 
         # thanks to related_name="patients"
-        patients = request.user.doctor_profile.patients.all()
-        serializer = PatientListSerializer(patients, many=True)
-        return Response(serializer.data, status=200)  
+        patients = PatientListSerializer.setup_eager_loading(
+            request.user.doctor_profile.patients.all()
+        )
+        paginator = PatientKeysetPagination()
+        page = paginator.paginate_queryset(patients, request, view=self)
+        serializer = PatientListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 class PatientAnalysesView(APIView):
     authentication_classes = [CookieTokenAuthentication]
@@ -510,9 +485,17 @@ class PatientAnalysesView(APIView):
         except PatientProfile.DoesNotExist:
             return Response({"error": "Patient not found"}, status=404)
 
-        analyses = patient.analyses.all().order_by("-date")
-        serializer = AnalyseSerializer(analyses, many=True)
-        return Response(serializer.data, status=200)
+        # ?fields=... / ?view=summary : colonnes non demandées jamais lues en base
+        fields = AnalyseSerializer.requested_fields(request.query_params)
+        paginator = AnalyseKeysetPagination()
+        # Pas patient.analyses : le related manager relirait patient_id s'il est différé
+        analyses = AnalyseSerializer.setup_eager_loading(
+            Analyse.objects.filter(patient=patient), fields,
+            keep=[name.lstrip('-') for name in paginator.ordering],
+        )
+        page = paginator.paginate_queryset(analyses, request, view=self)
+        serializer = AnalyseSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
     
 
 @api_view(['GET'])
@@ -561,3 +544,455 @@ class PatientCreateView(APIView):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+
+
+class AnalyseCreateView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser, JSONParser)
+
+    def post(self, request):
+        if request.user.role != "doctor" or not request.user.doctor_profile.is_approved:
+            return Response(
+                {"error": "Only approved doctors can create analyses."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        doctor = request.user.doctor_profile
+        serializer = AnalyseSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        if serializer.validated_data["patient"].doctor_id != doctor.pk:
+            return Response({"error": "Patient not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        # Le job d'inférence est créé par le signal post_save (api/inference.py)
+        analyse = serializer.save(doctor=doctor)
+        return analysis_accepted(analyse)
+
+
+def analysis_accepted(analyse):
+    job = analyse.inference_jobs.order_by("-id").first()
+    return Response({
+        "analysis": AnalyseSerializer(analyse).data,
+        "job": {"id": job.id, "status": job.status} if job else None,
+    }, status=status.HTTP_202_ACCEPTED)
+
+
+class AnalyseStatusView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, analyse_id):
+        try:
+            analyse = Analyse.objects.only(
+                "id", "doctor_id", "result", "confidence", "probabilities"
+            ).get(id=analyse_id, doctor=request.user.doctor_profile)
+        except (Analyse.DoesNotExist, DoctorProfile.DoesNotExist):
+            return Response({"error": "Analysis not found"}, status=404)
+
+        job = analyse.inference_jobs.order_by("-id").first()
+        response_data = {
+            "analysis_id": analyse.id,
+            "status": job.status if job else "done",
+            "progress": job.progress if job else 100,
+            "error": job.error if job else None,
+            "model_version": job.model_version if job else None,
+        }
+        if response_data["status"] == "done":
+            response_data.update({
+                "result": analyse.result,
+                "confidence": analyse.confidence,
+                "probabilities": analyse.probabilities,
+            })
+        return Response(response_data, status=200)
+
+
+class AnalyseOverlayView(APIView):
+    """Pyramide de tuiles IRM + heatmap (deep zoom) d'une analyse."""
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_analyse(self, request, analyse_id):
+        try:
+            return Analyse.objects.only("id", "doctor_id", "irm_original", "heatmap_img").get(
+                id=analyse_id, doctor=request.user.doctor_profile
+            )
+        except (Analyse.DoesNotExist, DoctorProfile.DoesNotExist):
+            return None
+
+    def get(self, request, analyse_id):
+        analyse = self.get_analyse(request, analyse_id)
+        if analyse is None or not analyse.irm_original:
+            return Response({"error": "Analysis not found"}, status=404)
+        if volumes.is_volume_name(analyse.irm_original.name):
+            return Response({"error": "3D study: use the volume endpoint"}, status=404)
+        try:
+            opacity = overlay.parse_opacity(request.query_params.get("opacity"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        mri, heatmap = overlay.load_sources(analyse.irm_original.name, analyse.heatmap_img.name or None)
+        base_url = request.build_absolute_uri(request.path)
+        return Response({
+            **overlay.pyramid(*mri.size),
+            "format": "webp",
+            "opacity": opacity / 100,
+            "has_heatmap": heatmap is not None,
+            "tiles": f"{base_url}{{level}}/{{col}}_{{row}}.webp?opacity={opacity / 100}"
+                     f"&v={overlay.sources_version(analyse)}",
+        })
+
+
+class AnalyseOverlayTileView(AnalyseOverlayView):
+    def get(self, request, analyse_id, level, col, row):
+        analyse = self.get_analyse(request, analyse_id)
+        if analyse is None or not analyse.irm_original:
+            return Response({"error": "Analysis not found"}, status=404)
+        try:
+            opacity = overlay.parse_opacity(request.query_params.get("opacity"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        try:
+            path = overlay.get_tile(analyse, level, col, row, opacity)
+        except overlay.TileOutOfRange:
+            return Response({"error": "Tile not found"}, status=404)
+
+        response = FileResponse(open(path, "rb"), content_type="image/webp")
+        # L'URL porte la version des images sources (?v=...) : tuile immuable
+        response["Cache-Control"] = "private, max-age=86400"
+        return response
+
+
+# --------------------
+# UPLOADS REPRENABLES (cf. api/uploads.py)
+# --------------------
+def upload_payload(session):
+    return {
+        "id": str(session.id),
+        "filename": session.filename,
+        "size": session.size,
+        "offset": session.offset,
+        "block_size": UPLOAD_BLOCK_SIZE,
+        "finalized": session.finalized_at is not None,
+        "analysis_id": session.analyse_id,
+    }
+
+
+def upload_error(error):
+    data = {"error": str(error)}
+    if error.offset is not None:
+        data["offset"] = error.offset
+    return Response(data, status=error.status)
+
+
+class UploadStartView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.user.role != "doctor" or not request.user.doctor_profile.is_approved:
+            return Response(
+                {"error": "Only approved doctors can upload studies."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        try:
+            size = request.data.get("size")
+            size = int(size) if size not in (None, "") else None
+        except (TypeError, ValueError):
+            return Response({"error": "size must be an integer"}, status=400)
+
+        try:
+            session = start_upload(request.user.doctor_profile, request.data.get("filename"), size)
+        except UploadError as e:
+            return upload_error(e)
+        return Response(upload_payload(session), status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, upload_id):
+        # Reprise : le client repart de l'offset renvoyé
+        session = UploadSession.objects.filter(pk=upload_id, doctor__user=request.user).first()
+        if session is None:
+            return Response({"error": "Upload not found"}, status=404)
+        return Response(upload_payload(session))
+
+    def patch(self, request, upload_id):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except (KeyError, ValueError):
+            return Response({"error": "Upload-Offset and Content-Length headers are required"}, status=400)
+
+        try:
+            # Corps brut lu par blocs : jamais de request.data / request.body
+            session = append_chunk(upload_id, request.user.doctor_profile, offset, request.stream, length)
+        except UploadError as e:
+            return upload_error(e)
+        except DoctorProfile.DoesNotExist:
+            return Response({"error": "Upload not found"}, status=404)
+
+        response = Response(upload_payload(session))
+        response["Upload-Offset"] = str(session.offset)
+        return response
+
+
+class UploadFinalizeView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = (FormParser, JSONParser)
+
+    def post(self, request, upload_id):
+        session = UploadSession.objects.filter(pk=upload_id, doctor__user=request.user).first()
+        if session is None:
+            return Response({"error": "Upload not found"}, status=404)
+        if session.analyse_id is not None:
+            # Finalisation rejouée après une coupure réseau
+            return analysis_accepted(session.analyse)
+
+        serializer = AnalyseSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        if serializer.validated_data["patient"].doctor_id != session.doctor_id:
+            return Response({"error": "Patient not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        try:
+            analyse = finalize_upload(session, serializer)
+        except UploadError as e:
+            return upload_error(e)
+        return analysis_accepted(analyse)
+
+
+# --------------------
+# VOLUMES 3D (cf. api/volumes.py)
+# --------------------
+class AnalyseVolumeView(APIView):
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_volume(self, request, analyse_id):
+        return ScanVolume.objects.filter(
+            analyse_id=analyse_id, analyse__doctor__user=request.user
+        ).first()
+
+    def get(self, request, analyse_id):
+        volume = self.get_volume(request, analyse_id)
+        if volume is None:
+            return Response({"error": "Volume not found"}, status=404)
+        x, y, z = volume.shape
+        base_url = request.build_absolute_uri(request.path)
+        return Response({
+            "shape": volume.shape,
+            "spacing": volume.spacing,
+            "dtype": volume.dtype,
+            "slices": {"sagittal": x, "coronal": y, "axial": z},
+            "slice_url": f"{base_url}{{plane}}/{{index}}/?encoding=png",
+        })
+
+
+class AnalyseVolumeSliceView(AnalyseVolumeView):
+    def get(self, request, analyse_id, plane, index):
+        volume = self.get_volume(request, analyse_id)
+        if volume is None:
+            return Response({"error": "Volume not found"}, status=404)
+        if plane not in volumes.PLANES:
+            return Response({"error": f"plane must be one of {', '.join(volumes.PLANES)}"}, status=400)
+        encoding = request.query_params.get("encoding", "png")
+        if encoding not in ("png", "raw"):
+            return Response({"error": "encoding must be 'png' or 'raw'"}, status=400)
+
+        try:
+            section = volumes.read_slice(volume, plane, index)
+        except IndexError:
+            return Response({"error": "Slice not found"}, status=404)
+
+        if encoding == "raw":
+            response = HttpResponse(section.tobytes(), content_type="application/octet-stream")
+            response["X-Slice-Shape"] = ",".join(str(n) for n in section.shape)
+            response["X-Slice-Dtype"] = section.dtype.str
+        else:
+            buffer = io.BytesIO()
+            Image.fromarray(volumes.to_png_array(volume, section)).save(buffer, "PNG")
+            response = HttpResponse(buffer.getvalue(), content_type="image/png")
+        response["Cache-Control"] = "private, max-age=3600"
+        return response
+
+
+"""___________________________________________________________________________________
+                                Researchers
+   ___________________________________________________________________________________
+"""
+class CohortAnalyticsView(APIView):
+    """Statistiques agrégées (anonymes) d'une cohorte d'analyses, cf. api/cohorts.py."""
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != "researcher" and not request.user.is_staff:
+            return Response({"error": "Forbidden"}, status=403)
+        try:
+            filters, sections = cohorts.parse_params(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        return Response(cohorts.cohort_analytics(filters, sections), status=200)
+
+
+class AnalysesExportView(APIView):
+    """Export pseudonymisé des analyses en flux : ``?output=csv|parquet`` + filtres de cohorte."""
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != "researcher" and not request.user.is_staff:
+            return Response({"error": "Forbidden"}, status=403)
+        output = request.query_params.get("output", "csv")
+        if output not in exports.FORMATS:
+            return Response({"error": f"output must be one of {', '.join(exports.FORMATS)}"}, status=400)
+        if output == "parquet" and not exports.parquet_available():
+            return Response({"error": "Parquet export is not available on this server"}, status=400)
+        try:
+            filters = cohorts.parse_filters(request.query_params)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+
+        content_type, extension = exports.FORMATS[output]
+        try:
+            chunks = exports.stream_export(cohorts.filtered_queryset(filters), output)
+        except ImproperlyConfigured:
+            return Response({"error": "Export is not configured on this server"}, status=503)
+        response = StreamingHttpResponse(chunks, content_type=content_type)
+        filename = f"analyses-{timezone.now():%Y%m%d-%H%M%S}.{extension}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "no-store"
+        return response
+
+
+class ShapImportanceView(APIView):
+    """Importance SHAP globale (sommes maintenues par api/shap_importance.py) : ``?maladie=&type_analyse=&result=&top=``."""
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if request.user.role != "researcher" and not request.user.is_staff:
+            return Response({"error": "Forbidden"}, status=403)
+        try:
+            top = int(request.query_params.get("top") or 0)
+        except ValueError:
+            return Response({"error": "top must be an integer"}, status=400)
+        filters = shap_importance.parse_filters(request.query_params)
+        return Response(shap_importance.global_importance(filters, top=max(top, 0)), status=200)
+
+
+"""___________________________________________________________________________________
+                                Biomarker search
+   ___________________________________________________________________________________
+"""
+class BiomarkerSearchView(APIView):
+    """
+    Analyses (ou patients) dont les biomarqueurs vérifient tous les intervalles
+    ``?range=marker:min:max`` (répétable, bornes incluses), via la table typée
+    ``BiomarkerValue``. Un médecin ne voit que ses analyses, le staff toutes.
+    """
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_analyses(self, request):
+        """Analyses filtrées, ou une Response d'erreur."""
+        if request.user.is_staff:
+            analyses = Analyse.objects.all()
+        elif request.user.role == "doctor" and request.user.doctor_profile.is_approved:
+            analyses = Analyse.objects.filter(doctor=request.user.doctor_profile)
+        else:
+            return Response({"error": "Only approved doctors can search biomarkers."}, status=403)
+        try:
+            ranges = biomarkers.parse_ranges(request.query_params.getlist("range"))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=400)
+        if not ranges:
+            return Response({"error": "At least one range=marker:min:max is required"}, status=400)
+        return biomarkers.filter_analyses(analyses, ranges)
+
+
+class BiomarkerAnalysesView(BiomarkerSearchView):
+    def get(self, request):
+        analyses = self.get_analyses(request)
+        if isinstance(analyses, Response):
+            return analyses
+
+        fields = AnalyseSerializer.requested_fields(request.query_params)
+        paginator = KeysetPagination()
+        analyses = AnalyseSerializer.setup_eager_loading(
+            analyses, fields, keep=[name.lstrip('-') for name in paginator.ordering],
+        )
+        page = paginator.paginate_queryset(analyses, request, view=self)
+        serializer = AnalyseSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
+
+
+class BiomarkerPatientsView(BiomarkerSearchView):
+    def get(self, request):
+        analyses = self.get_analyses(request)
+        if isinstance(analyses, Response):
+            return analyses
+
+        patients = PatientListSerializer.setup_eager_loading(
+            biomarkers.filter_patients(PatientProfile.objects.all(), analyses)
+        )
+        paginator = PatientKeysetPagination()
+        page = paginator.paginate_queryset(patients, request, view=self)
+        serializer = PatientListSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
+"""___________________________________________________________________________________
+                                Triage
+   ___________________________________________________________________________________
+"""
+class TriageView(APIView):
+    """
+    Analyses récentes du médecin, les plus à risque d'abord (``risk_score``
+    = 1 - P(CN)) : parcours de l'index (doctor, risk_score DESC, id DESC, date),
+    pagination keyset. ``?sort=ad|mci|pd`` trie par score d'une classe
+    (index ``prob_<classe>``), ``?days=`` (fenêtre, défaut
+    ``TRIAGE_WINDOW_DAYS``), ``?maladie=``.
+    """
+    authentication_classes = [CookieTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    window_days = getattr(settings, "TRIAGE_WINDOW_DAYS", 30)
+    max_window_days = 365
+    sort_fields = {"risk": "risk_score", "ad": "prob_ad", "mci": "prob_mci", "pd": "prob_pd"}
+
+    def get(self, request):
+        if request.user.role != "doctor" or not request.user.doctor_profile.is_approved:
+            return Response({"error": "Only approved doctors can view their triage list."}, status=403)
+        try:
+            days = int(request.query_params.get("days") or self.window_days)
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=400)
+        if not 1 <= days <= self.max_window_days:
+            return Response({"error": f"days must be between 1 and {self.max_window_days}"}, status=400)
+        score_field = self.sort_fields.get(request.query_params.get("sort") or "risk")
+        if score_field is None:
+            return Response({"error": f"sort must be one of {', '.join(self.sort_fields)}"}, status=400)
+
+        # Date locale, celle d'Analyse.date (auto_now_add) ; USE_TZ désactivé : pas de timezone.localdate()
+        since = date.today() - timedelta(days=days)
+        # Index partiel : seules les analyses ayant ce score
+        analyses = Analyse.objects.filter(
+            doctor=request.user.doctor_profile, date__gte=since, **{f"{score_field}__isnull": False},
+        )
+        if request.query_params.get("maladie"):
+            analyses = analyses.filter(maladie=request.query_params["maladie"])
+
+        fields = list(AnalyseSerializer.TRIAGE_FIELDS)
+        paginator = TriageKeysetPagination(score_field)
+        analyses = AnalyseSerializer.setup_eager_loading(
+            analyses, fields, keep=[name.lstrip('-') for name in paginator.ordering],
+        )
+        page = paginator.paginate_queryset(analyses, request, view=self)
+        serializer = AnalyseSerializer(page, many=True, fields=fields)
+        return paginator.get_paginated_response(serializer.data)
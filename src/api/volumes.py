@@ -0,0 +1,189 @@
+# backend/api/volumes.py
+"""
+Volumes 3D (IRM, DaTscan) en accès mémoire-mappé.
+
+- ``ingest_volume`` lit un NIfTI-1 (``.nii``, ``.nii.gz``) ou un ``.npy``
+  par morceaux et recopie les voxels, non compressés et dans leur ordre
+  d'origine, dans ``VOLUME_STORE_DIR/<analyse>/<uuid>.raw`` ; forme, type,
+  ordre, espacement et bornes d'intensité vont dans ``ScanVolume``.
+- ``read_slice`` ouvre ce fichier en ``np.memmap`` et ne copie qu'une coupe
+  (axiale, coronale ou sagittale) : la mémoire d'une requête est celle
+  d'une coupe, quelle que soit la taille de l'examen.
+- Axes : x (gauche-droite), y (arrière-avant), z (bas-haut), comme NIfTI.
+  Les coupes sont renvoyées transposées et retournées (haut de l'image =
+  y ou z croissant).
+"""
+import gzip
+import os
+import struct
+import uuid
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from .models import ScanVolume
+
+
+STORE_DIR = Path(getattr(settings, "VOLUME_STORE_DIR", settings.BASE_DIR / "volumes"))
+COPY_CHUNK = 8 * 1024 * 1024
+VOLUME_EXTENSIONS = (".nii", ".nii.gz", ".npy")
+
+PLANES = {
+    # plan -> axe fixé
+    "sagittal": 0,
+    "coronal": 1,
+    "axial": 2,
+}
+
+NIFTI_DTYPES = {2: "u1", 4: "i2", 8: "i4", 16: "f4", 64: "f8", 256: "i1", 512: "u2", 768: "u4"}
+
+
+class VolumeError(Exception):
+    pass
+
+
+def is_volume_name(name):
+    return (name or "").lower().endswith(VOLUME_EXTENSIONS)
+
+
+# ---- Lecture des en-têtes ----
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise VolumeError("Truncated file")
+    return data
+
+
+def _read_nifti_header(f):
+    header = _read_exact(f, 348)
+    for endian in "<>":
+        if struct.unpack(f"{endian}i", header[:4])[0] == 348:
+            break
+    else:
+        raise VolumeError("Not a NIfTI-1 file")
+
+    dim = struct.unpack(f"{endian}8h", header[40:56])
+    datatype = struct.unpack(f"{endian}h", header[70:72])[0]
+    pixdim = struct.unpack(f"{endian}8f", header[76:108])
+    vox_offset = int(struct.unpack(f"{endian}f", header[108:112])[0])
+    if datatype not in NIFTI_DTYPES:
+        raise VolumeError(f"Unsupported NIfTI datatype {datatype}")
+    if dim[0] < 3 or any(d <= 0 for d in dim[1:4]):
+        raise VolumeError("Expected a 3D volume")
+
+    # Volume 4D (dynamique) : seule la première frame est conservée
+    _read_exact(f, max(vox_offset, 348) - 348)
+    return {
+        "shape": [int(d) for d in dim[1:4]],
+        "dtype": np.dtype(endian + NIFTI_DTYPES[datatype]).str,
+        "order": "F",
+        "spacing": [round(float(p), 6) for p in pixdim[1:4]],
+    }
+
+
+def _read_npy_header(f):
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if len(shape) != 3:
+        raise VolumeError("Expected a 3D array")
+    if dtype.hasobject or dtype.kind not in "iuf":
+        raise VolumeError(f"Unsupported dtype {dtype}")
+    return {
+        "shape": [int(d) for d in shape],
+        "dtype": dtype.str,
+        "order": "F" if fortran_order else "C",
+        "spacing": [1.0, 1.0, 1.0],
+    }
+
+
+def _open_source(name, f):
+    lowered = name.lower()
+    if lowered.endswith(".nii.gz"):
+        stream = gzip.GzipFile(fileobj=f)
+        return stream, _read_nifti_header(stream)
+    if lowered.endswith(".nii"):
+        return f, _read_nifti_header(f)
+    if lowered.endswith(".npy"):
+        return f, _read_npy_header(f)
+    raise VolumeError("Unsupported volume format (expected .nii, .nii.gz or .npy)")
+
+
+# ---- Ingestion ----
+def ingest_volume(analyse, source=None):
+    """Recopie le volume ``source`` (par défaut ``irm_original``) dans le store."""
+    source = source or analyse.irm_original
+    if not source or not is_volume_name(source.name):
+        raise VolumeError("No volume file on this analysis")
+
+    directory = STORE_DIR / str(analyse.pk)
+    directory.mkdir(parents=True, exist_ok=True)
+    relative = f"{analyse.pk}/{uuid.uuid4().hex}.raw"
+    target = STORE_DIR / relative
+    tmp = target.with_suffix(".tmp")
+
+    with source.open("rb") as f:
+        stream, meta = _open_source(source.name, f)
+        dtype = np.dtype(meta["dtype"])
+        remaining = int(np.prod(meta["shape"])) * dtype.itemsize
+        chunk_size = COPY_CHUNK - COPY_CHUNK % dtype.itemsize
+        low, high = np.inf, -np.inf
+
+        with open(tmp, "wb") as out:
+            while remaining:
+                chunk = _read_exact(stream, min(chunk_size, remaining))
+                values = np.frombuffer(chunk, dtype=dtype)
+                finite = values[np.isfinite(values)] if dtype.kind == "f" else values
+                if finite.size:
+                    low, high = min(low, float(finite.min())), max(high, float(finite.max()))
+                out.write(chunk)
+                remaining -= len(chunk)
+    os.replace(tmp, target)
+
+    previous = ScanVolume.objects.filter(analyse=analyse).first()
+    volume, _ = ScanVolume.objects.update_or_create(
+        analyse=analyse,
+        defaults={
+            "path": relative,
+            "source_name": source.name,
+            "intensity_min": low if np.isfinite(low) else 0.0,
+            "intensity_max": high if np.isfinite(high) else 0.0,
+            **meta,
+        },
+    )
+    if previous is not None and previous.path != relative:
+        (STORE_DIR / previous.path).unlink(missing_ok=True)
+    return volume
+
+
+# ---- Lecture ----
+def open_volume(volume):
+    return np.memmap(
+        STORE_DIR / volume.path, dtype=np.dtype(volume.dtype), mode="r",
+        shape=tuple(volume.shape), order=volume.order,
+    )
+
+
+def read_slice(volume, plane, index):
+    """Coupe ``index`` du plan ``plane`` (tableau 2D, ligne 0 = haut de l'image)."""
+    axis = PLANES[plane]
+    if not 0 <= index < volume.shape[axis]:
+        raise IndexError(index)
+    # Indexation simple : une vue sur le memmap, seules les pages de la coupe
+    # sont lues (np.take recopierait tout le volume en ordre C)
+    selector = [slice(None)] * 3
+    selector[axis] = index
+    section = open_volume(volume)[tuple(selector)]
+    return np.ascontiguousarray(np.flipud(section.T))
+
+
+def to_png_array(volume, section):
+    """Fenêtrage 8 bits sur les bornes d'intensité du volume entier."""
+    low, high = volume.intensity_min, volume.intensity_max
+    if high <= low:
+        return np.zeros(section.shape, dtype=np.uint8)
+    scaled = (section.astype(np.float32) - low) * (255.0 / (high - low))
+    return np.clip(scaled + 0.5, 0, 255).astype(np.uint8)
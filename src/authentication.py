@@ -1,12 +1,168 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
 
+from api.models import CustomUser, DoctorProfile
+
+
+# Champs utilisateur gardés en mémoire : de quoi reconstruire request.user
+# pour les vues d'auth/profil sans toucher la base.
+CACHED_USER_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name', 'role', 'is_active']
+
+CachedAuth = namedtuple(
+    "CachedAuth",
+    ["user_id", "user_values", "doctor_id", "is_approved", "verification_status", "expires_at"],
+)
+
+
+class AuthCache:
+    """
+    Per-process LRU cache of authenticated tokens with a TTL.
+
+    Entries are invalidated explicitly on logout / token deletion and when a
+    user or doctor profile changes; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, max_entries=10000, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, user, doctor_profile=None):
+        entry = CachedAuth(
+            user_id=user.pk,
+            user_values={field: getattr(user, field) for field in CACHED_USER_FIELDS},
+            doctor_id=doctor_profile.pk if doctor_profile else None,
+            is_approved=doctor_profile.is_approved if doctor_profile else None,
+            verification_status=doctor_profile.verification_status if doctor_profile else None,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_user.setdefault(entry.user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+        return entry
+
+    def invalidate(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._keys_by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[entry.user_id]
+
+
+auth_cache = AuthCache(
+    max_entries=getattr(settings, "AUTH_CACHE_MAX_ENTRIES", 10000),
+    ttl=getattr(settings, "AUTH_CACHE_TTL", 300),
+)
+
+
+def _partial_instance(model, values):
+    """Instance "chargée depuis la base" avec seulement ``values`` ; le reste est différé."""
+    field_names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(DEFAULT_DB_ALIAS, field_names, [values[name] for name in field_names])
+
+
 class CookieTokenAuthentication(TokenAuthentication):
     """
     Authenticates against a token stored in the HttpOnly cookie 'auth_token'.
+
+    Resolved tokens are kept in ``auth_cache`` so that steady-state requests
+    (including ``IsApprovedUser`` and ``user.doctor_profile`` lookups) run no
+    authentication query at all.
     """
     def authenticate(self, request):
         token = request.COOKIES.get('auth_token')
         if not token:
             return None
         return self.authenticate_credentials(token)
-    
+
+    def authenticate_credentials(self, key):
+        entry = auth_cache.get(key)
+        if entry is None:
+            return self._authenticate_and_cache(key)
+        return self._build_from_cache(key, entry)
+
+    def _authenticate_and_cache(self, key):
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user', 'user__doctor_profile').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+
+        user = token.user
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+
+        try:
+            doctor_profile = user.doctor_profile
+        except DoctorProfile.DoesNotExist:
+            doctor_profile = None
+
+        auth_cache.set(key, user, doctor_profile)
+        return (user, token)
+
+    def _build_from_cache(self, key, entry):
+        """
+        Rebuild the user / doctor profile / token as partially loaded instances:
+        the cached fields are set, every other field is deferred and loads
+        lazily if a view actually reads it.
+        """
+        user = _partial_instance(CustomUser, entry.user_values)
+        if entry.doctor_id is None:
+            # Pas de profil médecin : on le mémorise aussi pour éviter la requête
+            CustomUser.doctor_profile.related.set_cached_value(user, None)
+        else:
+            doctor_profile = _partial_instance(DoctorProfile, {
+                'id': entry.doctor_id,
+                'user_id': entry.user_id,
+                'is_approved': entry.is_approved,
+                'verification_status': entry.verification_status,
+            })
+            # Remplit le cache de la relation dans les deux sens
+            user.doctor_profile = doctor_profile
+
+        token = _partial_instance(self.get_model(), {'key': key, 'user_id': entry.user_id})
+        token.user = user
+        return (user, token)
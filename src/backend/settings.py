@@ -84,6 +84,25 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Images dérivées des IRM / heatmaps (api.derivatives, manage.py build_image_derivatives)
+IMAGE_DERIVATIVE_SIZES = {"thumb": 256, "medium": 1024}  # plus grand côté, en pixels
+IMAGE_DERIVATIVE_QUALITY = config("IMAGE_DERIVATIVE_QUALITY", default=80, cast=int)
+IMAGE_DERIVATIVE_WORKERS = config("IMAGE_DERIVATIVE_WORKERS", default=2, cast=int)
+
+# Uploads reprenables (api.uploads) : fichiers partiels sur le disque des médias
+UPLOAD_BLOCK_SIZE = 1024 * 1024  # un morceau = un multiple de ce bloc
+UPLOAD_MAX_SIZE = config("UPLOAD_MAX_SIZE", default=4 * 1024 ** 3, cast=int)
+UPLOAD_TMP_DIR = config("UPLOAD_TMP_DIR", default=str(BASE_DIR / "uploads_tmp"))
+# Durée max de réservation d'un morceau : au-delà, un client interrompu peut reprendre
+UPLOAD_CHUNK_TIMEOUT = config("UPLOAD_CHUNK_TIMEOUT", default=600, cast=int)
+
+# Volumes 3D mémoire-mappés (api.volumes, manage.py ingest_volumes)
+VOLUME_STORE_DIR = config("VOLUME_STORE_DIR", default=str(BASE_DIR / "volumes"))
+
+# Tuiles IRM + heatmap (api.overlay), cache disque
+OVERLAY_TILE_SIZE = 256
+OVERLAY_TILE_CACHE_DIR = config("OVERLAY_TILE_CACHE_DIR", default=str(BASE_DIR / "cache" / "overlay_tiles"))
+
 # -------------------------------------------------------
 # DRF
 # -------------------------------------------------------
@@ -94,6 +113,57 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Pagination keyset (api.pagination.KeysetPagination), surchargeable via ?page_size=
+KEYSET_PAGE_SIZE = config("KEYSET_PAGE_SIZE", default=50, cast=int)
+KEYSET_MAX_PAGE_SIZE = config("KEYSET_MAX_PAGE_SIZE", default=200, cast=int)
+
+# Cache partagé par tous les workers (tableau de bord, cohortes) : Redis si REDIS_URL,
+# sinon table en base (python manage.py createcachetable)
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": REDIS_URL},
+    }
+else:
+    CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", "LOCATION": "django_cache"},
+    }
+
+# Tableau de bord médecin (api.dashboard), invalidé par signals.py
+DASHBOARD_CACHE_TTL = config("DASHBOARD_CACHE_TTL", default=300, cast=int)
+
+# Statistiques de cohorte des chercheurs (api.cohorts) : durée du cache, lignes par lot lu
+COHORT_CACHE_TTL = config("COHORT_CACHE_TTL", default=600, cast=int)
+COHORT_CHUNK_SIZE = config("COHORT_CHUNK_SIZE", default=10000, cast=int)
+# Export pseudonymisé (api.exports) : clé HMAC des pseudonymes (dédiée, obligatoire pour exporter),
+# lignes par lot lu, lignes par row group Parquet
+EXPORT_PSEUDONYM_KEY = config("EXPORT_PSEUDONYM_KEY", default="")
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+EXPORT_ROW_GROUP_SIZE = config("EXPORT_ROW_GROUP_SIZE", default=50000, cast=int)
+
+# Liste de triage des médecins (api.views.TriageView) : fenêtre par défaut, en jours
+TRIAGE_WINDOW_DAYS = config("TRIAGE_WINDOW_DAYS", default=30, cast=int)
+
+# Admin : comptage plafonné / estimé (api.pagination.EstimatedCountPaginator)
+ADMIN_COUNT_CAP = config("ADMIN_COUNT_CAP", default=10000, cast=int)
+ADMIN_COUNT_TIMEOUT_MS = config("ADMIN_COUNT_TIMEOUT_MS", default=200, cast=int)
+
+# Inférence asynchrone (api.inference, manage.py run_inference_worker)
+INFERENCE_PREDICTOR = config("INFERENCE_PREDICTOR", default="api.predictors.StubPredictor")
+INFERENCE_WORKERS = config("INFERENCE_WORKERS", default=2, cast=int)
+INFERENCE_MAX_ATTEMPTS = config("INFERENCE_MAX_ATTEMPTS", default=3, cast=int)
+# Job "running" depuis plus longtemps (s) : worker mort, job remis en file
+INFERENCE_JOB_TIMEOUT = config("INFERENCE_JOB_TIMEOUT", default=600, cast=int)
+# Micro-batching : taille max d'un lot, attente max (s) pour le remplir
+INFERENCE_BATCH_SIZE = config("INFERENCE_BATCH_SIZE", default=32, cast=int)
+INFERENCE_BATCH_MAX_WAIT = config("INFERENCE_BATCH_MAX_WAIT", default=0.5, cast=float)
+# Cache des résultats par empreinte du contenu (0 : désactivé)
+INFERENCE_CACHE_MAX_ENTRIES = config("INFERENCE_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+# Cache d'authentification par process (authentication.CookieTokenAuthentication)
+AUTH_CACHE_TTL = config("AUTH_CACHE_TTL", default=300, cast=int)
+AUTH_CACHE_MAX_ENTRIES = config("AUTH_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
 # -------------------------------------------------------
 # USER MODEL
 # -------------------------------------------------------
@@ -143,3 +213,10 @@ EMAIL_HOST_PASSWORD = "4d36cb292ccc58"
 EMAIL_PORT = 2525
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = "noreply@neurevia.com"
+
+# Outbox (api.outbox) : les emails sont envoyés par `manage.py dispatch_emails`
+EMAIL_OUTBOX_BATCH_SIZE = config("EMAIL_OUTBOX_BATCH_SIZE", default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config("EMAIL_OUTBOX_MAX_ATTEMPTS", default=5, cast=int)
+EMAIL_OUTBOX_RETRY_DELAY = config("EMAIL_OUTBOX_RETRY_DELAY", default=60, cast=int)
+# Fenêtre de regroupement des notifications de documents (api.notifications), en secondes
+NOTIFICATION_DIGEST_WINDOW = config("NOTIFICATION_DIGEST_WINDOW", default=300, cast=int)